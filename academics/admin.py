@@ -1,7 +1,11 @@
 # academics/admin.py
 
 from django.contrib import admin
+from django.db import transaction
 from django.db.models import Avg, Count
+
+from records.cache import invalidate_for
+
 from .models import (
     AcademicSession,
     Term,
@@ -15,6 +19,8 @@ from .models import (
     Timetable,
     ReportCard,
     PerformanceComment,
+    Job,
+    SubjectResultRollup,
 )
 
 
@@ -205,13 +211,21 @@ class ReportCardAdmin(admin.ModelAdmin):
     def publish_report_cards(self, request, queryset):
         from django.utils import timezone
 
-        count = queryset.update(is_published=True, published_at=timezone.now())
+        student_ids = list(queryset.values_list("student_id", flat=True))
+        # Invalidated after the update, so nothing is rebuilt from the old rows
+        with transaction.atomic():
+            count = queryset.update(is_published=True, published_at=timezone.now())
+            invalidate_for(ReportCard, "student", student_ids)
         self.message_user(request, f"{count} report cards published successfully.")
 
     publish_report_cards.short_description = "Publish selected report cards"
 
     def unpublish_report_cards(self, request, queryset):
-        count = queryset.update(is_published=False, published_at=None)
+        student_ids = list(queryset.values_list("student_id", flat=True))
+        # Invalidated after the update, so nothing is rebuilt from the old rows
+        with transaction.atomic():
+            count = queryset.update(is_published=False, published_at=None)
+            invalidate_for(ReportCard, "student", student_ids)
         self.message_user(request, f"{count} report cards unpublished successfully.")
 
     unpublish_report_cards.short_description = "Unpublish selected report cards"
@@ -239,6 +253,23 @@ class TimetableAdmin(admin.ModelAdmin):
     raw_id_fields = ["classroom", "subject", "teacher", "term"]
 
 
+@admin.register(SubjectResultRollup)
+class SubjectResultRollupAdmin(admin.ModelAdmin):
+    list_display = ["subject", "classroom", "term", "result_count", "average_score", "highest_score", "lowest_score", "pass_count", "updated_at"]
+    list_filter = ["term", "classroom", "subject"]
+    ordering = ["term", "classroom__level", "classroom__arm", "subject__name"]
+    readonly_fields = [field.name for field in SubjectResultRollup._meta.fields]
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["id", "kind", "status", "progress_done", "progress_total", "attempts", "created_by", "created_at", "finished_at"]
+    list_filter = ["kind", "status"]
+    search_fields = ["message", "error"]
+    ordering = ["-created_at"]
+    readonly_fields = ["worker", "lease_expires_at", "attempts", "created_at", "started_at", "finished_at"]
+
+
 
 # Inline admin classes for better management
 class SubjectAssignmentInline(admin.TabularInline):
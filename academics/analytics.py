@@ -0,0 +1,307 @@
+# academics/analytics.py
+"""
+Performance Analytics
+
+Aggregations behind the performance analytics page and its CSV exports.
+
+When the filters only narrow by session, term, class or subject, everything is
+read from SubjectResultRollup rows in one query, so cost scales with the
+number of class-subject pairs rather than students:
+
+    rollup_analytics    stats, grades, pass/fail, subject/class/term tables
+
+Filters on individual students or score ranges need the raw TermResults; each
+helper then answers with one query over the filtered queryset:
+
+    summarize_results   headline stats, grade distribution, pass/fail
+    subject_breakdown   average and student count per subject
+    class_and_term_breakdown  averages per class and per term
+    top_performers      best average per student (always from TermResults)
+"""
+
+from types import SimpleNamespace
+
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+
+from .models import FAIL_GRADE, TERM_GRADE_BOUNDARIES
+from .matrix import GRADES
+from .rollups import GRADE_FIELDS
+
+
+def grade_filters(field="total_score"):
+    """
+    Q objects selecting each letter grade's score band
+
+    Returns:
+        Dictionary mapping grade (A-F) to a Q filter on ``field``
+    """
+    filters = {}
+    upper = None
+    for lower, grade in TERM_GRADE_BOUNDARIES:
+        band = Q(**{f"{field}__gte": lower})
+        if upper is not None:
+            band &= Q(**{f"{field}__lt": upper})
+        filters[grade] = band
+        upper = lower
+    filters[FAIL_GRADE] = Q(**{f"{field}__lt": upper})
+    return filters
+
+
+def summarize_results(queryset):
+    """
+    Headline statistics, grade distribution and pass/fail counts in one query
+
+    Args:
+        queryset: Filtered TermResult queryset
+
+    Returns:
+        Dictionary with "stats", "grade_distribution" and "pass_fail_stats"
+    """
+    grade_aggregates = {
+        f"grade_{grade}": Count("id", filter=band)
+        for grade, band in grade_filters().items()
+    }
+    row = queryset.order_by().aggregate(
+        avg_score=Avg("total_score"),
+        highest_score=Max("total_score"),
+        lowest_score=Min("total_score"),
+        total_students=Count("student", distinct=True),
+        **grade_aggregates,
+    )
+
+    grade_distribution = {grade: row[f"grade_{grade}"] for grade in GRADES}
+    fail_count = grade_distribution[FAIL_GRADE]
+    return {
+        "stats": {
+            "avg_score": row["avg_score"] or 0,
+            "highest_score": row["highest_score"] or 0,
+            "lowest_score": row["lowest_score"] or 0,
+            "total_students": row["total_students"] or 0,
+        },
+        "grade_distribution": grade_distribution,
+        # Every grade above F is a pass
+        "pass_fail_stats": {
+            "pass_count": sum(grade_distribution.values()) - fail_count,
+            "fail_count": fail_count,
+        },
+    }
+
+
+def subject_breakdown(queryset):
+    """Average total score and number of students per subject, best first"""
+    return list(
+        queryset.order_by()
+        .values("subject__name")
+        .annotate(
+            avg_score=Avg("total_score"),
+            student_count=Count("student", distinct=True),
+        )
+        .order_by("-avg_score")
+    )
+
+
+def class_and_term_breakdown(queryset):
+    """
+    Average total score per class and per term from one grouped query
+
+    Rows are grouped by (class, term) with their sum and count, then rolled up
+    in Python, so each average is over the underlying results rather than an
+    average of averages.
+
+    Returns:
+        Tuple (class_performance, performance_trend) of lists of dicts
+    """
+    rows = (
+        queryset.order_by()
+        .values("classroom__level", "classroom__arm", "term__id", "term__name")
+        .annotate(score_sum=Sum("total_score"), result_count=Count("id"))
+    )
+
+    classes = {}
+    terms = {}
+    for row in rows:
+        for groups, key, label in (
+            (classes, (row["classroom__level"], row["classroom__arm"]), {}),
+            (terms, row["term__id"], {"term__name": row["term__name"]}),
+        ):
+            group = groups.setdefault(key, {**label, "score_sum": 0, "result_count": 0})
+            group["score_sum"] += row["score_sum"] or 0
+            group["result_count"] += row["result_count"]
+
+    class_performance = [
+        {
+            "classroom__level": level,
+            "classroom__arm": arm,
+            "avg_score": group["score_sum"] / group["result_count"],
+        }
+        for (level, arm), group in sorted(classes.items())
+    ]
+    performance_trend = [
+        {
+            "term__name": group["term__name"],
+            "term__id": term_id,
+            "avg_score": float(group["score_sum"] / group["result_count"]),
+        }
+        for term_id, group in sorted(terms.items())
+    ]
+    return class_performance, performance_trend
+
+
+def results_analytics(queryset):
+    """
+    Every analytics table computed from a filtered TermResult queryset
+
+    Returns:
+        Dictionary shaped like rollup_analytics
+    """
+    analytics = summarize_results(queryset)
+    analytics["subject_performance"] = subject_breakdown(queryset)
+    analytics["class_performance"], analytics["performance_trend"] = (
+        class_and_term_breakdown(queryset)
+    )
+    return analytics
+
+
+def rollup_analytics(rollups):
+    """
+    Every analytics table computed from SubjectResultRollup rows in one query
+
+    Student counts assume each student has one result per subject in their
+    class, so a class's head count is its largest subject count; across
+    several terms the busiest term's count is used.
+
+    Args:
+        rollups: Filtered SubjectResultRollup queryset
+
+    Returns:
+        Dictionary with "stats", "grade_distribution", "pass_fail_stats",
+        "subject_performance", "class_performance" and "performance_trend"
+    """
+    rows = rollups.order_by().values(
+        "term_id",
+        "term__name",
+        "classroom_id",
+        "classroom__level",
+        "classroom__arm",
+        "subject__name",
+        "result_count",
+        "score_sum",
+        "highest_score",
+        "lowest_score",
+        "pass_count",
+        *GRADE_FIELDS.values(),
+    )
+
+    count = total = 0
+    highest = lowest = None
+    grade_distribution = dict.fromkeys(GRADES, 0)
+    pass_count = 0
+    class_sizes = {}
+    subjects = {}
+    classes = {}
+    terms = {}
+
+    for row in rows:
+        count += row["result_count"]
+        total += row["score_sum"]
+        pass_count += row["pass_count"]
+        for grade, field in GRADE_FIELDS.items():
+            grade_distribution[grade] += row[field]
+        if highest is None or row["highest_score"] > highest:
+            highest = row["highest_score"]
+        if lowest is None or row["lowest_score"] < lowest:
+            lowest = row["lowest_score"]
+
+        class_key = (row["term_id"], row["classroom_id"])
+        class_sizes[class_key] = max(class_sizes.get(class_key, 0), row["result_count"])
+
+        for groups, key, label in (
+            (subjects, row["subject__name"], {"per_term": {}}),
+            (classes, (row["classroom__level"], row["classroom__arm"]), {}),
+            (terms, row["term_id"], {"term__name": row["term__name"]}),
+        ):
+            group = groups.setdefault(key, {**label, "score_sum": 0, "result_count": 0})
+            group["score_sum"] += row["score_sum"]
+            group["result_count"] += row["result_count"]
+
+        per_term = subjects[row["subject__name"]]["per_term"]
+        per_term[row["term_id"]] = per_term.get(row["term_id"], 0) + row["result_count"]
+
+    students_per_term = {}
+    for (term_id, _), size in class_sizes.items():
+        students_per_term[term_id] = students_per_term.get(term_id, 0) + size
+
+    fail_count = grade_distribution[FAIL_GRADE]
+    return {
+        "stats": {
+            "avg_score": total / count if count else 0,
+            "highest_score": highest or 0,
+            "lowest_score": lowest or 0,
+            "total_students": max(students_per_term.values(), default=0),
+        },
+        "grade_distribution": grade_distribution,
+        "pass_fail_stats": {"pass_count": pass_count, "fail_count": count - pass_count},
+        "subject_performance": sorted(
+            (
+                {
+                    "subject__name": name,
+                    "avg_score": group["score_sum"] / group["result_count"],
+                    "student_count": max(group["per_term"].values()),
+                }
+                for name, group in subjects.items()
+                if group["result_count"]
+            ),
+            key=lambda row: row["avg_score"],
+            reverse=True,
+        ),
+        "class_performance": [
+            {
+                "classroom__level": level,
+                "classroom__arm": arm,
+                "avg_score": group["score_sum"] / group["result_count"],
+            }
+            for (level, arm), group in sorted(classes.items())
+            if group["result_count"]
+        ],
+        "performance_trend": [
+            {
+                "term__name": group["term__name"],
+                "term__id": term_id,
+                "avg_score": float(group["score_sum"] / group["result_count"]),
+            }
+            for term_id, group in sorted(terms.items())
+            if group["result_count"]
+        ],
+    }
+
+
+def top_performers(queryset, limit=10):
+    """
+    Students with the best average total score
+
+    Returns:
+        List of {"student", "classroom", "average_score"} dicts, where
+        "student" exposes full_name like a Student instance
+    """
+    rows = (
+        queryset.order_by()
+        .values(
+            "student__id",
+            "student__surname",
+            "student__other_name",
+            "classroom__level",
+            "classroom__arm",
+        )
+        .annotate(average=Avg("total_score"))
+        .order_by("-average")[:limit]
+    )
+    return [
+        {
+            "student": SimpleNamespace(
+                full_name=f"{row['student__surname']} {row['student__other_name']}"
+            ),
+            "classroom": f"{row['classroom__level']}{row['classroom__arm']}",
+            "average_score": float(row["average"] or 0),
+        }
+        for row in rows
+    ]
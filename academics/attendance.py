@@ -0,0 +1,132 @@
+# academics/attendance.py
+"""
+Attendance
+
+Daily attendance is submitted for a whole class at once. The roster is read
+in one query, every submitted status is validated in memory, and the register
+is written with a single upsert on the (student, date) unique key, so a
+morning's submission costs the same whatever the class size. Reports count
+every student's statuses over a range with one grouped query.
+"""
+
+from django.db.models import Count, Q
+
+from records.cache import invalidate_for
+
+from .models import Attendance
+from .utils import bulk_upsert
+
+PRESENT = "Present"
+STATUSES = {status for status, _ in Attendance.ATTENDANCE_STATUS}
+
+
+class AttendanceError(Exception):
+    """Raised when a submission contains an unknown status"""
+
+
+def parse_attendance(data, student_ids, default_status=None):
+    """
+    Collect each student's status and remarks from POSTed form fields
+
+    Fields are named ``status_<student_id>`` and ``remarks_<student_id>``.
+    Students without a status are skipped, or given ``default_status`` when
+    set, so "mark all present" submissions only need to list exceptions.
+
+    Args:
+        data: QueryDict or dict of submitted fields
+        student_ids: Ids of the class roster
+        default_status: Status for students that were not submitted
+
+    Returns:
+        Dictionary mapping student_id to (status, remarks)
+
+    Raises:
+        AttendanceError: If any submitted status is not a valid choice
+    """
+    entries = {}
+    invalid = []
+    for student_id in student_ids:
+        status = data.get(f"status_{student_id}") or default_status
+        if not status:
+            continue
+        if status not in STATUSES:
+            invalid.append(status)
+            continue
+        entries[student_id] = (status, data.get(f"remarks_{student_id}", "").strip())
+
+    if invalid:
+        raise AttendanceError(
+            f"Unknown attendance status: {', '.join(sorted(set(invalid)))}"
+        )
+    return entries
+
+
+def save_attendance(date, entries, user=None):
+    """
+    Write a day's attendance for many students in one statement
+
+    Args:
+        date: Attendance date
+        entries: Dictionary mapping student_id to (status, remarks)
+        user: User marking the register
+
+    Returns:
+        Number of records written
+    """
+    records = [
+        Attendance(
+            student_id=student_id,
+            date=date,
+            status=status,
+            remarks=remarks,
+            marked_by=user,
+        )
+        for student_id, (status, remarks) in entries.items()
+    ]
+    if records:
+        bulk_upsert(
+            Attendance,
+            records,
+            unique_fields=["student", "date"],
+            update_fields=["status", "remarks", "marked_by"],
+        )
+        invalidate_for(Attendance, "student", entries)
+    return len(records)
+
+
+def attendance_summary(students, start_date, end_date):
+    """
+    Per-student attendance counts over a date range from one grouped query
+
+    Args:
+        students: Roster, as a list of Student objects
+        start_date, end_date: Inclusive date range
+
+    Returns:
+        List of dicts with "student", a count per status ("present", "absent",
+        "late", "excused"), "total" and "rate" (percent present), in roster
+        order; students with no records get zero counts
+    """
+    counts = {
+        status.lower(): Count("id", filter=Q(status=status))
+        for status, _ in Attendance.ATTENDANCE_STATUS
+    }
+    rows = {
+        row["student"]: row
+        for row in Attendance.objects.filter(
+            student__in=[student.pk for student in students],
+            date__range=(start_date, end_date),
+        )
+        .values("student")
+        .annotate(total=Count("id"), **counts)
+        .order_by()
+    }
+
+    empty = dict.fromkeys([*counts, "total"], 0)
+    report = []
+    for student in students:
+        row = {**empty, **rows.get(student.pk, {})}
+        row["student"] = student
+        row["rate"] = round(row["present"] * 100 / row["total"]) if row["total"] else 0
+        report.append(row)
+    return report
@@ -0,0 +1,191 @@
+# academics/broadsheet.py
+"""
+Class Broadsheets
+
+The master score sheet of a class: one row per student with CA, exam, total
+and grade for every subject, followed by the student's overall total, average
+and class position. Broadsheets for any number of classes are pivoted from a
+single TermResult query, so a whole level can go into one workbook without
+per-student or per-class queries.
+"""
+
+from .excel import NAME_WIDTH, add_sheet, full_name, new_workbook
+from .exports import stream_csv
+from .models import TermResult
+from .ranking import rank_values
+from .results import to_decimal
+
+# Figures shown for each subject, as (label, TermResult field)
+SUBJECT_FIELDS = [
+    ("CA", "ca_total"),
+    ("Exam", "exam_score"),
+    ("Total", "total_score"),
+    ("Grade", "grade"),
+]
+
+
+class Broadsheet:
+    """
+    Pivoted term results of one classroom
+
+    Attributes:
+        classroom, term: What the sheet covers
+        subjects: List of (subject_id, name, code) in column order
+        rows: List of student dicts with "admission_no", "name", "scores"
+            (subject_id -> list of SUBJECT_FIELDS values), "total",
+            "average", "subject_count" and "position", best first
+    """
+
+    def __init__(self, classroom, term):
+        self.classroom = classroom
+        self.term = term
+        self.subjects = []
+        self.rows = []
+
+    def __str__(self):
+        return f"{self.classroom} {self.term}"
+
+    @property
+    def header(self):
+        """Flat column names for CSV and Excel"""
+        return [
+            "Admission No",
+            "Student Name",
+            *(
+                f"{code} {label}"
+                for _, _, code in self.subjects
+                for label, _ in SUBJECT_FIELDS
+            ),
+            "Subjects",
+            "Total",
+            "Average",
+            "Position",
+        ]
+
+    def table(self):
+        """Yield each student's row as a flat list matching ``header``"""
+        blank = [""] * len(SUBJECT_FIELDS)
+        for row in self.rows:
+            yield [
+                row["admission_no"],
+                row["name"],
+                *(
+                    value
+                    for subject_id, _, _ in self.subjects
+                    for value in row["scores"].get(subject_id, blank)
+                ),
+                row["subject_count"],
+                row["total"],
+                row["average"],
+                row["position"],
+            ]
+
+    def html_rows(self):
+        """Yield (row, per-subject values) pairs for the HTML template"""
+        blank = [""] * len(SUBJECT_FIELDS)
+        for row in self.rows:
+            yield row, [
+                row["scores"].get(subject_id, blank)
+                for subject_id, _, _ in self.subjects
+            ]
+
+
+def load_broadsheets(term, classrooms):
+    """
+    Build broadsheets for several classes from one TermResult query
+
+    Args:
+        term: Term object
+        classrooms: Iterable of ClassRoom objects
+
+    Returns:
+        List of Broadsheet objects in the order of ``classrooms``
+    """
+    sheets = {classroom.pk: Broadsheet(classroom, term) for classroom in classrooms}
+    if not sheets:
+        return []
+
+    rows = (
+        TermResult.objects.filter(term=term, classroom_id__in=sheets)
+        .order_by("classroom_id", "subject__name", "student__surname")
+        .values_list(
+            "classroom_id",
+            "subject_id",
+            "subject__name",
+            "subject__code",
+            "student_id",
+            "student__admission_no",
+            "student__surname",
+            "student__other_name",
+            *(field for _, field in SUBJECT_FIELDS),
+        )
+    )
+
+    students = {pk: {} for pk in sheets}
+    subjects = {pk: {} for pk in sheets}
+    for (
+        classroom_id,
+        subject_id,
+        subject_name,
+        subject_code,
+        student_id,
+        admission_no,
+        surname,
+        other_name,
+        *figures,
+    ) in rows:
+        subjects[classroom_id].setdefault(
+            subject_id, (subject_id, subject_name, subject_code)
+        )
+        student = students[classroom_id].setdefault(
+            student_id,
+            {
+                "admission_no": admission_no,
+                "name": full_name(surname, other_name),
+                "scores": {},
+                "total": 0,
+            },
+        )
+        student["scores"][subject_id] = figures
+        student["total"] += figures[2]
+
+    for classroom_id, sheet in sheets.items():
+        sheet.subjects = list(subjects[classroom_id].values())
+        class_rows = students[classroom_id]
+        for row in class_rows.values():
+            row["subject_count"] = len(row["scores"])
+            row["average"] = to_decimal(row["total"] / row["subject_count"])
+
+        # Same rule as report cards: rank by average over subjects taken
+        positions = rank_values(
+            (student_id, row["average"]) for student_id, row in class_rows.items()
+        )
+        for student_id, row in class_rows.items():
+            row["position"] = positions[student_id]
+        sheet.rows = sorted(
+            class_rows.values(), key=lambda row: (row["position"], row["name"])
+        )
+
+    return list(sheets.values())
+
+
+def write_broadsheet_workbook(broadsheets, file):
+    """
+    Write broadsheets to an Excel workbook, one sheet per class
+
+    Returns:
+        Number of student rows written
+    """
+    workbook = new_workbook()
+    count = 0
+    for sheet in broadsheets:
+        columns = [(header, None) for header in sheet.header]
+        columns[1] = ("Student Name", NAME_WIDTH)
+        count += add_sheet(workbook, str(sheet.classroom), columns, sheet.table())
+    workbook.save(file)
+    return count
+
+
+def broadsheet_csv(broadsheet):
+    """Yield a broadsheet as CSV lines"""
+    return stream_csv(broadsheet.header, broadsheet.table())
@@ -0,0 +1,21 @@
+# academics/context_processors.py
+
+from django.utils.functional import SimpleLazyObject
+
+from .reference import reference_data
+
+
+def reference(request):
+    """
+    Expose the cached reference data to templates
+
+    Adds ``reference`` (see academics.reference), ``current_term`` and
+    ``current_session``. Nothing is read until a template uses them; views
+    passing their own ``current_term`` or ``current_session`` take precedence.
+    """
+    data = SimpleLazyObject(reference_data)
+    return {
+        "reference": data,
+        "current_term": SimpleLazyObject(lambda: data["current_term"]),
+        "current_session": SimpleLazyObject(lambda: data["current_session"]),
+    }
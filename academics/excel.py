@@ -0,0 +1,70 @@
+# academics/excel.py
+"""
+Excel Exports
+
+Writes .xlsx files with openpyxl's write-only mode: rows go straight from a
+``values_list`` iterator into the worksheet's XML stream without building
+DataFrames or keeping cell objects around, so memory stays flat however many
+rows a term has. Write-only sheets cannot be measured after the fact, so
+column widths are declared up front with the columns.
+"""
+
+from django.http import HttpResponse
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+
+DEFAULT_WIDTH = 12
+
+# Common column widths, in characters
+NAME_WIDTH = 30
+REMARKS_WIDTH = 40
+
+
+def new_workbook():
+    """Create an empty write-only workbook"""
+    return Workbook(write_only=True)
+
+
+def add_sheet(workbook, title, columns, rows):
+    """
+    Append a sheet and stream rows into it
+
+    Args:
+        workbook: Write-only Workbook
+        title: Sheet name
+        columns: List of (header, width) pairs; width may be None for the
+            default, and never ends up narrower than the header
+        rows: Iterable of row sequences, consumed lazily
+
+    Returns:
+        Number of data rows written
+    """
+    sheet = workbook.create_sheet(title=title[:31])
+    for index, (header, width) in enumerate(columns, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = (
+            max(width or DEFAULT_WIDTH, len(header)) + 2
+        )
+
+    sheet.append([header for header, _ in columns])
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    return count
+
+
+def xlsx_response(workbook, filename):
+    """Return a workbook as an .xlsx download"""
+    response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    workbook.save(response)
+    return response
+
+
+def full_name(surname, other_name):
+    """Student.full_name from values_list columns"""
+    return f"{surname} {other_name or ''}".strip()
@@ -0,0 +1,220 @@
+# academics/exports.py
+"""
+Streaming CSV Exports
+
+Raw extracts of TermResult, StudentScore, Attendance and ReportCard rows for
+a whole school across sessions. Rows are read with ``values_list`` and
+``iterator(chunk_size=...)`` and written out one CSV line at a time, so an
+export of several years holds only one chunk in memory and the response
+starts downloading straight away.
+
+Every extract accepts the PerformanceFilterForm filters; filters that do not
+apply to a dataset (e.g. subject for attendance) are ignored.
+"""
+
+import csv
+
+from .models import Attendance, ReportCard, StudentScore, TermResult
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """
+    Yield CSV lines for a header and an iterable of rows
+
+    Args:
+        header: List of column names
+        rows: Iterable of row sequences
+
+    Yields:
+        One encoded CSV line at a time
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class Extract:
+    """
+    A dataset that can be exported as CSV
+
+    Args:
+        model: Model to read
+        columns: List of (header, field path) pairs
+        lookups: Mapping of filter name to field path
+        score_field: Field the min/max score filters apply to, if any
+        date_field: Date field used for session/term filters instead of a
+            foreign key, for models that are not linked to a term
+        ordering: Field paths the rows are ordered by
+    """
+
+    def __init__(
+        self, model, columns, lookups, score_field=None, date_field=None, ordering=()
+    ):
+        self.model = model
+        self.columns = columns
+        self.lookups = lookups
+        self.score_field = score_field
+        self.date_field = date_field
+        self.ordering = ordering
+
+    @property
+    def header(self):
+        return [header for header, _ in self.columns]
+
+    def queryset(self, filters):
+        """Rows matching the cleaned filter values, as tuples"""
+        queryset = self.model.objects.all()
+        for name, value in filters.items():
+            if self.date_field and name in ("session", "term"):
+                queryset = queryset.filter(
+                    **{
+                        f"{self.date_field}__range": (
+                            value.start_date,
+                            value.end_date,
+                        )
+                    }
+                )
+            elif name in self.lookups:
+                queryset = queryset.filter(**{self.lookups[name]: value})
+
+        if self.score_field:
+            if "min_score" in filters:
+                queryset = queryset.filter(
+                    **{f"{self.score_field}__gte": filters["min_score"]}
+                )
+            if "max_score" in filters:
+                queryset = queryset.filter(
+                    **{f"{self.score_field}__lte": filters["max_score"]}
+                )
+
+        return queryset.order_by(*self.ordering, "pk").values_list(
+            *(path for _, path in self.columns)
+        )
+
+    def stream(self, filters, chunk_size=CHUNK_SIZE):
+        """Yield the extract as CSV lines, reading the database in chunks"""
+        rows = self.queryset(filters).iterator(chunk_size=chunk_size)
+        return stream_csv(self.header, rows)
+
+
+STUDENT_COLUMNS = [
+    ("Admission No", "student__admission_no"),
+    ("Surname", "student__surname"),
+    ("Other Name", "student__other_name"),
+]
+
+TERM_COLUMNS = [
+    ("Session", "term__session__name"),
+    ("Term", "term__name"),
+]
+
+EXTRACTS = {
+    "term_results": Extract(
+        TermResult,
+        columns=[
+            *TERM_COLUMNS,
+            ("Class", "classroom__level"),
+            ("Arm", "classroom__arm"),
+            *STUDENT_COLUMNS,
+            ("Subject", "subject__name"),
+            ("CA Total", "ca_total"),
+            ("Exam Score", "exam_score"),
+            ("Total Score", "total_score"),
+            ("Grade", "grade"),
+            ("Position", "position"),
+            ("Class Average", "class_average"),
+            ("Highest", "highest_score"),
+            ("Lowest", "lowest_score"),
+            ("Remarks", "teacher_remarks"),
+        ],
+        lookups={
+            "session": "term__session",
+            "term": "term",
+            "classroom": "classroom",
+            "subject": "subject",
+            "student": "student",
+        },
+        score_field="total_score",
+        ordering=("term__start_date", "classroom_id", "student__surname"),
+    ),
+    "student_scores": Extract(
+        StudentScore,
+        columns=[
+            ("Session", "assessment__assignment__term__session__name"),
+            ("Term", "assessment__assignment__term__name"),
+            ("Class", "assessment__assignment__classroom__level"),
+            ("Arm", "assessment__assignment__classroom__arm"),
+            ("Subject", "assessment__assignment__subject__name"),
+            ("Assessment", "assessment__title"),
+            ("Assessment Type", "assessment__assessment_type__code"),
+            ("Max Score", "assessment__max_score"),
+            *STUDENT_COLUMNS,
+            ("Score", "score"),
+            ("Percentage", "percentage"),
+            ("Grade", "grade"),
+            ("Remarks", "remarks"),
+            ("Submitted At", "submitted_at"),
+        ],
+        lookups={
+            "session": "assessment__assignment__term__session",
+            "term": "assessment__assignment__term",
+            "classroom": "assessment__assignment__classroom",
+            "subject": "assessment__assignment__subject",
+            "student": "student",
+        },
+        # The form's score range is 0-100, so it applies to percentages
+        score_field="percentage",
+        ordering=("assessment__assignment__term__start_date", "assessment_id"),
+    ),
+    "attendance": Extract(
+        Attendance,
+        columns=[
+            ("Date", "date"),
+            *STUDENT_COLUMNS,
+            ("Class", "student__classroom__level"),
+            ("Arm", "student__classroom__arm"),
+            ("Status", "status"),
+            ("Remarks", "remarks"),
+        ],
+        lookups={"classroom": "student__classroom", "student": "student"},
+        date_field="date",
+        ordering=("date", "student__surname"),
+    ),
+    "report_cards": Extract(
+        ReportCard,
+        columns=[
+            *TERM_COLUMNS,
+            ("Class", "classroom__level"),
+            ("Arm", "classroom__arm"),
+            *STUDENT_COLUMNS,
+            ("Total Score", "total_score"),
+            ("Average Score", "average_score"),
+            ("Position", "position"),
+            ("Out Of", "out_of"),
+            ("Days Present", "days_present"),
+            ("Days Absent", "days_absent"),
+            ("Attendance %", "attendance_percentage"),
+            ("Status", "status"),
+            ("Class Teacher Remarks", "class_teacher_remarks"),
+            ("Principal Remarks", "principal_remarks"),
+        ],
+        lookups={
+            "session": "term__session",
+            "term": "term",
+            "classroom": "classroom",
+            "student": "student",
+        },
+        score_field="average_score",
+        ordering=("term__start_date", "classroom_id", "position"),
+    ),
+}
@@ -19,6 +19,7 @@ from .models import (
     PerformanceComment,
 )
 from records.models import Student
+from .reference import get_current_term
 
 
 # ============================================
@@ -657,7 +658,7 @@ class PerformanceFilterForm(forms.Form):
         widget=forms.Select(attrs={"class": "form-select"}),
     )
     term = forms.ModelChoiceField(
-        queryset=Term.objects.all(),
+        queryset=Term.objects.select_related("session"),
         required=False,
         empty_label="All Terms",
         widget=forms.Select(attrs={"class": "form-select"}),
@@ -693,12 +694,13 @@ class PerformanceFilterForm(forms.Form):
         widget=forms.NumberInput(attrs={"class": "form-control", "placeholder": "100"}),
     )
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, current_term=None, **kwargs):
         super().__init__(*args, **kwargs)
         # Preselect current session/term if form is not bound
         if not self.is_bound:
             try:
-                current_term = Term.objects.filter(is_current=True).first()
+                if current_term is None:
+                    current_term = get_current_term()
                 if current_term:
                     self.initial.setdefault("term", current_term.id)
                     self.initial.setdefault("session", current_term.session_id)
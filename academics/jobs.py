@@ -0,0 +1,392 @@
+# academics/jobs.py
+"""
+Background Jobs
+
+A small database-backed job queue for operations too slow to run inside a
+request (recalculation, report card generation, exports, large imports). Views
+enqueue a Job row and return immediately; the ``run_jobs`` management command
+claims and executes queued jobs.
+
+Claiming uses leases rather than SELECT ... FOR UPDATE so it also works on
+SQLite: a worker takes a job with a conditional UPDATE that only succeeds if
+the row is unchanged since it was read, and holds it until its lease expires.
+Handlers report progress, which also renews the lease. A job whose worker died
+is claimed again once its lease runs out, up to ``max_attempts`` times.
+Finished jobs and their files are purged by the worker after a retention
+period.
+"""
+
+import csv
+import io
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Assessment, ClassRoom, Job, ReportCard, Term
+from .pdf import warm_pdf_cache
+from .report_cards import generate_class_report_cards, write_report_cards_workbook
+from .results import calculate_class_results
+from .score_import import ERROR_REPORT_COLUMNS, ScoreImport, ScoreImportError
+from .surge import warm_report_summaries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_RETENTION_DAYS = 7
+
+HANDLERS = {}
+
+
+class JobError(Exception):
+    """Raised by a handler for an expected failure; shown to the user as is"""
+
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def lease_seconds():
+    return getattr(settings, "ACADEMIC_JOBS_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)
+
+
+def worker_name():
+    """Identify this process in a job's lease"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(kind, user=None, input_file=None, **payload):
+    """
+    Queue a job for the background worker
+
+    With ``ACADEMIC_JOBS_EAGER`` set (the default when DEBUG is on) the job
+    runs immediately in the calling process instead, for development without
+    a worker.
+
+    Args:
+        kind: Registered handler name
+        user: User requesting the job
+        input_file: Optional uploaded file the handler reads
+        **payload: JSON-serialisable handler arguments
+
+    Returns:
+        Job instance
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job = Job(kind=kind, payload=payload, created_by=user)
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+
+    if getattr(settings, "ACADEMIC_JOBS_EAGER", False):
+        job = claim_job(job.pk, worker_name())
+        run_job(job)
+    return job
+
+
+def claim_job(pk, worker):
+    """
+    Take the lease on one job if it is still claimable
+
+    Returns:
+        The claimed Job, or None if another worker got there first
+    """
+    job = Job.objects.filter(pk=pk).first()
+    if job is None:
+        return None
+
+    now = timezone.now()
+    claimable = job.status == Job.QUEUED or (
+        job.status == Job.RUNNING and job.lease_expires_at and job.lease_expires_at < now
+    )
+    if not claimable or job.attempts >= job.max_attempts:
+        return None
+
+    # Compare-and-set: only one worker can move the row on from what we read
+    claimed = Job.objects.filter(
+        pk=pk, status=job.status, attempts=job.attempts, worker=job.worker
+    ).update(
+        status=Job.RUNNING,
+        worker=worker,
+        attempts=job.attempts + 1,
+        lease_expires_at=now + timedelta(seconds=lease_seconds()),
+        started_at=now,
+        error="",
+    )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def expire_abandoned_jobs():
+    """Fail jobs whose worker died on their final attempt"""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        lease_expires_at__lt=timezone.now(),
+        attempts__gte=F("max_attempts"),
+    ).update(
+        status=Job.FAILED,
+        error="The worker running this job stopped responding.",
+        finished_at=timezone.now(),
+    )
+
+
+def claim_next_job(worker, batch=10):
+    """
+    Claim the oldest available job
+
+    Args:
+        worker: Name recorded on the lease
+        batch: Number of candidates to try before giving up
+
+    Returns:
+        Job instance or None when nothing is available
+    """
+    expire_abandoned_jobs()
+    candidates = (
+        Job.objects.filter(
+            Q(status=Job.QUEUED)
+            | Q(status=Job.RUNNING, lease_expires_at__lt=timezone.now())
+        )
+        .order_by("created_at", "pk")
+        .values_list("pk", flat=True)[:batch]
+    )
+    for pk in candidates:
+        job = claim_job(pk, worker)
+        if job is not None:
+            return job
+    return None
+
+
+class JobContext:
+    """Handed to handlers so they can report progress and attach output files"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def progress(self, done, total=None, message=None):
+        """Record progress and renew the lease"""
+        job = self.job
+        job.progress_done = done
+        if total is not None:
+            job.progress_total = total
+        if message is not None:
+            job.message = message[:255]
+        job.lease_expires_at = timezone.now() + timedelta(seconds=lease_seconds())
+        Job.objects.filter(pk=job.pk, worker=job.worker).update(
+            progress_done=job.progress_done,
+            progress_total=job.progress_total,
+            message=job.message,
+            lease_expires_at=job.lease_expires_at,
+        )
+
+    def save_result_file(self, name, content):
+        """Store bytes as the job's downloadable output"""
+        self.job.result_file.save(name, ContentFile(content), save=False)
+        Job.objects.filter(pk=self.job.pk).update(result_file=self.job.result_file.name)
+
+
+def finish_job(job, **fields):
+    """
+    Record a job's outcome, but only if this worker still holds its lease
+
+    A worker whose lease expired may finish after another worker claimed the
+    job again; its outcome is then dropped rather than overwriting the newer
+    attempt's status.
+
+    Returns:
+        True if the outcome was saved
+    """
+    saved = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, worker=job.worker, attempts=job.attempts
+    ).update(**fields)
+    if not saved:
+        logger.warning("Job %s lost its lease before finishing", job.pk)
+        job.refresh_from_db()
+        return False
+
+    for field, value in fields.items():
+        setattr(job, field, value)
+    return True
+
+
+def delete_input_file(job):
+    """Remove the uploaded input of a job that will not run again"""
+    if job.input_file:
+        job.input_file.delete(save=False)
+        Job.objects.filter(pk=job.pk).update(input_file="")
+
+
+def run_job(job):
+    """
+    Execute a claimed job and record its outcome
+
+    Failed jobs go back to the queue until ``max_attempts`` is reached;
+    JobError failures are final since retrying will not help. The input file
+    is deleted once the job will not run again.
+    """
+    handler = HANDLERS.get(job.kind)
+    context = JobContext(job)
+    try:
+        if handler is None:
+            raise JobError(f"Unknown job kind: {job.kind}")
+        result = handler(context, **job.payload) or {}
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        final = isinstance(e, JobError) or job.attempts >= job.max_attempts
+        saved = finish_job(
+            job,
+            status=Job.FAILED if final else Job.QUEUED,
+            error=str(e) or e.__class__.__name__,
+            finished_at=timezone.now() if final else None,
+            worker="",
+            lease_expires_at=None,
+        )
+        if saved and final:
+            delete_input_file(job)
+        return job
+
+    if finish_job(
+        job,
+        status=Job.SUCCEEDED,
+        result=result,
+        message=result.get("message", job.message)[:255],
+        progress_done=max(job.progress_done, job.progress_total),
+        finished_at=timezone.now(),
+        lease_expires_at=None,
+    ):
+        delete_input_file(job)
+    return job
+
+
+def retention_days():
+    return getattr(settings, "ACADEMIC_JOBS_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+
+
+def purge_finished_jobs():
+    """
+    Delete jobs that finished more than ``ACADEMIC_JOBS_RETENTION_DAYS`` ago
+
+    Their files are removed from storage by a post_delete signal.
+
+    Returns:
+        Number of jobs deleted
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days())
+    _, deleted = Job.objects.filter(
+        status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted.get(Job._meta.label, 0)
+
+
+# ============================================
+# HANDLERS
+# ============================================
+
+
+@job_handler("recalculate_results")
+def recalculate_results(context, term_id, classroom_id):
+    term = Term.objects.get(pk=term_id)
+    classroom = ClassRoom.objects.get(pk=classroom_id)
+    summary = calculate_class_results(term, classroom)
+    summary["message"] = (
+        f"{summary['total']} term results recalculated for {classroom} "
+        f"({summary['created']} new)."
+    )
+    return summary
+
+
+@job_handler("generate_report_cards")
+def generate_report_cards(context, term_id, classroom_id, report_data=None):
+    term = Term.objects.get(pk=term_id)
+    classroom = ClassRoom.objects.get(pk=classroom_id)
+    # JSON object keys are strings; the generator expects student ids
+    report_data = {int(pk): values for pk, values in (report_data or {}).items()}
+
+    with transaction.atomic():
+        generated = generate_class_report_cards(term, classroom, report_data)
+    return {
+        "generated": generated,
+        "message": f"{generated} report cards generated successfully!",
+    }
+
+
+@job_handler("export_report_cards")
+def export_report_cards(context, term_id):
+    term = Term.objects.get(pk=term_id)
+    buffer = io.BytesIO()
+    rows = write_report_cards_workbook(term, buffer)
+    context.save_result_file(f"{term}_report_cards.xlsx", buffer.getvalue())
+    return {"rows": rows, "message": f"Exported {rows} report cards for {term}."}
+
+
+@job_handler("import_scores")
+def import_scores(context, assessment_id):
+    assessment = Assessment.objects.get(pk=assessment_id)
+    importer = ScoreImport(
+        assessment,
+        context.job.created_by,
+        progress=lambda rows: context.progress(rows, message=f"{rows} rows read"),
+    )
+
+    with context.job.input_file.open("rb") as file:
+        try:
+            with transaction.atomic():
+                importer.run(file)
+        except ScoreImportError as e:
+            raise JobError(str(e))
+
+    if importer.errors:
+        report = io.StringIO()
+        writer = csv.writer(report)
+        writer.writerow(ERROR_REPORT_COLUMNS)
+        writer.writerows(importer.errors)
+        context.save_result_file(
+            f"score_import_errors_{assessment.id}.csv", report.getvalue().encode()
+        )
+
+    message = f"{importer.imported} scores imported successfully!"
+    if importer.errors:
+        message += f" {len(importer.errors)} rows had errors."
+    return {
+        "assessment": assessment.id,
+        "imported": importer.imported,
+        "errors": len(importer.errors),
+        "error_rows": importer.errors[:10],
+        "message": message,
+    }
+
+
+@job_handler("warm_report_card_pdfs")
+def warm_report_card_pdfs(context, report_card_ids):
+    rendered = 0
+    cards = ReportCard.objects.filter(pk__in=report_card_ids)
+    summaries = warm_report_summaries(
+        set(cards.values_list("student_id", flat=True))
+    )
+    # An eager job runs inside the request, which must not fork a pool
+    workers = 1 if getattr(settings, "ACADEMIC_JOBS_EAGER", False) else None
+    for _, done, total in warm_pdf_cache(cards, workers):
+        context.progress(done, total)
+        rendered = done
+    return {
+        "rendered": rendered,
+        "summaries": summaries,
+        "message": f"Rendered {rendered} report card PDF(s) and refreshed "
+        f"{summaries} report summaries.",
+    }
@@ -1,82 +1,193 @@
-from django.core.management.base import BaseCommand
-from django.db.models import Avg, Max, Min
-from django.db import transaction
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, time as day_start
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from academics.models import ClassRoom, StudentScore, Term
+from academics.results import calculate_class_results
+
+
+def recalculate_classroom(term_id, classroom_id):
+    """
+    Recalculate one classroom (runs inside a worker process)
+
+    Returns:
+        Tuple of (classroom_id, summary dict, elapsed seconds)
+    """
+    started = time.monotonic()
+    term = Term.objects.get(pk=term_id)
+    classroom = ClassRoom.objects.get(pk=classroom_id)
+    summary = calculate_class_results(term, classroom)
+    return classroom_id, summary, time.monotonic() - started
+
 
-from academics.models import Term, ClassRoom, SubjectAssignment, Assessment, StudentScore, TermResult
+def _close_inherited_connections():
+    # Forked workers must not share the parent's database sockets
+    connections.close_all()
 
 
 class Command(BaseCommand):
-    help = "Calculate term results for all classes in the current term (demo helper)."
+    help = (
+        "Calculate term results class by class in the current (or given) term. "
+        "Each class is recalculated in its own short transaction, in parallel "
+        "across worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--term", type=int, help="Term id to calculate (defaults to the current term)"
+        )
+        parser.add_argument(
+            "--classroom",
+            type=int,
+            action="append",
+            dest="classrooms",
+            help="Classroom id to calculate (repeatable)",
+        )
+        parser.add_argument(
+            "--changed-since",
+            help=(
+                "Only classes with scores saved at or after this ISO date/datetime. "
+                "Deleted scores are not tracked; run without this filter after deletions."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes (default: CPU count)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the classes that would be recalculated without writing",
+        )
 
     def handle(self, *args, **options):
-        term = Term.objects.filter(is_current=True).first()
-        if not term:
-            self.stdout.write(self.style.ERROR("No current term found."))
+        term = self.get_term(options["term"])
+        classrooms = self.get_classrooms(term, options)
+
+        if not classrooms:
+            self.stdout.write(self.style.NOTICE("No classes to recalculate."))
             return
 
-        classrooms = ClassRoom.objects.filter(session__is_current=True)
-        total_results = 0
+        if options["dry_run"]:
+            for classroom in classrooms:
+                self.stdout.write(
+                    f"Would recalculate {classroom} ({classroom.student_count} students)"
+                )
+            self.stdout.write(
+                self.style.SUCCESS(f"Dry run: {len(classrooms)} class(es) in {term}.")
+            )
+            return
 
-        with transaction.atomic():
+        workers = max(1, min(options["workers"], len(classrooms)))
+        if workers > 1 and connection.vendor == "sqlite":
+            # SQLite serialises writers, so extra processes only add lock waits
+            self.stdout.write(
+                self.style.NOTICE("SQLite database detected; running serially.")
+            )
+            workers = 1
+
+        started = time.monotonic()
+        names = {classroom.id: str(classroom) for classroom in classrooms}
+        totals = {"created": 0, "updated": 0, "total": 0}
+        failures = 0
+
+        for classroom_id, summary, elapsed, error in self.run(
+            term, classrooms, workers
+        ):
+            if error:
+                failures += 1
+                self.stderr.write(
+                    self.style.ERROR(f"{names[classroom_id]}: failed ({error})")
+                )
+                continue
+            for key in totals:
+                totals[key] += summary[key]
+            self.stdout.write(
+                f"{names[classroom_id]}: {summary['total']} results "
+                f"({summary['created']} new, {summary['updated']} updated) "
+                f"in {elapsed:.2f}s"
+            )
+
+        style = self.style.WARNING if failures else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"Calculated {len(classrooms) - failures}/{len(classrooms)} classes "
+                f"in {term} using {workers} worker(s): {totals['total']} results, "
+                f"{totals['created']} new, in {time.monotonic() - started:.2f}s."
+            )
+        )
+
+    def run(self, term, classrooms, workers):
+        """Yield (classroom_id, summary, elapsed, error) per class as it finishes"""
+        if workers == 1:
             for classroom in classrooms:
-                assignments = SubjectAssignment.objects.filter(classroom=classroom, term=term)
-                students = classroom.students.all()
-
-                for assignment in assignments:
-                    assessments = Assessment.objects.filter(assignment=assignment)
-
-                    for student in students:
-                        ca_scores = StudentScore.objects.filter(
-                            assessment__in=assessments.exclude(assessment_type__code="EXAM"),
-                            student=student,
-                        )
-                        ca_total = sum(
-                            (s.score / s.assessment.max_score) * s.assessment.assessment_type.weight
-                            for s in ca_scores
-                            if s.score is not None
-                        )
-
-                        exam_assessment = assessments.filter(assessment_type__code="EXAM").first()
-                        exam_score = 0
-                        if exam_assessment:
-                            exam_score_obj = StudentScore.objects.filter(
-                                assessment=exam_assessment, student=student
-                            ).first()
-                            if exam_score_obj and exam_assessment.max_score:
-                                exam_score = (exam_score_obj.score / exam_assessment.max_score) * 60
-
-                        term_result, created = TermResult.objects.update_or_create(
-                            student=student,
-                            subject=assignment.subject,
-                            term=term,
-                            classroom=classroom,
-                            defaults={
-                                "ca_total": ca_total,
-                                "exam_score": exam_score,
-                            },
-                        )
-                        total_results += 1 if created else 0
-
-                    # After creating results for this subject, update class stats and positions
-                    subject_results = TermResult.objects.filter(
-                        subject=assignment.subject, term=term, classroom=classroom
-                    )
-                    if subject_results.exists():
-                        stats = subject_results.aggregate(
-                            avg=Avg("total_score"),
-                            max_score=Max("total_score"),
-                            min_score=Min("total_score"),
-                        )
-                        subject_results.update(
-                            class_average=stats["avg"],
-                            highest_score=stats["max_score"],
-                            lowest_score=stats["min_score"],
-                        )
-                        for position, result in enumerate(subject_results.order_by("-total_score"), start=1):
-                            result.position = position
-                            result.save(update_fields=["position"])
-
-        self.stdout.write(self.style.SUCCESS(f"Calculated/updated results. New results created: {total_results}"))
+                try:
+                    yield (*recalculate_classroom(term.id, classroom.id), None)
+                except Exception as exc:
+                    yield classroom.id, None, 0, exc
+            return
+
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_close_inherited_connections
+        ) as pool:
+            futures = {
+                pool.submit(recalculate_classroom, term.id, classroom.id): classroom.id
+                for classroom in classrooms
+            }
+            for future in as_completed(futures):
+                try:
+                    yield (*future.result(), None)
+                except Exception as exc:
+                    yield futures[future], None, 0, exc
+
+    def get_term(self, term_id):
+        if term_id:
+            term = Term.objects.filter(pk=term_id).select_related("session").first()
+        else:
+            term = Term.objects.filter(is_current=True).select_related("session").first()
+        if not term:
+            raise CommandError("Term not found." if term_id else "No current term found.")
+        return term
+
+    def get_classrooms(self, term, options):
+        classrooms = ClassRoom.objects.filter(session=term.session)
+        if options["classrooms"]:
+            classrooms = classrooms.filter(pk__in=options["classrooms"])
+
+        if options["changed_since"]:
+            since = self.parse_since(options["changed_since"])
+            changed = (
+                StudentScore.objects.filter(
+                    updated_at__gte=since, assessment__assignment__term=term
+                )
+                .values("assessment__assignment__classroom_id")
+                .order_by()
+            )
+            classrooms = classrooms.filter(pk__in=changed)
 
+        return list(
+            classrooms.annotate(student_count=Count("students")).order_by("level", "arm")
+        )
 
+    def parse_since(self, value):
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(
+                    f"Invalid --changed-since value {value!r}; use YYYY-MM-DD or an ISO datetime."
+                )
+            moment = datetime.combine(day, day_start.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
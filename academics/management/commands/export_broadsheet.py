@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.broadsheet import (
+    broadsheet_csv,
+    load_broadsheets,
+    write_broadsheet_workbook,
+)
+from academics.models import ClassRoom, Term
+
+
+class Command(BaseCommand):
+    help = "Export class broadsheets (master score sheets) to Excel or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Output file (.xlsx or .csv)")
+        parser.add_argument(
+            "--term", type=int, help="Term id (defaults to the current term)"
+        )
+        parser.add_argument(
+            "--classroom",
+            type=int,
+            action="append",
+            help="Classroom id (repeatable)",
+        )
+        parser.add_argument(
+            "--level", help="Every class of this level in the session, e.g. JSS1"
+        )
+
+    def handle(self, *args, **options):
+        if options["term"]:
+            term = Term.objects.filter(pk=options["term"]).first()
+        else:
+            term = Term.objects.filter(is_current=True).first()
+        if not term:
+            raise CommandError("Term not found.")
+
+        classrooms = ClassRoom.objects.filter(session=term.session_id)
+        if options["classroom"]:
+            classrooms = classrooms.filter(pk__in=options["classroom"])
+        if options["level"]:
+            classrooms = classrooms.filter(level=options["level"])
+        classrooms = list(classrooms)
+        if not classrooms:
+            raise CommandError("No matching classes.")
+
+        broadsheets = load_broadsheets(term, classrooms)
+        output = options["output"]
+        if output.endswith(".csv"):
+            if len(broadsheets) > 1:
+                raise CommandError("CSV holds one class; use .xlsx for several.")
+            with open(output, "w", newline="") as file:
+                file.writelines(broadsheet_csv(broadsheets[0]))
+            rows = len(broadsheets[0].rows)
+        else:
+            with open(output, "wb") as file:
+                rows = write_broadsheet_workbook(broadsheets, file)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {rows} student row(s) from {len(broadsheets)} class(es) "
+                f"to {output}."
+            )
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import Term
+from academics.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the per class-subject result rollups used by analytics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--term",
+            type=int,
+            action="append",
+            help="Term id to rebuild (repeatable; default: every term)",
+        )
+
+    def handle(self, *args, **options):
+        terms = None
+        if options["term"]:
+            terms = Term.objects.filter(pk__in=options["term"])
+            if len(terms) != len(set(options["term"])):
+                raise CommandError("Term not found.")
+
+        written = rebuild_rollups(terms)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} result rollup(s)."))
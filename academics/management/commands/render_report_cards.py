@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import ClassRoom, Term
+from academics.pdf import render_class_pdfs, stream_zip
+
+
+class Command(BaseCommand):
+    help = "Render every report card of a class to PDF and write them into one ZIP file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--classroom", type=int, required=True, help="Classroom id")
+        parser.add_argument(
+            "--term", type=int, help="Term id (defaults to the current term)"
+        )
+        parser.add_argument(
+            "--output", help="ZIP file to write (default: report_cards_<class>.zip)"
+        )
+        parser.add_argument(
+            "--workers", type=int, help="Number of worker processes (default: CPU count)"
+        )
+
+    def handle(self, *args, **options):
+        if options["term"]:
+            term = Term.objects.filter(pk=options["term"]).first()
+        else:
+            term = Term.objects.filter(is_current=True).first()
+        if not term:
+            raise CommandError("Term not found.")
+
+        classroom = ClassRoom.objects.filter(pk=options["classroom"]).first()
+        if not classroom:
+            raise CommandError("Classroom not found.")
+
+        output = options["output"] or f"report_cards_{classroom}.zip"
+
+        rendered = 0
+
+        def progress(pdfs):
+            nonlocal rendered
+            for filename, pdf, done, total in pdfs:
+                self.stdout.write(f"[{done}/{total}] {filename}")
+                rendered = done
+                yield filename, pdf
+
+        pdfs = render_class_pdfs(term, classroom, options["workers"])
+        with open(output, "wb") as archive:
+            for chunk in stream_zip(progress(pdfs)):
+                archive.write(chunk)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {rendered} report card(s) for {classroom} to {output}.")
+        )
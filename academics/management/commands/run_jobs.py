@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from academics.jobs import claim_next_job, purge_finished_jobs, run_job, worker_name
+
+# Seconds between purges of finished jobs past their retention period
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Run queued academic background jobs (report cards, exports, imports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every job currently queued, then exit",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--max-jobs", type=int, help="Exit after running this many jobs"
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        processed = 0
+        self.stdout.write(f"Worker {worker} started.")
+        purged_at = None
+
+        while options["max_jobs"] is None or processed < options["max_jobs"]:
+            if purged_at is None or time.monotonic() - purged_at > PURGE_INTERVAL:
+                purged = purge_finished_jobs()
+                purged_at = time.monotonic()
+                if purged:
+                    self.stdout.write(f"Purged {purged} finished job(s).")
+
+            job = claim_next_job(worker)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            self.stdout.write(f"Running {job}...")
+            job = run_job(job)
+            processed += 1
+            style = self.style.SUCCESS if job.status == job.SUCCEEDED else self.style.ERROR
+            self.stdout.write(style(f"{job}: {job.error or job.message}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import ReportCard, Term
+from academics.pdf import warm_pdf_cache
+
+
+class Command(BaseCommand):
+    help = "Render and cache PDFs of published report cards that are not cached yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--term", type=int, help="Term id (defaults to the current term)"
+        )
+        parser.add_argument(
+            "--classroom",
+            type=int,
+            action="append",
+            help="Classroom id (repeatable; default: every class)",
+        )
+        parser.add_argument(
+            "--workers", type=int, help="Number of worker processes (default: CPU count)"
+        )
+
+    def handle(self, *args, **options):
+        if options["term"]:
+            term = Term.objects.filter(pk=options["term"]).first()
+        else:
+            term = Term.objects.filter(is_current=True).first()
+        if not term:
+            raise CommandError("Term not found.")
+
+        report_cards = ReportCard.objects.filter(term=term)
+        if options["classroom"]:
+            report_cards = report_cards.filter(classroom_id__in=options["classroom"])
+
+        rendered = 0
+        workers = options["workers"] or os.cpu_count()
+        for filename, done, total in warm_pdf_cache(report_cards, workers):
+            self.stdout.write(f"[{done}/{total}] {filename}")
+            rendered = done
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Cached {rendered} report card PDF(s) for {term}.")
+        )
@@ -0,0 +1,246 @@
+# academics/matrix.py
+"""
+Results Matrix
+
+Loads a class's scores once into NumPy arrays (students x assessments) and
+derives every term-result figure in vectorized passes:
+
+    normalised = scores / max_score                  (students x assessments)
+    ca_total   = normalised @ ca_weights             (students x subjects)
+    exam_score = normalised @ exam_weights           (students x subjects)
+
+Totals, grades, subject positions, class statistics and overall averages are
+then column/row operations over those arrays. The result engine, broadsheet
+and analytics all read from here so the grading rules live in one place.
+"""
+
+import numpy as np
+
+from records.models import Student
+from .models import (
+    FAIL_GRADE,
+    TERM_GRADE_BOUNDARIES,
+    Assessment,
+    StudentScore,
+    SubjectAssignment,
+)
+
+EXAM_CODE = "EXAM"
+EXAM_WEIGHT = 60
+
+GRADES = [grade for _, grade in TERM_GRADE_BOUNDARIES] + [FAIL_GRADE]
+
+# np.digitize wants ascending bins; index 0 (below the lowest bound) is the F
+_GRADE_BINS = np.array([lower for lower, _ in reversed(TERM_GRADE_BOUNDARIES)])
+_GRADE_LABELS = np.array([FAIL_GRADE] + [g for _, g in reversed(TERM_GRADE_BOUNDARIES)])
+
+
+def round_half_up(values):
+    """
+    Round to two decimal places, halves away from zero (as Decimal ROUND_HALF_UP)
+
+    The small epsilon absorbs binary representation error, e.g. 2.675 which is
+    stored as 2.67499999...
+    """
+    return np.floor(np.asarray(values, dtype=float) * 100 + 0.5 + 1e-9) / 100
+
+
+def grade_array(totals):
+    """
+    Letter grades for an array of total scores
+
+    Args:
+        totals: Array-like of scores (0-100)
+
+    Returns:
+        NumPy array of grade letters with the same shape
+    """
+    return _GRADE_LABELS[np.digitize(np.asarray(totals, dtype=float), _GRADE_BINS)]
+
+
+def grade_counts(totals):
+    """
+    Count scores per letter grade
+
+    Args:
+        totals: Array-like of scores (0-100)
+
+    Returns:
+        Dictionary mapping each grade (A-F) to a count
+    """
+    indexes = np.digitize(np.array(list(totals), dtype=float), _GRADE_BINS)
+    counts = np.bincount(indexes, minlength=len(_GRADE_LABELS))
+    labels = [str(label) for label in _GRADE_LABELS]
+    return {grade: int(counts[labels.index(grade)]) for grade in GRADES}
+
+
+def competition_ranks(values, axis=0):
+    """
+    Rank values in descending order, ties sharing the best position (1, 2, 2, 4)
+
+    Args:
+        values: 1-D or 2-D array
+        axis: Axis along which to rank (0 ranks each column independently)
+
+    Returns:
+        Integer array of ranks with the same shape as ``values``
+    """
+    values = np.asarray(values, dtype=float)
+    # Rank = 1 + number of strictly greater values in the same column/row
+    ordered = np.sort(-values, axis=axis)
+    if values.ndim == 1:
+        return np.searchsorted(ordered, -values, side="left") + 1
+
+    moved = np.moveaxis(values, axis, 0)
+    ordered = np.moveaxis(ordered, axis, 0)
+    ranks = np.empty(moved.shape, dtype=int)
+    for column in range(moved.shape[1]):
+        ranks[:, column] = (
+            np.searchsorted(ordered[:, column], -moved[:, column], side="left") + 1
+        )
+    return np.moveaxis(ranks, 0, axis)
+
+
+class ResultsMatrix:
+    """
+    Term results for one classroom held as students x subjects arrays
+
+    Attributes:
+        student_ids: Row labels
+        subject_ids: Column labels
+        ca_total, exam_score, total_score: float arrays, rounded to 2 places
+        grades: array of grade letters
+        positions: competition rank within each subject column
+        class_average, highest_score, lowest_score: per-subject vectors
+        student_average: per-student mean over all subjects
+        overall_positions: competition rank of student_average
+    """
+
+    def __init__(self, student_ids, subject_ids, scores, max_scores, ca_weights, exam_weights):
+        self.student_ids = list(student_ids)
+        self.subject_ids = list(subject_ids)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalised = np.where(max_scores > 0, scores / max_scores, 0.0)
+
+        self.ca_total = round_half_up(normalised @ ca_weights)
+        self.exam_score = round_half_up(normalised @ exam_weights)
+        # Rounded again so totals that display alike also rank alike
+        self.total_score = round_half_up(self.ca_total + self.exam_score)
+        self.grades = grade_array(self.total_score)
+
+        if self.total_score.size:
+            self.positions = competition_ranks(self.total_score, axis=0)
+            self.class_average = round_half_up(self.total_score.mean(axis=0))
+            self.highest_score = self.total_score.max(axis=0)
+            self.lowest_score = self.total_score.min(axis=0)
+            self.student_average = round_half_up(self.total_score.mean(axis=1))
+            self.overall_positions = competition_ranks(self.student_average)
+        else:
+            empty = np.zeros(len(self.subject_ids))
+            self.positions = np.zeros(self.total_score.shape, dtype=int)
+            self.class_average = self.highest_score = self.lowest_score = empty
+            self.student_average = np.zeros(len(self.student_ids))
+            self.overall_positions = np.zeros(len(self.student_ids), dtype=int)
+
+    @classmethod
+    def load(cls, term, classroom, subject_ids=None):
+        """
+        Build the matrix for a classroom/term with four queries
+
+        Every student on the roster gets a row and every assigned subject a
+        column; missing scores count as zero. Only the most recent EXAM
+        assessment of each subject contributes to the exam score.
+
+        Args:
+            term: Term object or id
+            classroom: ClassRoom object or id
+            subject_ids: Optional iterable restricting the subject columns
+
+        Returns:
+            ResultsMatrix instance
+        """
+        classroom_id = getattr(classroom, "pk", classroom)
+        student_ids = list(
+            Student.objects.filter(classroom_id=classroom_id).values_list(
+                "id", flat=True
+            )
+        )
+        assignments = SubjectAssignment.objects.filter(
+            classroom_id=classroom_id, term=term
+        )
+        assessments = Assessment.objects.filter(
+            assignment__term=term, assignment__classroom_id=classroom_id
+        )
+        if subject_ids is not None:
+            assignments = assignments.filter(subject_id__in=subject_ids)
+            assessments = assessments.filter(assignment__subject_id__in=subject_ids)
+        subject_ids = list(assignments.values_list("subject_id", flat=True))
+
+        assessments = list(
+            assessments.order_by("assignment_id", "-date", "-id").values_list(
+                "id",
+                "assignment__subject_id",
+                "max_score",
+                "assessment_type__code",
+                "assessment_type__weight",
+            )
+        )
+
+        subject_index = {subject_id: i for i, subject_id in enumerate(subject_ids)}
+        assessment_index = {}
+        max_scores = np.zeros(len(assessments))
+        ca_weights = np.zeros((len(assessments), len(subject_ids)))
+        exam_weights = np.zeros((len(assessments), len(subject_ids)))
+        subjects_with_exam = set()
+
+        for column, (pk, subject_id, max_score, code, weight) in enumerate(assessments):
+            assessment_index[pk] = column
+            max_scores[column] = float(max_score or 0)
+            subject = subject_index.get(subject_id)
+            if subject is None:
+                continue
+            if code == EXAM_CODE:
+                # Ordered newest first, so the first exam seen is the one used
+                if subject_id not in subjects_with_exam:
+                    exam_weights[column, subject] = EXAM_WEIGHT
+                    subjects_with_exam.add(subject_id)
+            else:
+                ca_weights[column, subject] = float(weight)
+
+        scores = np.zeros((len(student_ids), len(assessments)))
+        if student_ids and assessments:
+            student_index = {student_id: i for i, student_id in enumerate(student_ids)}
+            rows = StudentScore.objects.filter(
+                assessment_id__in=assessment_index, student__classroom_id=classroom_id
+            ).values_list("student_id", "assessment_id", "score").order_by()
+            for student_id, assessment_id, score in rows:
+                scores[student_index[student_id], assessment_index[assessment_id]] = float(
+                    score
+                )
+
+        return cls(student_ids, subject_ids, scores, max_scores, ca_weights, exam_weights)
+
+    def _figures(self, row, column):
+        return {
+            "ca_total": self.ca_total[row, column],
+            "exam_score": self.exam_score[row, column],
+            "total_score": self.total_score[row, column],
+            "grade": str(self.grades[row, column]),
+            "position": int(self.positions[row, column]),
+            "class_average": self.class_average[column],
+            "highest_score": self.highest_score[column],
+            "lowest_score": self.lowest_score[column],
+        }
+
+    def cell(self, student_id, subject_id):
+        """Return a dictionary of figures for one (student, subject) pair"""
+        return self._figures(
+            self.student_ids.index(student_id), self.subject_ids.index(subject_id)
+        )
+
+    def cells(self):
+        """Yield (student_id, subject_id, figures) for every cell of the matrix"""
+        for row, student_id in enumerate(self.student_ids):
+            for column, subject_id in enumerate(self.subject_ids):
+                yield student_id, subject_id, self._figures(row, column)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0008_alter_assessment_options_alter_studentscore_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportcard',
+            name='average_score',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name='reportcard',
+            name='out_of',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='reportcard',
+            name='position',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='reportcard',
+            name='total_score',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=6),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:39
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def build_rollups(apps, schema_editor):
+    TermResult = apps.get_model("academics", "TermResult")
+    SubjectResultRollup = apps.get_model("academics", "SubjectResultRollup")
+
+    rows = (
+        TermResult.objects.order_by()
+        .values("term_id", "classroom_id", "subject_id")
+        .annotate(
+            result_count=Count("id"),
+            score_sum=Sum("total_score"),
+            highest_score=Max("total_score"),
+            lowest_score=Min("total_score"),
+            pass_count=Count("id", filter=Q(total_score__gte=40)),
+            **{
+                f"grade_{grade.lower()}": Count("id", filter=Q(grade=grade))
+                for grade in "ABCDEF"
+            },
+        )
+    )
+    SubjectResultRollup.objects.bulk_create(
+        [
+            SubjectResultRollup(
+                **row,
+                average_score=(row["score_sum"] / row["result_count"]).quantize(
+                    Decimal("0.01"), rounding=ROUND_HALF_UP
+                ),
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0010_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectResultRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('average_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('highest_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('lowest_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('pass_count', models.PositiveIntegerField(default=0)),
+                ('grade_a', models.PositiveIntegerField(default=0)),
+                ('grade_b', models.PositiveIntegerField(default=0)),
+                ('grade_c', models.PositiveIntegerField(default=0)),
+                ('grade_d', models.PositiveIntegerField(default=0)),
+                ('grade_e', models.PositiveIntegerField(default=0)),
+                ('grade_f', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='academics.classroom')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='academics.subject')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='academics.term')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'subject'], name='academics_s_term_id_32b80a_idx')],
+                'unique_together': {('term', 'classroom', 'subject')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,21 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+# Lower bound of each letter grade, highest first; anything below is an F
+TERM_GRADE_BOUNDARIES = [(75, "A"), (65, "B"), (55, "C"), (45, "D"), (40, "E")]
+SCORE_GRADE_BOUNDARIES = [(80, "A"), (70, "B"), (60, "C"), (50, "D"), (40, "E")]
+FAIL_GRADE = "F"
+# Lowest passing total: the bottom of the E band
+PASS_MARK = TERM_GRADE_BOUNDARIES[-1][0]
+
+
+def grade_for(value, boundaries=TERM_GRADE_BOUNDARIES):
+    """Return the letter grade for a score on the given grade scale"""
+    for lower, grade in boundaries:
+        if value >= lower:
+            return grade
+    return FAIL_GRADE
+
 
 class AcademicSession(models.Model):
     """Academic Year/Session"""
@@ -282,19 +297,7 @@ class StudentScore(models.Model):
 
     def calculate_grade(self):
         """Calculate grade based on percentage"""
-        pct = self.percentage
-        if pct >= 80:
-            return "A"
-        elif pct >= 70:
-            return "B"
-        elif pct >= 60:
-            return "C"
-        elif pct >= 50:
-            return "D"
-        elif pct >= 40:
-            return "E"
-        else:
-            return "F"
+        return grade_for(self.percentage, SCORE_GRADE_BOUNDARIES)
 
     def is_locked(self):
         """Check if this score is locked (assessment is locked)"""
@@ -306,10 +309,14 @@ class StudentScore(models.Model):
             return user.is_superuser
         return True
 
-    def save(self, *args, **kwargs):
-        """Auto-calculate percentage and grade before saving"""
+    def update_derived(self):
+        """Derive percentage and grade from the score"""
         self.percentage = self.calculate_percentage()
         self.grade = self.calculate_grade()
+
+    def save(self, *args, **kwargs):
+        """Auto-calculate percentage and grade before saving"""
+        self.update_derived()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -357,22 +364,15 @@ class TermResult(models.Model):
 
     def calculate_grade(self):
         """Calculate grade from total score"""
-        if self.total_score >= 75:
-            return "A"
-        elif self.total_score >= 65:
-            return "B"
-        elif self.total_score >= 55:
-            return "C"
-        elif self.total_score >= 45:
-            return "D"
-        elif self.total_score >= 40:
-            return "E"
-        else:
-            return "F"
+        return grade_for(self.total_score, TERM_GRADE_BOUNDARIES)
 
-    def save(self, *args, **kwargs):
+    def update_totals(self):
+        """Derive total score and grade from the CA and exam components"""
         self.total_score = self.ca_total + self.exam_score
         self.grade = self.calculate_grade()
+
+    def save(self, *args, **kwargs):
+        self.update_totals()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -383,6 +383,58 @@ class TermResult(models.Model):
         ordering = ["-term__session__start_date", "student__surname"]
 
 
+class SubjectResultRollup(models.Model):
+    """
+    Precomputed TermResult statistics for one subject in one class and term
+
+    Maintained by academics.rollups whenever the underlying TermResults change,
+    so dashboards aggregate one row per class-subject instead of one per student.
+    """
+
+    term = models.ForeignKey(Term, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+
+    result_count = models.PositiveIntegerField(default=0)
+    score_sum = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    highest_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    lowest_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    pass_count = models.PositiveIntegerField(default=0)
+
+    # Grade histogram
+    grade_a = models.PositiveIntegerField(default=0)
+    grade_b = models.PositiveIntegerField(default=0)
+    grade_c = models.PositiveIntegerField(default=0)
+    grade_d = models.PositiveIntegerField(default=0)
+    grade_e = models.PositiveIntegerField(default=0)
+    grade_f = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def fail_count(self):
+        return self.result_count - self.pass_count
+
+    @property
+    def pass_rate(self):
+        return self.pass_count / self.result_count * 100 if self.result_count else 0
+
+    @property
+    def grade_distribution(self):
+        return {
+            grade: getattr(self, f"grade_{grade.lower()}")
+            for grade in ["A", "B", "C", "D", "E", "F"]
+        }
+
+    def __str__(self):
+        return f"{self.subject.name} - {self.classroom} ({self.term})"
+
+    class Meta:
+        unique_together = ["term", "classroom", "subject"]
+        indexes = [models.Index(fields=["term", "subject"])]
+
+
 class ReportCard(models.Model):
     """Full term report card for a student with comprehensive tracking and workflow support"""
 
@@ -409,10 +461,10 @@ class ReportCard(models.Model):
     classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
 
     # Overall stats
-    total_score = models.DecimalField(max_digits=6, decimal_places=2)
-    average_score = models.DecimalField(max_digits=5, decimal_places=2)
-    position = models.IntegerField()
-    out_of = models.IntegerField()  # Total students in class
+    total_score = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    position = models.IntegerField(default=0)
+    out_of = models.IntegerField(default=0)  # Total students in class
 
     # Attendance
     days_present = models.IntegerField(default=0)
@@ -680,3 +732,80 @@ class Timetable(models.Model):
     class Meta:
         ordering = ["classroom", "day_of_week", "period_number"]
         unique_together = ["classroom", "day_of_week", "period_number", "term"]
+
+
+class Job(models.Model):
+    """Long-running academic operation executed by a background worker"""
+
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    SUCCEEDED = "Succeeded"
+    FAILED = "Failed"
+
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    KIND_CHOICES = [
+        ("recalculate_results", "Recalculate term results"),
+        ("generate_report_cards", "Generate report cards"),
+        ("export_report_cards", "Export report cards"),
+        ("import_scores", "Import scores"),
+        ("warm_report_card_pdfs", "Render report card PDFs"),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to="jobs/input/", blank=True)
+    result_file = models.FileField(upload_to="jobs/results/", blank=True)
+
+    # Progress reported by the handler while it runs
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    # Lease held by the worker running the job; an expired lease means the
+    # worker died and the job may be claimed again
+    worker = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="academic_jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @property
+    def progress_percent(self):
+        if self.status == self.SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(100, round(self.progress_done * 100 / self.progress_total))
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["created_by", "-created_at"]),
+        ]
@@ -0,0 +1,415 @@
+# academics/pdf.py
+"""
+Report Card PDF Rendering
+
+Report cards are rendered to HTML in the calling process (cheap, and the only
+step that needs the database) and laid out to PDF by WeasyPrint. Each worker
+process parses the shared stylesheet and builds its font configuration once,
+then reuses them for every card it renders. Background batches are fanned out
+over a small process pool; requests render in their own process. Either way
+cards are streamed into a ZIP archive as each PDF completes.
+
+PDFs of published report cards are cached on disk under a content hash of the
+card, its term results and the template sources, so repeat downloads are a
+file send and any edit produces a new key.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template, render_to_string
+from django.utils.text import slugify
+
+from .models import ReportCard, TermResult
+
+HTML_TEMPLATE = "academics/report_card_pdf.html"
+CSS_TEMPLATE = "academics/report_card_pdf.css"
+# Worker processes for batch rendering outside requests; kept small since each
+# holds a WeasyPrint instance
+DEFAULT_WORKERS = 2
+
+
+class PdfRenderer:
+    """WeasyPrint renderer holding a parsed stylesheet and font configuration"""
+
+    def __init__(self, css_text):
+        # Imported lazily so the rest of the app works without WeasyPrint
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.font_config = FontConfiguration()
+        self.stylesheet = CSS(string=css_text, font_config=self.font_config)
+
+    def render(self, html):
+        from weasyprint import HTML
+
+        return HTML(string=html).write_pdf(
+            stylesheets=[self.stylesheet], font_config=self.font_config
+        )
+
+
+_renderer = None
+
+
+def get_renderer(css_text=None):
+    """Return this process's renderer, creating it on first use"""
+    global _renderer
+    if _renderer is None:
+        _renderer = PdfRenderer(css_text or get_template(CSS_TEMPLATE).render())
+    return _renderer
+
+
+def render_pdf(html, css_text=None):
+    """Lay out one report card's HTML to PDF bytes"""
+    return get_renderer(css_text).render(html)
+
+
+def _init_worker(css_text):
+    # Workers only lay out HTML; the parent closed its connections before
+    # forking, so none are inherited and any query would open a fresh one
+    get_renderer(css_text)
+
+
+def _render_job(job):
+    filename, html = job
+    return filename, render_pdf(html)
+
+
+def report_card_filename(report_card):
+    """Download name for a report card PDF"""
+    return (
+        f"report_card_{report_card.student.admission_no}_"
+        f"{slugify(str(report_card.term))}.pdf"
+    )
+
+
+def render_report_card_html(report_card, term_results):
+    """Render the report card template for one card"""
+    return render_to_string(
+        HTML_TEMPLATE,
+        {"report_card": report_card, "term_results": term_results},
+    )
+
+
+def load_report_cards(report_cards):
+    """
+    Load report cards with their term results in two queries
+
+    Args:
+        report_cards: ReportCard queryset
+
+    Returns:
+        List of (ReportCard, [TermResult, ...]) in queryset order
+    """
+    cards = list(
+        report_cards.select_related("student", "classroom", "term__session")
+    )
+    results = {}
+    for result in (
+        TermResult.objects.filter(
+            term_id__in={card.term_id for card in cards},
+            student_id__in={card.student_id for card in cards},
+        )
+        .select_related("subject")
+        .order_by("subject__name")
+    ):
+        results.setdefault((result.student_id, result.term_id), []).append(result)
+
+    return [
+        (card, results.get((card.student_id, card.term_id), [])) for card in cards
+    ]
+
+
+def class_report_cards(term, classroom):
+    """
+    Load a class's report cards and their term results in two queries
+
+    Returns:
+        List of (ReportCard, [TermResult, ...]) ordered by student name
+    """
+    return load_report_cards(
+        ReportCard.objects.filter(term=term, classroom=classroom).order_by(
+            "student__surname", "student__other_name"
+        )
+    )
+
+
+def render_report_card_pdf(report_card):
+    """
+    Render a single report card to PDF, bypassing the cache
+
+    Returns:
+        Tuple of (filename, pdf bytes)
+    """
+    term_results = (
+        TermResult.objects.filter(student=report_card.student, term=report_card.term)
+        .select_related("subject")
+        .order_by("subject__name")
+    )
+    html = render_report_card_html(report_card, term_results)
+    return report_card_filename(report_card), render_pdf(html)
+
+
+def render_jobs(jobs, workers=None):
+    """
+    Lay out (name, html) jobs to PDF, yielding each one as it completes
+
+    Args:
+        jobs: List of (name, html) tuples
+        workers: Number of worker processes (defaults to the
+            REPORT_CARD_PDF_WORKERS setting, then DEFAULT_WORKERS); 1 renders
+            in this process
+
+    Yields:
+        Tuples of (name, pdf bytes, done, total)
+
+    Raises:
+        RuntimeError: If a pool is needed inside a database transaction
+    """
+    total = len(jobs)
+    if workers is None:
+        workers = getattr(settings, "REPORT_CARD_PDF_WORKERS", DEFAULT_WORKERS)
+    workers = max(1, min(workers or 1, total))
+
+    if workers == 1:
+        for done, job in enumerate(jobs, start=1):
+            yield (*_render_job(job), done, total)
+        return
+
+    # Forked workers must not share the parent's database sockets, and closing
+    # them would break an open transaction
+    if any(conn.in_atomic_block for conn in connections.all(initialized_only=True)):
+        raise RuntimeError("PDF worker processes cannot start inside a transaction.")
+    css_text = get_template(CSS_TEMPLATE).render()
+    # The parent reconnects on its next query
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(css_text,)
+    ) as pool:
+        futures = [pool.submit(_render_job, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            yield (*future.result(), done, total)
+
+
+def render_class_pdfs(term, classroom, workers=None):
+    """
+    Render every report card of a class, yielding each PDF as it completes
+
+    Published cards already in the PDF cache are read from disk; newly
+    rendered published cards are added to it.
+
+    Args:
+        term: Term object
+        classroom: ClassRoom object
+        workers: Number of worker processes
+
+    Yields:
+        Tuples of (filename, pdf bytes, done, total)
+    """
+    loaded = class_report_cards(term, classroom)
+    total = len(loaded)
+    done = 0
+    jobs = []
+    pending = {}
+
+    for card, results in loaded:
+        filename = report_card_filename(card)
+        digest = report_card_digest(card, results) if is_cacheable(card) else None
+        path = cached_pdf_path(card, digest) if digest else None
+        if path and path.exists():
+            done += 1
+            yield filename, path.read_bytes(), done, total
+            continue
+        jobs.append((filename, render_report_card_html(card, results)))
+        pending[filename] = (card, digest)
+
+    for filename, pdf, _, _ in render_jobs(jobs, workers):
+        card, digest = pending[filename]
+        if digest:
+            store_pdf(card, digest, pdf)
+        done += 1
+        yield filename, pdf, done, total
+
+
+# ============================================
+# RENDERED PDF CACHE
+# ============================================
+
+
+def pdf_cache_dir():
+    """Directory holding cached report card PDFs, one sub-directory per card"""
+    return Path(
+        getattr(
+            settings,
+            "REPORT_CARD_PDF_CACHE_DIR",
+            Path(settings.BASE_DIR) / "cache" / "report_cards",
+        )
+    )
+
+
+@lru_cache(maxsize=1)
+def template_version():
+    """Hash of the report card HTML and CSS template sources"""
+    digest = hashlib.sha256()
+    for name in (HTML_TEMPLATE, CSS_TEMPLATE):
+        digest.update(get_template(name).template.source.encode())
+    return digest.hexdigest()
+
+
+def is_cacheable(report_card):
+    """Only published cards are cached; drafts change too often to be worth it"""
+    return report_card.status == "Published"
+
+
+def report_card_digest(report_card, term_results):
+    """
+    Content hash of everything a report card PDF is rendered from
+
+    Covers every ReportCard column, the related names printed on the card,
+    each TermResult row and the template version.
+    """
+    card = {
+        field.attname: field.value_to_string(report_card)
+        for field in ReportCard._meta.concrete_fields
+    }
+    card.update(
+        student=report_card.student.full_name,
+        admission_no=report_card.student.admission_no,
+        term=str(report_card.term),
+        classroom=str(report_card.classroom),
+    )
+    results = [
+        [
+            result.subject.name,
+            str(result.ca_total),
+            str(result.exam_score),
+            str(result.total_score),
+            result.grade,
+            result.position,
+        ]
+        for result in term_results
+    ]
+    payload = json.dumps(
+        [template_version(), card, results], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cached_pdf_path(report_card, digest):
+    return pdf_cache_dir() / str(report_card.pk) / f"{digest}.pdf"
+
+
+def store_pdf(report_card, digest, pdf):
+    """Write a rendered PDF to the cache, replacing older versions of the card"""
+    path = cached_pdf_path(report_card, digest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for stale in path.parent.glob("*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+    # Write then rename so a concurrent reader never sees a partial file
+    temporary = path.with_suffix(f".{os.getpid()}.tmp")
+    temporary.write_bytes(pdf)
+    os.replace(temporary, path)
+    return path
+
+
+def clear_pdf_cache(report_card_id):
+    """Remove every cached PDF of a report card"""
+    shutil.rmtree(pdf_cache_dir() / str(report_card_id), ignore_errors=True)
+
+
+def cached_report_card_pdf(report_card):
+    """
+    Return a published report card's PDF from the cache, rendering it on a miss
+
+    Returns:
+        Tuple of (filename, Path to the cached PDF)
+    """
+    term_results = list(
+        TermResult.objects.filter(student=report_card.student, term=report_card.term)
+        .select_related("subject")
+        .order_by("subject__name")
+    )
+    digest = report_card_digest(report_card, term_results)
+    path = cached_pdf_path(report_card, digest)
+    if not path.exists():
+        html = render_report_card_html(report_card, term_results)
+        store_pdf(report_card, digest, render_pdf(html))
+    return report_card_filename(report_card), path
+
+
+def warm_pdf_cache(report_cards, workers=None):
+    """
+    Render and cache PDFs for published report cards that are not cached yet
+
+    Args:
+        report_cards: ReportCard queryset
+        workers: Number of worker processes
+
+    Yields:
+        Tuples of (filename, done, total) for each newly rendered card
+    """
+    jobs = []
+    pending = {}
+    for card, results in load_report_cards(report_cards.filter(status="Published")):
+        digest = report_card_digest(card, results)
+        if cached_pdf_path(card, digest).exists():
+            continue
+        key = str(card.pk)
+        jobs.append((key, render_report_card_html(card, results)))
+        pending[key] = (card, digest)
+
+    for key, pdf, done, total in render_jobs(jobs, workers):
+        card, digest = pending[key]
+        store_pdf(card, digest, pdf)
+        yield report_card_filename(card), done, total
+
+
+class _ZipBuffer:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def stream_zip(pdfs):
+    """
+    Stream (filename, pdf bytes, ...) tuples into ZIP archive chunks
+
+    The archive is produced incrementally, so a response can start sending
+    before every PDF has been rendered.
+
+    Yields:
+        Bytes chunks of the ZIP file
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, pdf, *_ in pdfs:
+            archive.writestr(filename, pdf)
+            yield from buffer.drain()
+    yield from buffer.drain()
@@ -0,0 +1,200 @@
+# academics/ranking.py
+"""
+Ranking Service
+
+Assigns class positions for subject results and report cards. Ranks are
+computed with a SQL window function (RANK/DENSE_RANK OVER ...) when the
+database supports it, with an equivalent Python fallback, and are written
+back for a whole class in one bulk update.
+"""
+
+from django.db import connections, router
+from django.db.models import Avg, F, Sum, Window
+from django.db.models.functions import DenseRank, Rank
+
+from .matrix import round_half_up
+from .models import ReportCard, TermResult
+
+COMPETITION = "competition"  # 1, 2, 2, 4
+DENSE = "dense"  # 1, 2, 2, 3
+
+RANK_FUNCTIONS = {
+    COMPETITION: Rank,
+    DENSE: DenseRank,
+}
+
+
+def supports_window_ranking(model):
+    """Check whether the database used for ``model`` supports OVER clauses"""
+    connection = connections[router.db_for_read(model)]
+    return connection.features.supports_over_clause
+
+
+def rank_values(items, method=COMPETITION):
+    """
+    Rank (key, value) pairs in descending order of value
+
+    Args:
+        items: Iterable of (key, value) tuples
+        method: COMPETITION (1, 2, 2, 4) or DENSE (1, 2, 2, 3)
+
+    Returns:
+        Dictionary mapping key to rank
+    """
+    if method not in RANK_FUNCTIONS:
+        raise ValueError(f"Unknown ranking method: {method}")
+
+    ranks = {}
+    last_value = None
+    last_rank = 0
+    for index, (key, value) in enumerate(
+        sorted(items, key=lambda item: item[1], reverse=True), start=1
+    ):
+        if value != last_value:
+            last_rank = index if method == COMPETITION else last_rank + 1
+            last_value = value
+        ranks[key] = last_rank
+    return ranks
+
+
+def _window(method, order_by, partition_by=None):
+    return Window(
+        expression=RANK_FUNCTIONS[method](),
+        partition_by=partition_by,
+        order_by=order_by.desc(),
+    )
+
+
+def _write_positions(model, rows, ranks):
+    """Bulk update ``position`` for rows whose rank changed"""
+    changed = [
+        model(pk=pk, position=ranks[pk])
+        for pk, current in rows
+        if ranks[pk] != current
+    ]
+    if changed:
+        model.objects.bulk_update(changed, ["position"], batch_size=500)
+    return len(changed)
+
+
+def rank_term_results(term, classroom, subject_ids=None, method=COMPETITION):
+    """
+    Assign TermResult.position within each subject of a class
+
+    Args:
+        term: Term object
+        classroom: ClassRoom object
+        subject_ids: Optional iterable restricting the subjects re-ranked
+        method: COMPETITION or DENSE
+
+    Returns:
+        Number of rows whose position changed
+    """
+    results = TermResult.objects.filter(term=term, classroom=classroom).order_by()
+    if subject_ids is not None:
+        results = results.filter(subject_id__in=subject_ids)
+
+    if supports_window_ranking(TermResult):
+        rows = results.annotate(
+            rank=_window(method, F("total_score"), partition_by=[F("subject_id")])
+        ).values_list("id", "position", "rank")
+        ranks = {}
+        current = []
+        for pk, position, rank in rows:
+            ranks[pk] = rank
+            current.append((pk, position))
+    else:
+        by_subject = {}
+        current = []
+        for pk, position, subject_id, total in results.values_list(
+            "id", "position", "subject_id", "total_score"
+        ):
+            by_subject.setdefault(subject_id, []).append((pk, total))
+            current.append((pk, position))
+        ranks = {}
+        for items in by_subject.values():
+            ranks.update(rank_values(items, method))
+
+    return _write_positions(TermResult, current, ranks)
+
+
+def class_standings(term, classroom, method=COMPETITION):
+    """
+    Total, average (rounded to two places) and rank of every student in a
+    class in one grouped query
+
+    Args:
+        term: Term object
+        classroom: ClassRoom object
+        method: COMPETITION or DENSE
+
+    Returns:
+        Dictionary mapping student_id to a dict with total, average and position
+    """
+    rows = list(
+        TermResult.objects.filter(term=term, classroom=classroom)
+        .values("student_id")
+        .annotate(total=Sum("total_score"), average=Avg("total_score"))
+        .order_by()
+    )
+
+    # Ranked on the average as printed, like ResultsMatrix.overall_positions,
+    # so students who tie on the card share a position
+    averages = round_half_up([row["average"] for row in rows])
+    for row, average in zip(rows, averages):
+        row["average"] = float(average)
+    ranks = rank_values(
+        ((row["student_id"], row["average"]) for row in rows), method
+    )
+    for row in rows:
+        row["position"] = ranks[row["student_id"]]
+    return {row["student_id"]: row for row in rows}
+
+
+def class_average_ranks(term, classroom, method=COMPETITION):
+    """
+    Rank students in a class by their average TermResult total
+
+    Args:
+        term: Term object
+        classroom: ClassRoom object
+        method: COMPETITION or DENSE
+
+    Returns:
+        Dictionary mapping student_id to rank
+    """
+    return {
+        student_id: row["position"]
+        for student_id, row in class_standings(term, classroom, method).items()
+    }
+
+
+def rank_report_cards(term, classroom, method=COMPETITION):
+    """
+    Assign ReportCard.position for a class by average score
+
+    Args:
+        term: Term object
+        classroom: ClassRoom object
+        method: COMPETITION or DENSE
+
+    Returns:
+        Number of report cards whose position changed
+    """
+    cards = ReportCard.objects.filter(term=term, classroom=classroom).order_by()
+
+    if supports_window_ranking(ReportCard):
+        rows = cards.annotate(rank=_window(method, F("average_score"))).values_list(
+            "id", "position", "rank"
+        )
+        ranks = {}
+        current = []
+        for pk, position, rank in rows:
+            ranks[pk] = rank
+            current.append((pk, position))
+    else:
+        rows = list(cards.values_list("id", "position", "average_score"))
+        ranks = rank_values(((pk, average) for pk, _, average in rows), method)
+        current = [(pk, position) for pk, position, _ in rows]
+
+    return _write_positions(ReportCard, current, ranks)
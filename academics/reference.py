@@ -0,0 +1,72 @@
+# academics/reference.py
+"""
+Reference Data
+
+The current term and session, the subjects, the current session's classrooms
+and the assessment type weights are read by almost every page but change only
+a few times a term. They are loaded together in one cache entry tagged with
+their models, so saving or deleting any of those rows (see academics.signals)
+rebuilds the entry on the next read, in every process sharing the cache.
+"""
+
+from records.cache import cached, model_tag
+
+from .models import AcademicSession, AssessmentType, ClassRoom, Subject, Term
+
+REFERENCE_MODELS = (AcademicSession, Term, Subject, ClassRoom, AssessmentType)
+REFERENCE_TIMEOUT = 60 * 60
+
+
+def load_reference_data():
+    """
+    Query the reference data
+
+    Returns:
+        Dictionary with "current_term" (session preloaded), "current_session",
+        "subjects" and "classrooms" (id -> object, in display order; classrooms
+        of the current session only), "assessment_types" and
+        "assessment_weights" (code -> weight)
+    """
+    current_term = (
+        Term.objects.filter(is_current=True).select_related("session").first()
+    )
+    current_session = AcademicSession.objects.filter(is_current=True).first()
+    assessment_types = list(AssessmentType.objects.order_by("weight"))
+    return {
+        "current_term": current_term,
+        "current_session": current_session,
+        "subjects": {
+            subject.pk: subject for subject in Subject.objects.order_by("name")
+        },
+        "classrooms": {
+            classroom.pk: classroom
+            for classroom in ClassRoom.objects.filter(
+                session=current_session
+            ).order_by("level", "arm")
+        }
+        if current_session
+        else {},
+        "assessment_types": assessment_types,
+        "assessment_weights": {kind.code: kind.weight for kind in assessment_types},
+    }
+
+
+def reference_data():
+    """Cached reference data, as returned by ``load_reference_data``"""
+    return cached(
+        "academics.reference",
+        {},
+        [model_tag(model) for model in REFERENCE_MODELS],
+        load_reference_data,
+        timeout=REFERENCE_TIMEOUT,
+    )
+
+
+def get_current_term():
+    """The current Term with its session loaded, or None"""
+    return reference_data()["current_term"]
+
+
+def get_current_session():
+    """The current AcademicSession, or None"""
+    return reference_data()["current_session"]
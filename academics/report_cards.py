@@ -0,0 +1,231 @@
+# academics/report_cards.py
+"""
+Report Card Generation
+
+Builds every ReportCard of a class from one grouped TermResult query (total,
+average and window-function rank per student), merges in the data teachers
+prepared per student (remarks, attendance, skill ratings) and writes the whole
+class with a single bulk upsert, so the query count does not grow with class
+size.
+"""
+
+from decimal import Decimal
+
+from records.cache import invalidate_for
+
+from .excel import NAME_WIDTH, REMARKS_WIDTH, add_sheet, full_name, new_workbook
+from .models import ReportCard
+from .ranking import class_standings
+from .results import to_decimal
+from .utils import bulk_upsert
+
+STANDING_FIELDS = ["classroom", "total_score", "average_score", "position", "out_of"]
+
+REMARK_FIELDS = ["class_teacher_remarks", "principal_remarks"]
+ATTENDANCE_FIELDS = ["days_present", "days_absent"]
+SKILL_FIELDS = [
+    "punctuality",
+    "attendance_in_class",
+    "honesty",
+    "neatness",
+    "discipline",
+    "participation",
+    "handwriting",
+    "sports_and_games",
+    "creative_skills",
+]
+
+# Columns of the term export workbook, as (header, width)
+REPORT_CARD_COLUMNS = [
+    ("Admission No", None),
+    ("Student Name", NAME_WIDTH),
+    ("Class", 8),
+    ("Total Score", None),
+    ("Average Score", None),
+    ("Position", None),
+    ("Days Present", None),
+    ("Days Absent", None),
+    ("Class Teacher Remarks", REMARKS_WIDTH),
+    ("Principal Remarks", REMARKS_WIDTH),
+]
+
+REPORT_DATA_FIELDS = REMARK_FIELDS + ATTENDANCE_FIELDS + SKILL_FIELDS
+
+# Form field prefixes that differ from the model field name
+POST_PREFIXES = {"class_teacher_remarks": "remarks"}
+
+
+def parse_report_data(data, student_ids):
+    """
+    Collect per-student report card data from POSTed form fields
+
+    Fields are named ``<field>_<student_id>`` (``remarks_<id>`` for the class
+    teacher's remarks). Only fields actually submitted are returned so that
+    missing inputs never blank out previously prepared data.
+
+    Args:
+        data: QueryDict or dictionary of submitted values
+        student_ids: Iterable of student ids to collect
+
+    Returns:
+        Dictionary mapping student_id to {field: value}
+    """
+    report_data = {}
+    for student_id in student_ids:
+        values = {}
+        for field in REPORT_DATA_FIELDS:
+            key = f"{POST_PREFIXES.get(field, field)}_{student_id}"
+            if key not in data:
+                continue
+            value = data.get(key, "")
+            if field in REMARK_FIELDS:
+                values[field] = value.strip()
+            else:
+                try:
+                    values[field] = int(value or 0)
+                except (TypeError, ValueError):
+                    continue
+        if values:
+            report_data[student_id] = values
+    return report_data
+
+
+def attendance_percentage(days_present, days_absent):
+    """Percentage of school days attended, rounded to two places"""
+    total_days = days_present + days_absent
+    if total_days <= 0:
+        return Decimal("0.00")
+    return to_decimal(days_present / total_days * 100)
+
+
+def generate_class_report_cards(term, classroom, report_data=None, student_ids=None):
+    """
+    Create or update report cards for a class in a constant number of queries
+
+    Only students with term results get a report card, as before.
+
+    Args:
+        term: Term object
+        classroom: ClassRoom object
+        report_data: Optional {student_id: {field: value}} to merge in
+        student_ids: Optional iterable restricting which cards are written
+            (positions are still ranked against the whole class)
+
+    Returns:
+        Number of report cards written
+    """
+    report_data = report_data or {}
+    standings = class_standings(term, classroom)
+    if student_ids is not None:
+        student_ids = set(student_ids)
+        standings = {
+            student_id: row
+            for student_id, row in standings.items()
+            if student_id in student_ids
+        }
+    if not standings:
+        return 0
+
+    out_of = classroom.students.count()
+    existing = {
+        card.student_id: card
+        for card in ReportCard.objects.filter(
+            term=term, student_id__in=standings
+        ).order_by()
+    }
+
+    cards = []
+    for student_id, row in standings.items():
+        card = existing.get(student_id) or ReportCard(student_id=student_id, term=term)
+        card.classroom = classroom
+        card.total_score = to_decimal(row["total"])
+        card.average_score = to_decimal(row["average"])
+        card.position = row["position"]
+        card.out_of = out_of
+
+        for field, value in report_data.get(student_id, {}).items():
+            setattr(card, field, value)
+        card.attendance_percentage = attendance_percentage(
+            card.days_present, card.days_absent
+        )
+        cards.append(card)
+
+    bulk_upsert(
+        ReportCard,
+        cards,
+        unique_fields=["student", "term"],
+        update_fields=STANDING_FIELDS + REPORT_DATA_FIELDS + ["attendance_percentage"],
+    )
+    invalidate_for(ReportCard, "student", standings)
+    return len(cards)
+
+
+def write_report_cards_workbook(term, file):
+    """
+    Write every report card of a term to an Excel workbook
+
+    Args:
+        term: Term object
+        file: Binary file object to write the .xlsx to
+
+    Returns:
+        Number of report cards written
+    """
+    rows = (
+        ReportCard.objects.filter(term=term)
+        .order_by("classroom__level", "classroom__arm", "position")
+        .values_list(
+            "student__admission_no",
+            "student__surname",
+            "student__other_name",
+            "classroom__level",
+            "classroom__arm",
+            "total_score",
+            "average_score",
+            "position",
+            "out_of",
+            "days_present",
+            "days_absent",
+            "class_teacher_remarks",
+            "principal_remarks",
+        )
+        .iterator(chunk_size=2000)
+    )
+
+    workbook = new_workbook()
+    count = add_sheet(
+        workbook,
+        "Report Cards",
+        REPORT_CARD_COLUMNS,
+        (
+            [
+                admission_no,
+                full_name(surname, other_name),
+                f"{level}{arm}",
+                total,
+                average,
+                f"{position}/{out_of}",
+                present,
+                absent,
+                teacher_remarks,
+                principal_remarks,
+            ]
+            for (
+                admission_no,
+                surname,
+                other_name,
+                level,
+                arm,
+                total,
+                average,
+                position,
+                out_of,
+                present,
+                absent,
+                teacher_remarks,
+                principal_remarks,
+            ) in rows
+        ),
+    )
+    workbook.save(file)
+    return count
@@ -0,0 +1,253 @@
+# academics/results.py
+"""
+Term Result Engine
+
+Computes CA totals, exam scores, grades, class statistics and positions for a
+whole classroom/term from a ResultsMatrix, then writes TermResult rows with a
+single bulk upsert, then refreshes the class's subject rollups.
+
+Score edits made after a class has been calculated are applied incrementally:
+each StudentScore change marks its (student, subject, term) result as dirty and
+the pending set is refreshed once, when the surrounding transaction commits,
+from a ResultsMatrix narrowed to the affected subjects.
+"""
+
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Avg, Max, Min
+
+from records.cache import invalidate_for
+
+from .matrix import ResultsMatrix
+from .models import Assessment, StudentScore, TermResult
+from .ranking import rank_term_results
+from .rollups import refresh_rollups
+from .utils import bulk_upsert
+
+TWO_PLACES = Decimal("0.01")
+
+SCORE_UPDATE_FIELDS = ["ca_total", "exam_score", "total_score", "grade"]
+
+RESULT_UPDATE_FIELDS = [
+    "classroom",
+    "ca_total",
+    "exam_score",
+    "total_score",
+    "grade",
+    "class_average",
+    "highest_score",
+    "lowest_score",
+    "position",
+]
+
+
+def to_decimal(value):
+    """Round a float/Decimal score to two decimal places"""
+    return Decimal(str(value or 0)).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def calculate_class_results(term, classroom):
+    """
+    Calculate and save term results for every student and subject in a class
+
+    Students without scores in a subject still get a zero result, matching the
+    report card layout which lists every assigned subject.
+
+    Args:
+        term: Term object
+        classroom: ClassRoom object
+
+    Returns:
+        Dictionary with created, updated and total row counts
+    """
+    matrix = ResultsMatrix.load(term, classroom)
+    if not matrix.student_ids or not matrix.subject_ids:
+        return {"created": 0, "updated": 0, "total": 0}
+
+    existing = TermResult.objects.filter(
+        term=term,
+        student_id__in=matrix.student_ids,
+        subject_id__in=matrix.subject_ids,
+    ).count()
+
+    results = [
+        TermResult(
+            student_id=student_id,
+            subject_id=subject_id,
+            term=term,
+            classroom=classroom,
+            ca_total=to_decimal(figures["ca_total"]),
+            exam_score=to_decimal(figures["exam_score"]),
+            total_score=to_decimal(figures["total_score"]),
+            grade=figures["grade"],
+            position=figures["position"],
+            class_average=to_decimal(figures["class_average"]),
+            highest_score=to_decimal(figures["highest_score"]),
+            lowest_score=to_decimal(figures["lowest_score"]),
+        )
+        for student_id, subject_id, figures in matrix.cells()
+    ]
+
+    with transaction.atomic():
+        bulk_upsert(
+            TermResult,
+            results,
+            unique_fields=["student", "subject", "term"],
+            update_fields=RESULT_UPDATE_FIELDS,
+        )
+        refresh_rollups(term, classroom)
+        invalidate_for(TermResult, "term", [term.pk])
+
+    return {"created": len(results) - existing, "updated": existing, "total": len(results)}
+
+
+# ============================================
+# INCREMENTAL MAINTENANCE
+# ============================================
+
+_pending = threading.local()
+
+
+def _pending_keys():
+    if not hasattr(_pending, "keys"):
+        _pending.keys = set()
+    return _pending.keys
+
+
+def mark_scores_dirty(pairs):
+    """
+    Queue a TermResult refresh for changed scores
+
+    The refresh runs when the current transaction commits (immediately in
+    autocommit mode), so saving a whole grid inside one transaction coalesces
+    into a single update per class.
+
+    Args:
+        pairs: Iterable of (student_id, assessment_id) tuples
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+
+    targets = {
+        assessment_id: (term_id, classroom_id, subject_id)
+        for assessment_id, term_id, classroom_id, subject_id in Assessment.objects.filter(
+            id__in={assessment_id for _, assessment_id in pairs}
+        ).values_list(
+            "id",
+            "assignment__term_id",
+            "assignment__classroom_id",
+            "assignment__subject_id",
+        )
+    }
+
+    invalidate_for(
+        StudentScore, "term", {term_id for term_id, _, _ in targets.values()}
+    )
+
+    keys = _pending_keys()
+    for student_id, assessment_id in pairs:
+        if assessment_id in targets:
+            term_id, classroom_id, subject_id = targets[assessment_id]
+            keys.add((term_id, classroom_id, student_id, subject_id))
+
+    # Every mark registers a callback; the first one to run drains the queue
+    # and the rest are no-ops. A rolled-back transaction only leaves extra keys
+    # behind, which are recomputed from the database on the next flush.
+    transaction.on_commit(flush_dirty_results)
+
+
+def flush_dirty_results():
+    """Refresh every TermResult queued by mark_scores_dirty"""
+    keys = _pending_keys()
+    _pending.keys = set()
+    if keys:
+        refresh_term_results(keys)
+
+
+def refresh_class_statistics(term, classroom, subject_ids):
+    """
+    Recompute class_average, highest_score and lowest_score for some subjects
+
+    Args:
+        term: Term object or id
+        classroom: ClassRoom object or id
+        subject_ids: Iterable of subject ids to refresh
+    """
+    results = TermResult.objects.filter(term=term, classroom=classroom)
+    stats = (
+        results.filter(subject_id__in=subject_ids)
+        .values("subject_id")
+        .annotate(
+            avg=Avg("total_score"),
+            max_score=Max("total_score"),
+            min_score=Min("total_score"),
+        )
+        .order_by()
+    )
+    for row in stats:
+        results.filter(subject_id=row["subject_id"]).update(
+            class_average=to_decimal(row["avg"]),
+            highest_score=row["max_score"],
+            lowest_score=row["min_score"],
+        )
+
+
+def refresh_term_results(keys):
+    """
+    Recompute existing TermResult rows and their class statistics
+
+    Only rows that already exist are refreshed; classes that have not been
+    calculated yet are left to calculate_class_results.
+
+    Args:
+        keys: Iterable of (term_id, classroom_id, student_id, subject_id) tuples
+
+    Returns:
+        Number of TermResult rows refreshed
+    """
+    groups = {}
+    for term_id, classroom_id, student_id, subject_id in keys:
+        groups.setdefault((term_id, classroom_id), set()).add((student_id, subject_id))
+
+    refreshed = 0
+    with transaction.atomic():
+        for (term_id, classroom_id), pairs in groups.items():
+            student_ids = {student_id for student_id, _ in pairs}
+            subject_ids = {subject_id for _, subject_id in pairs}
+
+            results = [
+                result
+                for result in TermResult.objects.filter(
+                    term_id=term_id,
+                    classroom_id=classroom_id,
+                    student_id__in=student_ids,
+                    subject_id__in=subject_ids,
+                ).order_by()
+                if (result.student_id, result.subject_id) in pairs
+            ]
+            if not results:
+                continue
+
+            # The same weighting and exam choice as calculate_class_results
+            matrix = ResultsMatrix.load(term_id, classroom_id, subject_ids)
+            cells = {
+                (student_id, subject_id): figures
+                for student_id, subject_id, figures in matrix.cells()
+            }
+            for result in results:
+                figures = cells.get((result.student_id, result.subject_id), {})
+                result.ca_total = to_decimal(figures.get("ca_total"))
+                result.exam_score = to_decimal(figures.get("exam_score"))
+                result.update_totals()
+
+            TermResult.objects.bulk_update(results, SCORE_UPDATE_FIELDS)
+            refresh_class_statistics(term_id, classroom_id, subject_ids)
+            rank_term_results(term_id, classroom_id, subject_ids=subject_ids)
+            refresh_rollups(term_id, classroom_id, subject_ids)
+            invalidate_for(TermResult, "term", [term_id])
+            refreshed += len(results)
+
+    return refreshed
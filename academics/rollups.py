@@ -0,0 +1,130 @@
+# academics/rollups.py
+"""
+Subject Result Rollups
+
+Keeps one SubjectResultRollup row per (term, classroom, subject) holding the
+count, sum, mean, min, max, pass count and grade histogram of its TermResults.
+The result engine refreshes the affected rollups after every write, and single
+TermResult saves/deletes do the same through signals, so dashboards can read
+one row per class-subject instead of re-aggregating every student's result.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, Max, Min, Q, Sum
+
+from .models import (
+    FAIL_GRADE,
+    PASS_MARK,
+    TERM_GRADE_BOUNDARIES,
+    SubjectResultRollup,
+    TermResult,
+)
+from .utils import bulk_upsert
+
+GRADE_FIELDS = {
+    grade: f"grade_{grade.lower()}"
+    for grade in [grade for _, grade in TERM_GRADE_BOUNDARIES] + [FAIL_GRADE]
+}
+
+ROLLUP_UPDATE_FIELDS = [
+    "result_count",
+    "score_sum",
+    "average_score",
+    "highest_score",
+    "lowest_score",
+    "pass_count",
+    *GRADE_FIELDS.values(),
+    "updated_at",
+]
+
+
+def aggregate_rollups(results):
+    """
+    Build unsaved rollups from a TermResult queryset in one grouped query
+
+    Args:
+        results: TermResult queryset
+
+    Returns:
+        List of SubjectResultRollup instances, one per (term, classroom, subject)
+    """
+    rows = (
+        results.order_by()
+        .values("term_id", "classroom_id", "subject_id")
+        .annotate(
+            result_count=Count("id"),
+            score_sum=Sum("total_score"),
+            highest_score=Max("total_score"),
+            lowest_score=Min("total_score"),
+            pass_count=Count("id", filter=Q(total_score__gte=PASS_MARK)),
+            **{
+                field: Count("id", filter=Q(grade=grade))
+                for grade, field in GRADE_FIELDS.items()
+            },
+        )
+    )
+    return [
+        SubjectResultRollup(
+            **row,
+            average_score=(row["score_sum"] / row["result_count"]).quantize(
+                Decimal("0.01"), rounding=ROUND_HALF_UP
+            ),
+        )
+        for row in rows
+    ]
+
+
+def refresh_rollups(term, classroom, subject_ids=None):
+    """
+    Recompute the rollups of a class, or of some of its subjects
+
+    Rollups whose TermResults have all gone are deleted.
+
+    Args:
+        term: Term object or id
+        classroom: ClassRoom object or id
+        subject_ids: Optional iterable of subject ids to refresh
+
+    Returns:
+        Number of rollups written
+    """
+    results = TermResult.objects.filter(term=term, classroom=classroom)
+    existing = SubjectResultRollup.objects.filter(term=term, classroom=classroom)
+    if subject_ids is not None:
+        subject_ids = set(subject_ids)
+        results = results.filter(subject_id__in=subject_ids)
+        existing = existing.filter(subject_id__in=subject_ids)
+
+    rollups = aggregate_rollups(results)
+    existing.exclude(subject_id__in=[rollup.subject_id for rollup in rollups]).delete()
+    if rollups:
+        bulk_upsert(
+            SubjectResultRollup,
+            rollups,
+            unique_fields=["term", "classroom", "subject"],
+            update_fields=ROLLUP_UPDATE_FIELDS,
+        )
+    return len(rollups)
+
+
+def rebuild_rollups(terms=None):
+    """
+    Recompute every rollup from scratch
+
+    Args:
+        terms: Optional Term queryset/iterable to restrict the rebuild
+
+    Returns:
+        Number of rollups written
+    """
+    results = TermResult.objects.all()
+    rollups = SubjectResultRollup.objects.all()
+    if terms is not None:
+        results = results.filter(term__in=terms)
+        rollups = rollups.filter(term__in=terms)
+
+    rollups.delete()
+    fresh = aggregate_rollups(results)
+    SubjectResultRollup.objects.bulk_create(fresh, batch_size=500)
+    return len(fresh)
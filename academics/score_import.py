@@ -0,0 +1,204 @@
+# academics/score_import.py
+"""
+Score Import Pipeline
+
+Streams CSV/XLSX uploads in fixed-size chunks instead of loading the whole
+sheet into a DataFrame. For each chunk, admission numbers are resolved with
+one in_bulk query, scores are validated against the assessment maximum as a
+NumPy array, and valid rows are written with a batched upsert. Every rejected
+row is collected for a downloadable error report.
+"""
+
+import csv
+import io
+from itertools import islice
+
+import numpy as np
+from openpyxl import load_workbook
+
+from records.models import Student
+from .scores import build_score, save_scores, parse_score
+
+CHUNK_SIZE = 500
+
+REQUIRED_COLUMNS = ["admission_no", "score"]
+ERROR_REPORT_COLUMNS = ["row", "admission_no", "score", "error"]
+
+
+class ScoreImportError(Exception):
+    """Raised when an upload cannot be read at all (bad format or headers)"""
+
+
+def _clean(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _rows_from_header(rows):
+    """Turn an iterator of cell tuples into (row_number, dict) pairs"""
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ScoreImportError("The uploaded file is empty.")
+
+    columns = [_clean(name).lower() for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ScoreImportError(f"Missing required column(s): {', '.join(missing)}")
+
+    # Row 1 is the header, so data starts on row 2 as in a spreadsheet
+    for number, cells in enumerate(rows, start=2):
+        row = {name: _clean(cell) for name, cell in zip(columns, cells) if name}
+        if any(row.values()):
+            yield number, row
+
+
+def read_rows(file):
+    """
+    Yield (row_number, row_dict) from an uploaded CSV or Excel file lazily
+
+    Args:
+        file: Uploaded file object
+
+    Returns:
+        Generator of (int, dict) pairs with lower-cased column names
+    """
+    name = file.name.lower()
+
+    if name.endswith(".csv"):
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        return _rows_from_header(csv.reader(text))
+
+    if name.endswith(".xlsx"):
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        return _rows_from_header(workbook.active.iter_rows(values_only=True))
+
+    if name.endswith(".xls"):
+        # Legacy binary workbooks are not supported by openpyxl
+        import pandas as pd
+
+        frame = pd.read_excel(file, header=None, dtype=object)
+        frame = frame.where(frame.notna(), None)
+        return _rows_from_header(frame.itertuples(index=False, name=None))
+
+    raise ScoreImportError("Invalid file format. Please upload Excel or CSV file.")
+
+
+def validate_scores(raw_scores, max_score):
+    """
+    Validate a chunk of raw score strings against the assessment maximum
+
+    Args:
+        raw_scores: List of score strings
+        max_score: Assessment maximum score
+
+    Returns:
+        List with None for valid scores or an error message per entry
+    """
+    values = np.full(len(raw_scores), np.nan)
+    for i, raw in enumerate(raw_scores):
+        try:
+            values[i] = float(raw)
+        except (TypeError, ValueError):
+            pass
+
+    invalid = ~np.isfinite(values)
+    out_of_range = ~invalid & ((values < 0) | (values > max_score))
+
+    errors = [None] * len(raw_scores)
+    for i in np.flatnonzero(invalid):
+        errors[i] = "Invalid score format"
+    for i in np.flatnonzero(out_of_range):
+        errors[i] = f"Score must be between 0 and {max_score}"
+    return errors
+
+
+class ScoreImport:
+    """
+    Import scores for one assessment from an uploaded file
+
+    Attributes:
+        imported: Number of scores written
+        errors: List of [row, admission_no, score, message] for rejected rows
+        rows_read: Number of data rows processed so far
+    """
+
+    def __init__(self, assessment, user, chunk_size=CHUNK_SIZE, progress=None):
+        self.assessment = assessment
+        self.user = user
+        self.chunk_size = chunk_size
+        # Called with rows_read after every chunk
+        self.progress = progress
+        self.imported = 0
+        self.rows_read = 0
+        self.errors = []
+        self._seen = {}
+
+    def run(self, file):
+        """
+        Import every row of ``file``; call inside a transaction
+
+        Raises:
+            ScoreImportError: If the file cannot be read
+        """
+        rows = read_rows(file)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+            self.rows_read += len(chunk)
+            if self.progress:
+                self.progress(self.rows_read)
+        return self
+
+    def reject(self, number, row, message):
+        self.errors.append(
+            [number, row.get("admission_no", ""), row.get("score", ""), message]
+        )
+
+    def import_chunk(self, chunk):
+        admission_nos = {row.get("admission_no") for _, row in chunk}
+        admission_nos.discard("")
+        students = Student.objects.in_bulk(admission_nos, field_name="admission_no")
+        errors = validate_scores(
+            [row.get("score", "") for _, row in chunk], self.assessment.max_score
+        )
+
+        pending = []
+        for (number, row), error in zip(chunk, errors):
+            admission_no = row.get("admission_no", "")
+            student = students.get(admission_no)
+            if not admission_no:
+                self.reject(number, row, "Missing admission number")
+            elif student is None:
+                self.reject(
+                    number,
+                    row,
+                    f"Student with admission no {admission_no} not found",
+                )
+            elif admission_no in self._seen:
+                self.reject(
+                    number,
+                    row,
+                    f"Duplicate admission number (first seen on row {self._seen[admission_no]})",
+                )
+            elif error:
+                self.reject(number, row, error)
+            else:
+                self._seen[admission_no] = number
+                score, _ = parse_score(row["score"], self.assessment.max_score)
+                pending.append(
+                    build_score(
+                        self.assessment,
+                        student.id,
+                        score,
+                        row.get("remarks", ""),
+                        self.user,
+                    )
+                )
+
+        self.imported += save_scores(pending)
@@ -0,0 +1,102 @@
+# academics/scores.py
+"""
+Score Writer
+
+Validates and persists StudentScore rows in bulk. Percentage and grade are
+derived in memory, rows are written with one upsert per batch, and dependent
+term results are queued for refresh explicitly because bulk writes do not
+send model signals.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from .models import StudentScore
+from .results import mark_scores_dirty
+from .utils import bulk_upsert
+
+SCORE_UPDATE_FIELDS = [
+    "score",
+    "percentage",
+    "grade",
+    "remarks",
+    "submitted_by",
+    "updated_at",
+]
+
+
+def parse_score(value, max_score):
+    """
+    Parse a submitted score and check it against the assessment maximum
+
+    Args:
+        value: Raw score (string or number)
+        max_score: Assessment maximum score
+
+    Returns:
+        Tuple (score, error_message); score is a Decimal or None
+    """
+    try:
+        score = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError, ValueError):
+        return None, "Invalid score format"
+
+    if not score.is_finite():
+        return None, "Invalid score format"
+
+    if score < 0 or score > max_score:
+        return None, f"Score must be between 0 and {max_score}"
+
+    return score.quantize(Decimal("0.01")), None
+
+
+def build_score(assessment, student_id, score, remarks="", user=None):
+    """
+    Build an unsaved StudentScore with percentage and grade filled in
+
+    Args:
+        assessment: Assessment object
+        student_id: Student id
+        score: Decimal score (already validated)
+        remarks: Optional remarks
+        user: User submitting the score
+
+    Returns:
+        StudentScore instance
+    """
+    student_score = StudentScore(
+        assessment=assessment,
+        student_id=student_id,
+        score=score,
+        remarks=remarks or "",
+        submitted_by=user,
+    )
+    student_score.update_derived()
+    return student_score
+
+
+def save_scores(scores, batch_size=500):
+    """
+    Insert or update StudentScore rows in bulk
+
+    Existing (assessment, student) rows keep their submitted_at; everything
+    else is overwritten.
+
+    Args:
+        scores: List of StudentScore instances from build_score
+        batch_size: Rows per INSERT statement
+
+    Returns:
+        Number of rows written
+    """
+    if not scores:
+        return 0
+
+    bulk_upsert(
+        StudentScore,
+        scores,
+        unique_fields=["assessment", "student"],
+        update_fields=SCORE_UPDATE_FIELDS,
+        batch_size=batch_size,
+    )
+    mark_scores_dirty((score.student_id, score.assessment_id) for score in scores)
+    return len(scores)
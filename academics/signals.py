@@ -0,0 +1,105 @@
+# academics/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from records.cache import track_model
+
+from .models import (
+    AcademicSession,
+    Assessment,
+    AssessmentType,
+    Attendance,
+    ClassRoom,
+    Job,
+    ReportCard,
+    StudentScore,
+    Subject,
+    SubjectAssignment,
+    Term,
+    TermResult,
+)
+from .pdf import clear_pdf_cache
+from .results import mark_scores_dirty
+from .rollups import refresh_rollups
+
+
+@receiver(post_save, sender=StudentScore)
+@receiver(post_delete, sender=StudentScore)
+def queue_term_result_refresh(sender, instance, **kwargs):
+    """
+    Refresh the TermResult affected by a score change once the transaction commits.
+    """
+    if kwargs.get("raw"):
+        return
+    mark_scores_dirty([(instance.student_id, instance.assessment_id)])
+
+
+@receiver(post_save, sender=ReportCard)
+@receiver(post_delete, sender=ReportCard)
+def invalidate_report_card_pdf(sender, instance, **kwargs):
+    """
+    Drop cached PDFs of a report card that was edited, unpublished or deleted.
+    """
+    if kwargs.get("raw"):
+        return
+    clear_pdf_cache(instance.pk)
+
+
+@receiver(post_delete, sender=Job)
+def delete_job_files(sender, instance, **kwargs):
+    """
+    Remove a deleted job's uploaded input and generated output from storage.
+    """
+    files = [
+        (file.storage, file.name)
+        for file in (instance.input_file, instance.result_file)
+        if file
+    ]
+
+    def delete_files():
+        for storage, name in files:
+            storage.delete(name)
+
+    transaction.on_commit(delete_files)
+
+
+@receiver(post_save, sender=TermResult)
+@receiver(post_delete, sender=TermResult)
+def queue_rollup_refresh(sender, instance, **kwargs):
+    """
+    Refresh the subject rollup of an individually saved or deleted TermResult.
+
+    Bulk writes by the result engine send no signals and refresh rollups
+    themselves.
+    """
+    if kwargs.get("raw"):
+        return
+    term_id, classroom_id, subject_id = (
+        instance.term_id,
+        instance.classroom_id,
+        instance.subject_id,
+    )
+    transaction.on_commit(
+        lambda: refresh_rollups(term_id, classroom_id, [subject_id])
+    )
+
+
+# Cached dashboards depend on these. StudentScore and bulk TermResult writes
+# invalidate explicitly in academics.results since they bypass signals.
+track_model(TermResult, scope=lambda result: {"term": result.term_id})
+track_model(ReportCard, scope=lambda card: {"student": card.student_id})
+track_model(Attendance, scope=lambda record: {"student": record.student_id})
+# academics.reference is tagged with AcademicSession, Term, ClassRoom, Subject
+# and AssessmentType.
+for model in (
+    AcademicSession,
+    Term,
+    ClassRoom,
+    Subject,
+    SubjectAssignment,
+    Assessment,
+    AssessmentType,
+):
+    track_model(model)
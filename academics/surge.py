@@ -0,0 +1,183 @@
+# academics/surge.py
+"""
+Results-Day Surge Mode
+
+Right after report cards are published, most students and parents open the
+same few pages within the hour. While surge mode is on, each student's list
+of published report cards is served from a dependency-cached summary instead
+of ReportCard queries, and the report pages answer conditional requests with
+304 Not Modified, so repeat visits cost no rendering either.
+
+Surge mode is a flag in the shared cache that expires by itself. Admins switch
+it from the publication center, and bulk publishing turns it on and queues a
+background job that rebuilds the summaries of every affected student before
+the first visit.
+"""
+
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from records.cache import cached, get_cache, model_tag
+
+from .models import ClassRoom, ReportCard, Term
+
+SURGE_KEY = "academics:surge-mode"
+DEFAULT_SURGE_HOURS = 24
+
+
+def surge_seconds():
+    return getattr(settings, "RESULTS_SURGE_HOURS", DEFAULT_SURGE_HOURS) * 60 * 60
+
+
+def surge_active():
+    """Whether surge mode is currently on"""
+    return get_cache().get(SURGE_KEY) is not None
+
+
+def start_surge():
+    """Turn surge mode on for ``RESULTS_SURGE_HOURS`` (24 by default)"""
+    get_cache().set(SURGE_KEY, True, surge_seconds())
+
+
+def end_surge():
+    get_cache().delete(SURGE_KEY)
+
+
+# ============================================
+# REPORT SUMMARIES
+# ============================================
+
+
+def published_report_cards(student_ids):
+    """Published report cards of several students, newest session first"""
+    return (
+        ReportCard.objects.filter(student_id__in=student_ids, is_published=True)
+        .select_related("term__session", "classroom")
+        .order_by("-term__session__start_date", "-term__start_date")
+    )
+
+
+def build_summary(cards):
+    """
+    Summarise a student's published report cards for the portal pages
+
+    Returns:
+        Dictionary with "report_cards" (dicts with the fields the pages show,
+        newest first), "latest", "last_modified" (datetime or None) and
+        "version", a hash that changes whenever any shown value does
+    """
+    report_cards = [
+        {
+            "id": card.pk,
+            "term": str(card.term),
+            "classroom": str(card.classroom),
+            "average_score": card.average_score,
+            "position": card.position,
+            "out_of": card.out_of,
+            "generated_at": card.generated_at,
+            "published_at": card.published_at,
+        }
+        for card in cards
+    ]
+    stamps = [
+        card["published_at"] or card["generated_at"] for card in report_cards
+    ]
+    version = hashlib.sha256(
+        repr([sorted(card.items()) for card in report_cards]).encode()
+    ).hexdigest()[:16]
+    return {
+        "report_cards": report_cards,
+        "latest": report_cards[0] if report_cards else None,
+        "last_modified": max(stamps, default=None),
+        "version": version,
+    }
+
+
+def summary_tags(student_id):
+    return [
+        model_tag(ReportCard, student=student_id),
+        model_tag(Term),
+        model_tag(ClassRoom),
+    ]
+
+
+def report_summary(student_id):
+    """Cached summary of one student's published report cards"""
+    return cached(
+        "academics.report_summary",
+        {"student": student_id},
+        summary_tags(student_id),
+        lambda: build_summary(published_report_cards([student_id])),
+        timeout=surge_seconds(),
+    )
+
+
+def warm_report_summaries(student_ids):
+    """
+    Rebuild the summaries of many students from one query
+
+    Returns:
+        Number of summaries warmed
+    """
+    student_ids = list(student_ids)
+    cards = {student_id: [] for student_id in student_ids}
+    for card in published_report_cards(student_ids):
+        cards[card.student_id].append(card)
+
+    for student_id, student_cards in cards.items():
+        # A summary that is still current is left as is
+        cached(
+            "academics.report_summary",
+            {"student": student_id},
+            summary_tags(student_id),
+            lambda student_cards=student_cards: build_summary(student_cards),
+            timeout=surge_seconds(),
+        )
+    return len(cards)
+
+
+# ============================================
+# CONDITIONAL RESPONSES
+# ============================================
+
+
+def conditional_response(request, version, last_modified, render):
+    """
+    Answer a conditional GET from a version, rendering only when needed
+
+    The ETag also covers the user, since pages carry per-user navigation, so
+    ``version`` must cover everything else the response shows. Requests with
+    pending flash messages are always rendered so the messages are shown.
+
+    Args:
+        request: HttpRequest
+        version: String identifying the page content
+        last_modified: Datetime the content last changed, or None to validate
+            by ETag only
+        render: Zero-argument callable producing the full response
+
+    Returns:
+        304 Not Modified, or the rendered response with ETag and
+        Last-Modified headers
+    """
+    etag = quote_etag(f"{version}-{request.user.pk}")
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = None
+    # len() looks at the messages without marking them as shown
+    if not len(messages.get_messages(request)):
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+    if response is None:
+        response = render()
+    response.headers.setdefault("ETag", etag)
+    if timestamp is not None:
+        response.headers.setdefault("Last-Modified", http_date(timestamp))
+    # Browsers keep the page but revalidate it on every visit
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
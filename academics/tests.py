@@ -1,3 +1,1644 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+from openpyxl import Workbook, load_workbook
+
+from portal.models import ParentProfile, PortalMessage
+from records.cache import bump, cached, model_tag
+from records.models import Student
+from .models import (
+    AcademicSession,
+    Term,
+    ClassRoom,
+    Subject,
+    SubjectAssignment,
+    AssessmentType,
+    Assessment,
+    StudentScore,
+    ReportCard,
+    TermResult,
+    Job,
+    SubjectResultRollup,
+    Attendance,
+)
+from . import jobs, pdf
+from .analytics import results_analytics, rollup_analytics, summarize_results
+from .broadsheet import load_broadsheets
+from .exports import EXTRACTS
+from .matrix import ResultsMatrix, competition_ranks, grade_array, grade_counts, round_half_up
+from .models import grade_for
+from .ranking import (
+    DENSE,
+    class_average_ranks,
+    class_standings,
+    rank_term_results,
+    rank_values,
+)
+from .reference import get_current_term, load_reference_data, reference_data
+from .report_cards import generate_class_report_cards, parse_report_data
+from .results import calculate_class_results
+from .score_import import ScoreImport, ScoreImportError
+from .surge import report_summary, start_surge, surge_active
+
+
+# Tests keep the cache in memory rather than in the files the running site
+# uses, so entries never leak between test runs
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+# Jobs stay queued unless a test runs the worker or opts into eager mode
+@override_settings(CACHES=LOCAL_CACHE, ACADEMIC_JOBS_EAGER=False)
+class AcademicsTestCase(TestCase):
+    """Base test case with one class, two subjects and three students."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Cached reference data outlives the previous class's rolled back rows
+        cache.clear()
+        cls.teacher = User.objects.create_user(
+            username="teacher", password="password", is_staff=True
+        )
+        cls.session = AcademicSession.objects.create(
+            name="2024/2025",
+            start_date="2024-09-01",
+            end_date="2025-07-31",
+            is_current=True,
+        )
+        cls.term = Term.objects.create(
+            session=cls.session,
+            name="First",
+            start_date="2024-09-01",
+            end_date="2024-12-15",
+            is_current=True,
+        )
+        cls.classroom = ClassRoom.objects.create(
+            level="JSS1", arm="A", session=cls.session, class_teacher=cls.teacher
+        )
+
+        cls.students = [
+            cls.create_student(surname, admission_no)
+            for surname, admission_no in [
+                ("Adams", "2024-0001"),
+                ("Bello", "2024-0002"),
+                ("Chukwu", "2024-0003"),
+            ]
+        ]
+
+        cls.ca_type = AssessmentType.objects.create(
+            name="Continuous Assessment", code="CA", weight=40
+        )
+        cls.exam_type = AssessmentType.objects.create(
+            name="Examination", code="EXAM", weight=60
+        )
+
+        cls.maths = Subject.objects.create(name="Mathematics", code="MTH")
+        cls.english = Subject.objects.create(name="English", code="ENG")
+        cls.assessments = {}
+        for subject in (cls.maths, cls.english):
+            assignment = SubjectAssignment.objects.create(
+                classroom=cls.classroom,
+                subject=subject,
+                teacher=cls.teacher,
+                term=cls.term,
+            )
+            cls.assessments[subject.code] = {
+                "ca": Assessment.objects.create(
+                    assignment=assignment,
+                    assessment_type=cls.ca_type,
+                    assessment_code="CA1",
+                    title=f"{subject.name} CA",
+                    date="2024-10-01",
+                    max_score=10,
+                    created_by=cls.teacher,
+                ),
+                "exam": Assessment.objects.create(
+                    assignment=assignment,
+                    assessment_type=cls.exam_type,
+                    assessment_code="EXAM",
+                    title=f"{subject.name} Exam",
+                    date="2024-12-01",
+                    max_score=60,
+                    created_by=cls.teacher,
+                ),
+            }
+
+    def media_root(self):
+        """Temporary MEDIA_ROOT for tests that store uploaded or generated files"""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        return path
+
+    @classmethod
+    def create_student(cls, surname, admission_no):
+        return Student.objects.create(
+            surname=surname,
+            other_name="Test",
+            admission_no=admission_no,
+            sex="Male",
+            date_of_birth="2010-01-01",
+            residential_address="1 School Road",
+            nationality="Nigerian",
+            state_of_origin="Lagos",
+            lga="Ikeja",
+            class_on_entry="JSS1",
+            date_of_entry="2024-09-01",
+            classroom=cls.classroom,
+            father_name="Father",
+            mother_name="Mother",
+        )
+
+    def record(self, subject_code, kind, student, score):
+        return StudentScore.objects.create(
+            assessment=self.assessments[subject_code][kind],
+            student=student,
+            score=score,
+            submitted_by=self.teacher,
+        )
+
+
+class ResultEngineTests(AcademicsTestCase):
+    def test_calculates_weighted_ca_and_exam(self):
+        adams, bello, chukwu = self.students
+        self.record("MTH", "ca", adams, 8)
+        self.record("MTH", "exam", adams, 45)
+        self.record("MTH", "ca", bello, 5)
+        self.record("MTH", "exam", bello, 30)
+
+        summary = calculate_class_results(self.term, self.classroom)
+
+        self.assertEqual(summary["created"], 6)
+        result = TermResult.objects.get(student=adams, subject=self.maths)
+        self.assertEqual(result.ca_total, Decimal("32.00"))
+        self.assertEqual(result.exam_score, Decimal("45.00"))
+        self.assertEqual(result.total_score, Decimal("77.00"))
+        self.assertEqual(result.grade, "A")
+        self.assertEqual(result.highest_score, Decimal("77.00"))
+
+        # Students without scores still get a zero result for each subject
+        empty = TermResult.objects.get(student=chukwu, subject=self.english)
+        self.assertEqual(empty.total_score, Decimal("0.00"))
+        self.assertEqual(empty.grade, "F")
+
+    def test_recalculation_updates_existing_rows(self):
+        adams = self.students[0]
+        score = self.record("MTH", "exam", adams, 30)
+        calculate_class_results(self.term, self.classroom)
+
+        score.score = 60
+        score.save()
+        summary = calculate_class_results(self.term, self.classroom)
+
+        self.assertEqual(summary["created"], 0)
+        self.assertEqual(summary["updated"], 6)
+        result = TermResult.objects.get(student=adams, subject=self.maths)
+        self.assertEqual(result.exam_score, Decimal("60.00"))
+        self.assertEqual(TermResult.objects.count(), 6)
+
+    def test_query_count_is_independent_of_class_size(self):
+        for student in self.students:
+            self.record("MTH", "ca", student, 7)
+            self.record("ENG", "exam", student, 40)
+
+        # The last three are the rollup refresh: aggregate, prune, upsert
+        with self.assertNumQueries(11):
+            calculate_class_results(self.term, self.classroom)
+
+
+class RankingTests(AcademicsTestCase):
+    def setUp(self):
+        adams, bello, chukwu = self.students
+        self.record("MTH", "exam", adams, 50)
+        self.record("MTH", "exam", bello, 50)
+        self.record("MTH", "exam", chukwu, 20)
+        calculate_class_results(self.term, self.classroom)
+
+    def positions(self):
+        return [
+            TermResult.objects.get(student=student, subject=self.maths).position
+            for student in self.students
+        ]
+
+    def test_competition_ranks_share_ties(self):
+        self.assertEqual(self.positions(), [1, 1, 3])
+
+    def test_dense_ranks(self):
+        rank_term_results(self.term, self.classroom, method=DENSE)
+        self.assertEqual(self.positions(), [1, 1, 2])
+
+    def test_python_fallback_matches_window_function(self):
+        TermResult.objects.update(position=None)
+        with mock.patch(
+            "academics.ranking.supports_window_ranking", return_value=False
+        ):
+            rank_term_results(self.term, self.classroom)
+            fallback_ranks = class_average_ranks(self.term, self.classroom)
+        self.assertEqual(self.positions(), [1, 1, 3])
+        self.assertEqual(fallback_ranks, class_average_ranks(self.term, self.classroom))
+
+    def test_standings_rank_the_printed_average(self):
+        adams, bello, _ = self.students
+        # Averages 50.005 and 50.01 both print as 50.01
+        for student, maths, english in [(adams, 50, 50.01), (bello, 50.01, 50.01)]:
+            TermResult.objects.filter(student=student, subject=self.maths).update(
+                total_score=maths
+            )
+            TermResult.objects.filter(student=student, subject=self.english).update(
+                total_score=english
+            )
+
+        standings = class_standings(self.term, self.classroom)
+        self.assertEqual(standings[adams.id]["average"], 50.01)
+        self.assertEqual(standings[adams.id]["position"], 1)
+        self.assertEqual(standings[bello.id]["position"], 1)
+
+    def test_rank_values(self):
+        items = [("a", 90), ("b", 80), ("c", 80), ("d", 70)]
+        self.assertEqual(
+            rank_values(items), {"a": 1, "b": 2, "c": 2, "d": 4}
+        )
+        self.assertEqual(
+            rank_values(items, DENSE), {"a": 1, "b": 2, "c": 2, "d": 3}
+        )
+
+
+class ResultsMatrixTests(AcademicsTestCase):
+    def test_matrix_figures(self):
+        adams, bello, chukwu = self.students
+        self.record("MTH", "ca", adams, 8)
+        self.record("MTH", "exam", adams, 45)
+        self.record("MTH", "exam", bello, 45)
+        self.record("ENG", "exam", chukwu, 60)
+
+        matrix = ResultsMatrix.load(self.term, self.classroom)
+
+        self.assertEqual(matrix.total_score.shape, (3, 2))
+        figures = matrix.cell(adams.id, self.maths.id)
+        self.assertEqual(figures["ca_total"], 32.0)
+        self.assertEqual(figures["total_score"], 77.0)
+        self.assertEqual(figures["grade"], "A")
+        self.assertEqual(figures["position"], 1)
+        self.assertEqual(figures["class_average"], 40.67)
+        self.assertEqual(matrix.cell(chukwu.id, self.maths.id)["position"], 3)
+        self.assertEqual(list(matrix.overall_positions), [1, 3, 2])
+
+    def test_grades_match_model_scale(self):
+        totals = [0, 39.99, 40, 44.5, 45, 55, 64.99, 65, 75, 100]
+        self.assertEqual(list(grade_array(totals)), [grade_for(t) for t in totals])
+        self.assertEqual(
+            grade_counts(totals), {"A": 2, "B": 1, "C": 2, "D": 1, "E": 2, "F": 2}
+        )
+
+    def test_round_half_up(self):
+        self.assertEqual(list(round_half_up([2.675, 1.005, 0.125])), [2.68, 1.01, 0.13])
+
+    def test_equal_totals_share_a_position(self):
+        # 0.01 + 50.00 and 16.01 + 34.00 differ in binary floating point
+        matrix = ResultsMatrix(
+            [1, 2],
+            [1],
+            np.array([[0.01, 50.00], [16.01, 34.00]]),
+            np.array([100.0, 100.0]),
+            np.array([[100.0], [0.0]]),
+            np.array([[0.0], [100.0]]),
+        )
+        self.assertEqual(matrix.total_score.tolist(), [[50.01], [50.01]])
+        self.assertEqual(matrix.positions.tolist(), [[1], [1]])
+        self.assertEqual(list(matrix.overall_positions), [1, 1])
+
+    def test_competition_ranks(self):
+        self.assertEqual(list(competition_ranks([50, 70, 50, 10])), [2, 1, 2, 4])
+        columns = competition_ranks([[1, 9], [3, 9], [2, 1]], axis=0)
+        self.assertEqual(columns.tolist(), [[3, 1], [1, 1], [2, 3]])
+
+
+class IncrementalResultTests(AcademicsTestCase):
+    def setUp(self):
+        adams, bello, chukwu = self.students
+        self.scores = [
+            self.record("MTH", "exam", adams, 50),
+            self.record("MTH", "exam", bello, 40),
+            self.record("MTH", "exam", chukwu, 30),
+        ]
+        calculate_class_results(self.term, self.classroom)
+
+    def result(self, student, subject=None):
+        return TermResult.objects.get(student=student, subject=subject or self.maths)
+
+    def test_score_correction_refreshes_result_and_class_stats(self):
+        chukwu = self.students[2]
+        score = self.scores[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            score.score = 60
+            score.save()
+
+        result = self.result(chukwu)
+        self.assertEqual(result.exam_score, Decimal("60.00"))
+        self.assertEqual(result.position, 1)
+        self.assertEqual(result.highest_score, Decimal("60.00"))
+        self.assertEqual(self.result(self.students[0]).position, 2)
+        self.assertEqual(
+            self.result(self.students[0]).class_average, Decimal("50.00")
+        )
+
+    def test_deleted_score_resets_result(self):
+        adams = self.students[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.scores[0].delete()
+
+        result = self.result(adams)
+        self.assertEqual(result.total_score, Decimal("0.00"))
+        self.assertEqual(result.position, 3)
+
+    def test_changes_in_one_transaction_are_coalesced(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for score in self.scores:
+                score.score = 10
+                score.save()
+
+        # Three saves, one refresh: later callbacks find an empty queue
+        with self.assertNumQueries(15):
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(
+            [self.result(student).exam_score for student in self.students],
+            [Decimal("10.00")] * 3,
+        )
+
+    def test_refresh_matches_full_calculation(self):
+        adams = self.students[0]
+        resit = Assessment.objects.create(
+            assignment=self.assessments["MTH"]["exam"].assignment,
+            assessment_type=self.exam_type,
+            assessment_code="EXAM2",
+            title="Mathematics Resit",
+            date="2024-12-10",
+            max_score=60,
+            created_by=self.teacher,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentScore.objects.create(
+                assessment=resit, student=adams, score=30, submitted_by=self.teacher
+            )
+            self.record("MTH", "ca", adams, 5)
+        refreshed = self.result(adams)
+
+        calculate_class_results(self.term, self.classroom)
+        recalculated = self.result(adams)
+        self.assertEqual(refreshed.exam_score, Decimal("30.00"))
+        self.assertEqual(
+            (refreshed.ca_total, refreshed.exam_score, refreshed.total_score),
+            (recalculated.ca_total, recalculated.exam_score, recalculated.total_score),
+        )
+
+    def test_uncalculated_classes_are_left_alone(self):
+        TermResult.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record("ENG", "exam", self.students[0], 45)
+        self.assertFalse(TermResult.objects.exists())
+
+
+class RecalculateCommandTests(AcademicsTestCase):
+    def call(self, *args):
+        out = StringIO()
+        call_command("calculate_results_current", *args, "--workers=1", stdout=out)
+        return out.getvalue()
+
+    def test_recalculates_each_class(self):
+        self.record("MTH", "exam", self.students[0], 45)
+        output = self.call()
+        self.assertIn("JSS1A: 6 results (6 new, 0 updated)", output)
+        self.assertEqual(TermResult.objects.count(), 6)
+
+    def test_dry_run_writes_nothing(self):
+        output = self.call("--dry-run")
+        self.assertIn("Would recalculate JSS1A (3 students)", output)
+        self.assertFalse(TermResult.objects.exists())
+
+    def test_changed_since_skips_untouched_classes(self):
+        self.record("MTH", "exam", self.students[0], 45)
+        output = self.call("--changed-since", "2999-01-01")
+        self.assertIn("No classes to recalculate", output)
+
+        output = self.call("--changed-since", "2000-01-01", f"--term={self.term.id}")
+        self.assertIn("JSS1A", output)
+
+    def test_invalid_changed_since(self):
+        with self.assertRaises(CommandError):
+            self.call("--changed-since", "yesterday")
+
+
+class BulkScoreEntryTests(AcademicsTestCase):
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.assessment = self.assessments["MTH"]["exam"]
+        self.url = reverse("academics:bulk_score_entry", args=[self.assessment.id])
+
+    def test_saves_grid_and_reports_row_errors(self):
+        adams, bello, chukwu = self.students
+        self.record("MTH", "exam", bello, 10)
+
+        response = self.client.post(
+            self.url,
+            {
+                f"score_{adams.id}": "48",
+                f"remarks_{adams.id}": "Good",
+                f"score_{bello.id}": "54",
+                f"score_{chukwu.id}": "75",
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        adams_score = StudentScore.objects.get(student=adams, assessment=self.assessment)
+        self.assertEqual(adams_score.percentage, Decimal("80.00"))
+        self.assertEqual(adams_score.grade, "A")
+        self.assertEqual(adams_score.remarks, "Good")
+        self.assertEqual(
+            StudentScore.objects.get(student=bello, assessment=self.assessment).score,
+            Decimal("54.00"),
+        )
+        self.assertFalse(StudentScore.objects.filter(student=chukwu).exists())
+        errors = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertIn("Chukwu Test: Score must be between 0 and 60", errors)
+
+    def test_query_count_is_independent_of_class_size(self):
+        def post():
+            data = {f"score_{s.id}": "30" for s in Student.objects.all()}
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post(self.url, data)
+            return len(queries)
+
+        small = post()
+        for number in range(4, 20):
+            self.create_student(f"Student{number}", f"2024-{number:04d}")
+        self.assertEqual(post(), small)
+        self.assertEqual(StudentScore.objects.count(), 19)
+
+
+class ScoreImportTests(AcademicsTestCase):
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.assessment = self.assessments["MTH"]["exam"]
+
+    def upload(self, name, content):
+        return SimpleUploadedFile(name, content)
+
+    def test_csv_import_collects_row_errors(self):
+        adams, bello, chukwu = self.students
+        content = (
+            "admission_no,score,remarks\n"
+            f"{adams.admission_no},45,Good\n"
+            "9999-0000,30,\n"
+            f"{bello.admission_no},75,\n"
+            f"{chukwu.admission_no},abc,\n"
+            f"{adams.admission_no},50,\n"
+        ).encode()
+
+        with self.settings(ACADEMIC_JOBS_EAGER=True, MEDIA_ROOT=self.media_root()):
+            response = self.client.post(
+                reverse("academics:import_scores"),
+                {
+                    "assessment": self.assessment.id,
+                    "file": self.upload("scores.csv", content),
+                },
+            )
+            job = Job.objects.get()
+            self.assertRedirects(
+                response,
+                reverse("academics:job_detail", args=[job.pk]),
+                fetch_redirect_response=False,
+            )
+            report = self.client.get(reverse("academics:job_download", args=[job.pk]))
+            report = b"".join(report.streaming_content)
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result["imported"], 1)
+        score = StudentScore.objects.get(assessment=self.assessment)
+        self.assertEqual((score.student, score.score, score.remarks), (adams, 45, "Good"))
+
+        rows = list(csv.reader(io.StringIO(report.decode())))
+        self.assertEqual(rows[0], ["row", "admission_no", "score", "error"])
+        self.assertEqual(
+            [(row[0], row[3]) for row in rows[1:]],
+            [
+                ("3", "Student with admission no 9999-0000 not found"),
+                ("4", "Score must be between 0 and 60"),
+                ("5", "Invalid score format"),
+                ("6", "Duplicate admission number (first seen on row 2)"),
+            ],
+        )
+
+    def test_xlsx_import_in_chunks(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Admission_No", "Score"])
+        for number, student in enumerate(self.students):
+            sheet.append([student.admission_no, 20 + number])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+        upload = self.upload("scores.xlsx", buffer.read())
+
+        # Per chunk: resolve admission numbers, upsert, look up refresh targets
+        with self.assertNumQueries(6):
+            importer = ScoreImport(self.assessment, self.teacher, chunk_size=2).run(
+                upload
+            )
+
+        self.assertEqual(importer.imported, 3)
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(
+            sorted(StudentScore.objects.values_list("score", flat=True)), [20, 21, 22]
+        )
+
+    def test_missing_columns(self):
+        with self.assertRaises(ScoreImportError):
+            ScoreImport(self.assessment, self.teacher).run(
+                self.upload("scores.csv", b"student,mark\n1,2\n")
+            )
+
+
+class BatchScoreSaveTests(AcademicsTestCase):
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.assessment = self.assessments["MTH"]["exam"]
+        self.url = reverse("academics:ajax_save_scores", args=[self.assessment.id])
+
+    def post(self, scores):
+        return self.client.post(
+            self.url, json.dumps({"scores": scores}), content_type="application/json"
+        )
+
+    def test_partial_failure_returns_status_per_row(self):
+        adams, bello, chukwu = self.students
+        self.record("MTH", "exam", chukwu, 12)
+
+        response = self.post(
+            [
+                {"student_id": adams.id, "score": "48", "remarks": "Good"},
+                {"student_id": str(bello.id), "score": 61},
+                {"student_id": chukwu.id, "score": ""},
+                {"student_id": 9999, "score": 10},
+            ]
+        )
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["status"], "partial")
+        self.assertEqual(
+            [row["status"] for row in data["results"]],
+            ["saved", "error", "cleared", "error"],
+        )
+        self.assertEqual(data["results"][1]["message"], "Score must be between 0 and 60.")
+        self.assertEqual(
+            list(StudentScore.objects.values_list("student", "grade")), [(adams.id, "A")]
+        )
+
+    def test_query_count_is_independent_of_batch_size(self):
+        def save(students, score):
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.post([{"student_id": s.id, "score": score} for s in students])
+            return len(queries)
+
+        single = save(self.students[:1], 10)
+        self.assertEqual(save(self.students, 20), single)
+
+    def test_locked_assessment_is_rejected(self):
+        self.assessment.lock_scores(self.teacher)
+        response = self.post([{"student_id": self.students[0].id, "score": 10}])
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(StudentScore.objects.exists())
+
+    def test_other_teacher_is_rejected(self):
+        other = User.objects.create_user(username="other", password="password")
+        self.client.force_login(other)
+        response = self.post([{"student_id": self.students[0].id, "score": 10}])
+        self.assertEqual(response.status_code, 403)
+
+
+class ReportCardGenerationTests(AcademicsTestCase):
+    def setUp(self):
+        adams, bello, chukwu = self.students
+        self.record("MTH", "exam", adams, 30)
+        self.record("ENG", "exam", adams, 50)
+        self.record("MTH", "exam", bello, 60)
+        calculate_class_results(self.term, self.classroom)
+
+    def card(self, student):
+        return ReportCard.objects.get(student=student, term=self.term)
+
+    def test_generates_totals_averages_and_positions(self):
+        adams, bello, chukwu = self.students
+        self.assertEqual(generate_class_report_cards(self.term, self.classroom), 3)
+
+        card = self.card(adams)
+        self.assertEqual(card.total_score, Decimal("80.00"))
+        self.assertEqual(card.average_score, Decimal("40.00"))
+        self.assertEqual((card.position, card.out_of), (1, 3))
+        self.assertEqual(self.card(bello).position, 2)
+        self.assertEqual(self.card(chukwu).position, 3)
+
+    def test_merges_submitted_data_without_blanking_prepared_fields(self):
+        adams, bello, _ = self.students
+        ReportCard.objects.create(
+            student=adams,
+            term=self.term,
+            classroom=self.classroom,
+            principal_remarks="Well done",
+            honesty=4,
+        )
+        data = parse_report_data(
+            {
+                f"remarks_{adams.id}": " Hardworking ",
+                f"days_present_{adams.id}": "45",
+                f"days_absent_{adams.id}": "5",
+                f"punctuality_{bello.id}": "5",
+            },
+            [adams.id, bello.id],
+        )
+
+        generate_class_report_cards(self.term, self.classroom, data)
+
+        card = self.card(adams)
+        self.assertEqual(card.class_teacher_remarks, "Hardworking")
+        self.assertEqual(card.principal_remarks, "Well done")
+        self.assertEqual(card.honesty, 4)
+        self.assertEqual(card.attendance_percentage, Decimal("90.00"))
+        self.assertEqual(self.card(bello).punctuality, 5)
+
+    def test_query_count_is_independent_of_class_size(self):
+        generate_class_report_cards(self.term, self.classroom)
+        with CaptureQueriesContext(connection) as small:
+            generate_class_report_cards(self.term, self.classroom)
+
+        for number in range(4, 30):
+            self.create_student(f"Student{number}", f"2024-{number:04d}")
+        calculate_class_results(self.term, self.classroom)
+        generate_class_report_cards(self.term, self.classroom)
+        with CaptureQueriesContext(connection) as large:
+            generate_class_report_cards(self.term, self.classroom)
+
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(ReportCard.objects.count(), 29)
+
+    def test_finalize_view(self):
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("academics:finalize_report_cards"),
+            {"term_id": self.term.id, "classroom_id": self.classroom.id},
+        )
+        self.assertRedirects(
+            response, reverse("academics:report_card_list"), fetch_redirect_response=False
+        )
+        self.assertEqual(self.card(self.students[0]).position, 1)
+
+
+@mock.patch("academics.pdf.render_pdf", side_effect=lambda html, *args: b"%PDF " + html[:20].encode())
+class ReportCardPdfTests(AcademicsTestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.enterContext(self.settings(REPORT_CARD_PDF_CACHE_DIR=cache_dir))
+
+        for student in self.students:
+            self.record("MTH", "exam", student, 40)
+        calculate_class_results(self.term, self.classroom)
+        generate_class_report_cards(self.term, self.classroom)
+        self.client.force_login(self.teacher)
+
+    def test_single_pdf(self, render_pdf):
+        card = ReportCard.objects.get(student=self.students[0])
+        response = self.client.get(reverse("academics:report_card_pdf", args=[card.pk]))
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(response.content.startswith(b"%PDF"))
+
+    def test_worker_pool_refuses_to_start_inside_a_transaction(self, render_pdf):
+        # Every test runs inside a transaction
+        jobs = [("a", "<p>A</p>"), ("b", "<p>B</p>")]
+        with self.assertRaises(RuntimeError):
+            list(pdf.render_jobs(jobs, workers=2))
+        self.assertEqual([name for name, *_ in pdf.render_jobs(jobs, 1)], ["a", "b"])
+
+    @override_settings(REPORT_CARD_PDF_WORKERS=1)
+    def test_class_zip_streams_every_card(self, render_pdf):
+        url = reverse(
+            "academics:report_cards_pdf_zip", args=[self.term.id, self.classroom.id]
+        )
+        # Session, user, term and class lookups, then cards and results once
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+            content = b"".join(response.streaming_content)
+
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(
+            archive.namelist(),
+            [
+                f"report_card_{student.admission_no}_20242025-first.pdf"
+                for student in self.students
+            ],
+        )
+        self.assertEqual(render_pdf.call_count, 3)
+
+    def publish(self):
+        ReportCard.objects.update(status="Published", is_published=True)
+
+    def download(self, card):
+        response = self.client.get(reverse("academics:report_card_pdf", args=[card.pk]))
+        return b"".join(response.streaming_content)
+
+    def test_students_only_download_their_own_published_card(self, render_pdf):
+        adams, bello = self.students[:2]
+        own = ReportCard.objects.get(student=adams)
+        other = ReportCard.objects.get(student=bello)
+        self.client.force_login(adams.user)
+
+        # Drafts are hidden until published
+        self.assertEqual(self.client.get(self.pdf_url(own)).status_code, 404)
+
+        self.publish()
+        self.assertEqual(self.client.get(self.pdf_url(own)).status_code, 200)
+        self.assertEqual(self.client.get(self.pdf_url(other)).status_code, 404)
+
+        # Parents get their linked children's cards only
+        parent = User.objects.create_user(username="parent")
+        ParentProfile.objects.create(
+            user=parent, phone_number="08011223344", relationship="Mother"
+        ).students.add(bello)
+        self.client.force_login(parent)
+        self.assertEqual(self.client.get(self.pdf_url(other)).status_code, 200)
+        self.assertEqual(self.client.get(self.pdf_url(own)).status_code, 404)
+
+    def pdf_url(self, card):
+        return reverse("academics:report_card_pdf", args=[card.pk])
+
+    def test_published_pdf_is_served_from_cache(self, render_pdf):
+        self.publish()
+        card = ReportCard.objects.get(student=self.students[0])
+
+        first = self.download(card)
+        second = self.download(card)
+
+        self.assertTrue(first.startswith(b"%PDF"))
+        self.assertEqual(first, second)
+        self.assertEqual(render_pdf.call_count, 1)
+
+    def test_draft_pdf_is_not_cached(self, render_pdf):
+        card = ReportCard.objects.get(student=self.students[0])
+        self.client.get(reverse("academics:report_card_pdf", args=[card.pk]))
+        self.client.get(reverse("academics:report_card_pdf", args=[card.pk]))
+        self.assertEqual(render_pdf.call_count, 2)
+
+    def test_changed_results_render_a_new_pdf(self, render_pdf):
+        self.publish()
+        card = ReportCard.objects.get(student=self.students[0])
+        self.download(card)
+
+        # Bulk updates send no signals; the content hash alone must miss
+        TermResult.objects.filter(student=self.students[0]).update(grade="F")
+        self.download(card)
+
+        self.assertEqual(render_pdf.call_count, 2)
+        self.assertEqual(len(list(pdf.pdf_cache_dir().joinpath(str(card.pk)).iterdir())), 1)
+
+    def test_unpublishing_clears_the_cache(self, render_pdf):
+        self.publish()
+        card = ReportCard.objects.get(student=self.students[0])
+        self.download(card)
+        self.assertTrue(pdf.pdf_cache_dir().joinpath(str(card.pk)).exists())
+
+        card.unpublish()
+
+        self.assertFalse(pdf.pdf_cache_dir().joinpath(str(card.pk)).exists())
+
+    @override_settings(REPORT_CARD_PDF_WORKERS=1)
+    def test_warm_cache_then_zip_renders_nothing(self, render_pdf):
+        self.publish()
+        out = StringIO()
+        call_command("warm_report_card_pdfs", term=self.term.id, stdout=out)
+        self.assertIn("Cached 3 report card PDF(s)", out.getvalue())
+        self.assertEqual(render_pdf.call_count, 3)
+
+        call_command("warm_report_card_pdfs", term=self.term.id, stdout=StringIO())
+        url = reverse(
+            "academics:report_cards_pdf_zip", args=[self.term.id, self.classroom.id]
+        )
+        content = b"".join(self.client.get(url).streaming_content)
+
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(content)).namelist()), 3)
+        self.assertEqual(render_pdf.call_count, 3)
+
+
+class JobQueueTests(AcademicsTestCase):
+    def setUp(self):
+        self.enterContext(self.settings(MEDIA_ROOT=self.media_root()))
+        self.client.force_login(self.teacher)
+        for student in self.students:
+            self.record("MTH", "exam", student, 40)
+
+    def enqueue_recalculation(self):
+        return jobs.enqueue(
+            "recalculate_results",
+            user=self.teacher,
+            term_id=self.term.id,
+            classroom_id=self.classroom.id,
+        )
+
+    def test_view_enqueues_and_returns_immediately(self):
+        admin = User.objects.create_superuser(username="admin", password="password")
+        self.client.force_login(admin)
+        TermResult.objects.all().delete()
+        response = self.client.post(
+            reverse("academics:recalculate_term_results"),
+            {"term_id": self.term.id, "classroom_id": self.classroom.id},
+        )
+
+        job = Job.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("academics:job_detail", args=[job.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertFalse(TermResult.objects.exists())
+
+        out = StringIO()
+        call_command("run_jobs", once=True, stdout=out)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result["total"], 6)
+        self.assertEqual(TermResult.objects.count(), 6)
+        self.assertIn("Processed 1 job(s)", out.getvalue())
+
+        status = self.client.get(reverse("academics:job_status", args=[job.pk])).json()
+        self.assertEqual(status["status"], Job.SUCCEEDED)
+        self.assertEqual(status["progress_percent"], 100)
+        self.assertTrue(status["finished"])
+
+    def test_only_one_worker_claims_a_job(self):
+        job = self.enqueue_recalculation()
+        self.assertEqual(jobs.claim_job(job.pk, "worker-a").worker, "worker-a")
+        self.assertIsNone(jobs.claim_job(job.pk, "worker-b"))
+        self.assertIsNone(jobs.claim_next_job("worker-b"))
+
+    def test_expired_lease_is_claimed_again(self):
+        job = jobs.claim_job(self.enqueue_recalculation().pk, "worker-a")
+        Job.objects.filter(pk=job.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        job = jobs.claim_next_job("worker-b")
+        self.assertEqual((job.worker, job.attempts), ("worker-b", 2))
+
+    def test_lease_expiry_on_final_attempt_fails_the_job(self):
+        job = self.enqueue_recalculation()
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            attempts=job.max_attempts,
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.assertIsNone(jobs.claim_next_job("worker-b"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_failed_job_is_retried_until_max_attempts(self):
+        job = jobs.enqueue(
+            "recalculate_results", term_id=self.term.id, classroom_id=0
+        )
+        with self.assertLogs("academics.jobs", "ERROR"):
+            for attempt in range(job.max_attempts):
+                job = jobs.run_job(jobs.claim_next_job("worker"))
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertIsNone(jobs.claim_next_job("worker"))
+
+    def test_worker_without_its_lease_does_not_record_an_outcome(self):
+        stale = jobs.claim_job(self.enqueue_recalculation().pk, "worker-a")
+        Job.objects.filter(pk=stale.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        jobs.claim_next_job("worker-b")
+
+        stale.payload["classroom_id"] = 0
+        with self.assertLogs("academics.jobs", "WARNING"):
+            jobs.run_job(stale)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.worker), (Job.RUNNING, "worker-b"))
+
+    def test_job_files_are_deleted_when_no_longer_needed(self):
+        content = f"admission_no,score\n{self.students[0].admission_no},45\n9,1\n"
+        job = jobs.enqueue(
+            "import_scores",
+            input_file=SimpleUploadedFile("scores.csv", content.encode()),
+            assessment_id=self.assessments["MTH"]["exam"].id,
+        )
+        storage, input_name = job.input_file.storage, job.input_file.name
+        self.assertTrue(storage.exists(input_name))
+
+        job = jobs.run_job(jobs.claim_next_job("worker"))
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertFalse(storage.exists(input_name))
+        result_name = Job.objects.get().result_file.name
+        self.assertTrue(storage.exists(result_name))
+
+        self.assertEqual(jobs.purge_finished_jobs(), 0)
+        Job.objects.update(finished_at=timezone.now() - timedelta(days=30))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(jobs.purge_finished_jobs(), 1)
+        self.assertFalse(storage.exists(result_name))
+
+    def test_jobs_are_private_to_their_creator(self):
+        job = self.enqueue_recalculation()
+        other = User.objects.create_user(
+            username="other", password="password", is_staff=True
+        )
+        self.client.force_login(other)
+        response = self.client.get(reverse("academics:job_status", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("academics:job_download", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_students_cannot_queue_report_card_exports(self):
+        self.client.force_login(self.students[0].user)
+        response = self.client.post(
+            reverse("academics:export_report_cards", args=[self.term.id])
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(ACADEMIC_JOBS_EAGER=True)
+    def test_export_report_cards_job_produces_workbook(self):
+        calculate_class_results(self.term, self.classroom)
+        generate_class_report_cards(self.term, self.classroom)
+
+        response = self.client.post(
+            reverse("academics:export_report_cards", args=[self.term.id])
+        )
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result["rows"], 3)
+        download = self.client.get(reverse("academics:job_download", args=[job.pk]))
+        workbook = load_workbook(io.BytesIO(b"".join(download.streaming_content)))
+        self.assertEqual(workbook.active.max_row, 4)
+        self.assertRedirects(
+            response,
+            reverse("academics:job_detail", args=[job.pk]),
+            fetch_redirect_response=False,
+        )
+
+
+class PerformanceAnalyticsTests(AcademicsTestCase):
+    # Session, user and the filter form's five dropdowns (the current term is
+    # cached reference data), then one rollup query plus top performers, or
+    # four TermResult aggregations when a student or score filter is chosen.
+    # Each chosen filter adds one lookup when the form validates it.
+    ROLLUP_BUDGET = 9
+    RESULTS_BUDGET = 11
+    MODEL_FILTERS = {"session", "term", "classroom", "subject", "student"}
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+        for student, exam in zip(self.students, [57, 40, 10]):
+            self.record("MTH", "exam", student, exam)
+            self.record("ENG", "exam", student, exam - 5)
+        calculate_class_results(self.term, self.classroom)
+        self.url = reverse("academics:performance_analytics")
+
+    def test_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            summary = summarize_results(TermResult.objects.all())
+
+        totals = list(TermResult.objects.values_list("total_score", flat=True))
+        self.assertEqual(summary["grade_distribution"], grade_counts(totals))
+        self.assertEqual(summary["pass_fail_stats"], {"pass_count": 3, "fail_count": 3})
+        self.assertEqual(summary["stats"]["total_students"], 3)
+        self.assertEqual(summary["stats"]["highest_score"], Decimal("57.00"))
+
+    def test_query_budget_is_flat_across_filters(self):
+        other_term = Term.objects.create(
+            session=self.session,
+            name="Second",
+            start_date="2025-01-05",
+            end_date="2025-04-10",
+        )
+        for number in range(3):
+            ClassRoom.objects.create(level="JSS2", arm="ABC"[number], session=self.session)
+
+        for params, budget, result_queries in [
+            ({}, self.ROLLUP_BUDGET, 1),
+            ({"term": self.term.id}, self.ROLLUP_BUDGET, 1),
+            (
+                {"session": self.session.id, "classroom": self.classroom.id},
+                self.ROLLUP_BUDGET,
+                1,
+            ),
+            (
+                {"subject": self.maths.id, "min_score": 20, "max_score": 90},
+                self.RESULTS_BUDGET,
+                4,
+            ),
+            (
+                {"term": other_term.id, "student": self.students[0].id},
+                self.RESULTS_BUDGET,
+                4,
+            ),
+        ]:
+            budget += len(self.MODEL_FILTERS & set(params))
+            cache.clear()
+            reference_data()
+            with self.subTest(params=params), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(queries), budget)
+                self.assertEqual(
+                    sum('FROM "academics_termresult"' in q["sql"] for q in queries),
+                    result_queries,
+                )
+
+    def test_rollups_match_raw_results(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            score = StudentScore.objects.get(
+                student=self.students[2], assessment=self.assessments["ENG"]["exam"]
+            )
+            score.score = 48
+            score.save()
+
+        def rounded(value):
+            if isinstance(value, dict):
+                return {key: rounded(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [rounded(item) for item in value]
+            if isinstance(value, (Decimal, float)):
+                return round(float(value), 2)
+            return value
+
+        self.assertEqual(
+            rounded(rollup_analytics(SubjectResultRollup.objects.all())),
+            rounded(results_analytics(TermResult.objects.all())),
+        )
+
+        english = SubjectResultRollup.objects.get(subject=self.english)
+        self.assertEqual(
+            (english.result_count, english.pass_count, english.highest_score),
+            (3, 2, Decimal("52.00")),
+        )
+        self.assertEqual(english.grade_distribution["F"], 1)
+
+    def test_deleted_result_refreshes_rollup(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TermResult.objects.filter(subject=self.maths).first().delete()
+        self.assertEqual(
+            SubjectResultRollup.objects.get(subject=self.maths).result_count, 2
+        )
+
+        call_command("rebuild_result_rollups", stdout=StringIO())
+        self.assertEqual(SubjectResultRollup.objects.count(), 2)
+
+    def test_breakdowns(self):
+        response = self.client.get(self.url, {"term": self.term.id})
+        context = response.context
+
+        self.assertEqual(
+            [row["subject__name"] for row in context["subject_performance"]],
+            ["Mathematics", "English"],
+        )
+        self.assertEqual(context["subject_performance"][0]["student_count"], 3)
+        self.assertEqual(len(context["class_performance"]), 1)
+        self.assertAlmostEqual(
+            float(context["class_performance"][0]["avg_score"]), 199 / 6
+        )
+        trend = json.loads(context["performance_trend"])
+        self.assertEqual([row["term__name"] for row in trend], ["First"])
+        self.assertEqual(
+            context["top_performers"][0]["student"].full_name, "Adams Test"
+        )
+
+
+class DependencyCacheTests(AcademicsTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+        self.record("MTH", "exam", self.students[0], 50)
+        calculate_class_results(self.term, self.classroom)
+
+    def test_entries_expire_only_with_their_tags(self):
+        builds = []
+
+        def build(value):
+            builds.append(value)
+            return value
+
+        first = model_tag(TermResult, term=1)
+        second = model_tag(TermResult, term=2)
+        for _ in range(2):
+            cached("test", {"term": 1}, [first], lambda: build(1))
+            cached("test", {"term": 2}, [second], lambda: build(2))
+        self.assertEqual(builds, [1, 2])
+
+        bump(first)
+        cached("test", {"term": 1}, [first], lambda: build(1))
+        cached("test", {"term": 2}, [second], lambda: build(2))
+        self.assertEqual(builds, [1, 2, 1])
+
+    def test_values_are_computed_when_the_cache_fails(self):
+        broken = mock.Mock()
+        broken.get_many.side_effect = DatabaseError("no such table: django_cache")
+        with mock.patch("records.cache.get_cache", return_value=broken):
+            with self.assertLogs("records.cache", "WARNING"):
+                self.assertEqual(cached("test", {}, ["tag"], lambda: 42), 42)
+
+    def test_performance_analytics_is_served_from_cache(self):
+        url = reverse("academics:performance_analytics")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(
+            any("academics_subjectresultrollup" in q["sql"] for q in queries)
+        )
+        self.assertEqual(response.context["stats"]["highest_score"], Decimal("50.00"))
+
+        # A results refresh in another term leaves the entry alone
+        other_term = Term.objects.create(
+            session=self.session,
+            name="Second",
+            start_date="2025-01-05",
+            end_date="2025-04-10",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            calculate_class_results(other_term, self.classroom)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(
+            any("academics_subjectresultrollup" in q["sql"] for q in queries)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            score = StudentScore.objects.get(
+                student=self.students[0], assessment=self.assessments["MTH"]["exam"]
+            )
+            score.score = 60
+            score.save()
+        response = self.client.get(url)
+        self.assertEqual(response.context["stats"]["highest_score"], Decimal("60.00"))
+
+    def test_dashboard_statistics_follow_student_changes(self):
+        url = reverse("academics:dashboard")
+        response = self.client.get(url)
+        self.assertEqual(response.context["stats"]["total_students"], 3)
+        self.assertEqual(response.context["classes_snapshot"][0]["student_count"], 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_student("Dare", "2024-0004")
+        response = self.client.get(url)
+        self.assertEqual(response.context["stats"]["total_students"], 4)
+        self.assertEqual(response.context["classes_snapshot"][0]["student_count"], 4)
+
+
+class ReferenceDataTests(AcademicsTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reference_data_is_loaded_once(self):
+        with self.assertNumQueries(5):
+            data = reference_data()
+        self.assertEqual(data["current_term"], self.term)
+        self.assertEqual(data["current_session"], self.session)
+        self.assertEqual(list(data["subjects"]), [self.english.id, self.maths.id])
+        self.assertEqual(list(data["classrooms"]), [self.classroom.id])
+        self.assertEqual(data["assessment_weights"], {"CA": 40, "EXAM": 60})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_current_term().session, self.session)
+
+    def test_saving_reference_models_rebuilds_the_entry(self):
+        reference_data()
+        second = Term.objects.create(
+            session=self.session,
+            name="Second",
+            start_date="2025-01-05",
+            end_date="2025-04-10",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Term.objects.filter(pk=self.term.pk).update(is_current=False)
+            second.is_current = True
+            second.save()
+        self.assertEqual(get_current_term(), second)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exam_type.weight = 70
+            self.exam_type.save()
+        self.assertEqual(reference_data()["assessment_weights"]["EXAM"], 70)
+
+    def test_templates_receive_reference_data(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse("academics:subject_list"))
+        self.assertEqual(response.context["reference"], load_reference_data())
+        self.assertContains(response, f"{self.session.name} &middot; First")
+
+
+
+class StreamingExportTests(AcademicsTestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser(username="admin", password="password")
+        self.client.force_login(admin)
+        for student, exam in zip(self.students, [57, 40, 10]):
+            self.record("MTH", "exam", student, exam)
+        calculate_class_results(self.term, self.classroom)
+
+    def export(self, dataset, **params):
+        response = self.client.get(
+            reverse("academics:export_data_csv", args=[dataset]), params
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_term_results_extract_applies_filters(self):
+        rows = self.export("term_results")
+        self.assertEqual(rows[0][:4], ["Session", "Term", "Class", "Arm"])
+        self.assertEqual(len(rows), 1 + 6)
+
+        rows = self.export(
+            "term_results", subject=self.maths.id, min_score=20, max_score=90
+        )
+        self.assertEqual(
+            sorted(row[rows[0].index("Total Score")] for row in rows[1:]),
+            ["40.00", "57.00"],
+        )
+
+    def test_rows_are_read_in_chunks(self):
+        rows = list(
+            EXTRACTS["student_scores"].stream({"term": self.term}, chunk_size=1)
+        )
+        self.assertEqual(len(rows), 1 + 3)
+
+    def test_attendance_filters_by_term_dates(self):
+        Attendance.objects.create(
+            student=self.students[0], date="2024-10-01", status="Present"
+        )
+        Attendance.objects.create(
+            student=self.students[0], date="2025-02-01", status="Absent"
+        )
+        rows = self.export("attendance", term=self.term.id)
+        self.assertEqual([row[0] for row in rows[1:]], ["2024-10-01"])
+
+    def test_unknown_dataset_is_not_found(self):
+        response = self.client.get(
+            reverse("academics:export_data_csv", args=["passwords"])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ExcelExportTests(AcademicsTestCase):
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def load(self, response):
+        self.assertEqual(response.status_code, 200)
+        return load_workbook(io.BytesIO(response.content)).active
+
+    def test_assessment_template_lists_class(self):
+        assessment = self.assessments["MTH"]["exam"]
+        sheet = self.load(
+            self.client.get(
+                reverse("academics:export_assessment_template", args=[assessment.id])
+            )
+        )
+        rows = list(sheet.values)
+        self.assertEqual(
+            rows[0], ("Admission No", "Student Name", "Class", "Score", "Remarks")
+        )
+        self.assertEqual(rows[1][:3], ("2024-0001", "Adams Test", "JSS1A"))
+        self.assertEqual(len(rows), 4)
+        self.assertGreaterEqual(sheet.column_dimensions["B"].width, 30)
+
+    def test_class_results_workbook_matches_term_results(self):
+        self.record("MTH", "exam", self.students[0], 57)
+        calculate_class_results(self.term, self.classroom)
+
+        # Session, user, class, term, the teacher's subjects, then the rows
+        with self.assertNumQueries(6):
+            response = self.client.get(
+                reverse(
+                    "academics:export_class_results",
+                    args=[self.term.id, self.classroom.id],
+                )
+            )
+        rows = list(self.load(response).values)
+        self.assertEqual(len(rows), 1 + TermResult.objects.count())
+        adams_maths = next(
+            row for row in rows if row[1] == "Adams Test" and row[2] == "Mathematics"
+        )
+        self.assertEqual(adams_maths[5], 57)
+
+    def test_exports_are_limited_to_staff_and_their_assignments(self):
+        calculate_class_results(self.term, self.classroom)
+        template_url = reverse(
+            "academics:export_assessment_template",
+            args=[self.assessments["MTH"]["exam"].id],
+        )
+        results_url = reverse(
+            "academics:export_class_results", args=[self.term.id, self.classroom.id]
+        )
+
+        self.client.force_login(self.students[0].user)
+        self.assertEqual(self.client.get(template_url).status_code, 302)
+        self.assertEqual(self.client.get(results_url).status_code, 302)
+
+        other = User.objects.create_user(username="other", is_staff=True)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(template_url).status_code, 404)
+        self.assertEqual(self.client.get(results_url).status_code, 404)
+
+        SubjectAssignment.objects.filter(subject=self.english).update(teacher=other)
+        rows = list(self.load(self.client.get(results_url)).values)[1:]
+        self.assertEqual({row[2] for row in rows}, {"English"})
+
+
+class BroadsheetTests(AcademicsTestCase):
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        for student, ca, exam in zip(self.students, [10, 5, 0], [60, 40, 20]):
+            self.record("MTH", "ca", student, ca)
+            self.record("MTH", "exam", student, exam)
+            self.record("ENG", "exam", student, exam)
+        calculate_class_results(self.term, self.classroom)
+
+    def test_pivots_results_for_several_classes_in_one_query(self):
+        other = ClassRoom.objects.create(level="JSS1", arm="B", session=self.session)
+        with self.assertNumQueries(1):
+            sheet, empty = load_broadsheets(self.term, [self.classroom, other])
+
+        self.assertEqual(empty.rows, [])
+        self.assertEqual(
+            [name for _, name, _ in sheet.subjects], ["English", "Mathematics"]
+        )
+        best = sheet.rows[0]
+        adams = TermResult.objects.filter(student=self.students[0])
+        self.assertEqual(best["name"], "Adams Test")
+        self.assertEqual(best["position"], 1)
+        self.assertEqual(best["total"], sum(r.total_score for r in adams))
+        maths = adams.get(subject=self.maths)
+        self.assertEqual(
+            list(best["scores"][self.maths.id]),
+            [maths.ca_total, maths.exam_score, maths.total_score, maths.grade],
+        )
+        self.assertEqual(
+            sheet.header[2:6], ["ENG CA", "ENG Exam", "ENG Total", "ENG Grade"]
+        )
+
+    def test_html_csv_and_level_workbook(self):
+        url = reverse(
+            "academics:class_broadsheet", args=[self.term.id, self.classroom.id]
+        )
+        response = self.client.get(url)
+        self.assertContains(response, "Adams Test")
+
+        response = self.client.get(url, {"format": "csv"})
+        rows = list(
+            csv.reader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][-1], "1")
+
+        ClassRoom.objects.create(level="JSS1", arm="B", session=self.session)
+        response = self.client.get(
+            reverse("academics:level_broadsheets", args=[self.term.id, "JSS1"])
+        )
+        workbook = load_workbook(io.BytesIO(response.content))
+        self.assertEqual(workbook.sheetnames, ["JSS1A", "JSS1B"])
+        self.assertEqual(workbook["JSS1A"].max_row, 4)
+
+    def test_command_writes_workbook(self):
+        output = f"{self.enterContext(tempfile.TemporaryDirectory())}/jss1.xlsx"
+        call_command(
+            "export_broadsheet",
+            output,
+            term=self.term.id,
+            level="JSS1",
+            stdout=StringIO(),
+        )
+        self.assertEqual(load_workbook(output).sheetnames, ["JSS1A"])
+
+
+class AttendanceTests(AcademicsTestCase):
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.url = reverse("academics:take_attendance")
+
+    def submit(self, **fields):
+        data = {"classroom_id": self.classroom.id, "date": "2024-10-01"}
+        return self.client.post(self.url, {**data, **fields})
+
+    def test_register_is_saved_in_one_statement(self):
+        adams, bello, chukwu = self.students
+        Attendance.objects.create(student=adams, date="2024-10-01", status="Absent")
+
+        # Session, user, classroom and roster, then a single upsert
+        with self.assertNumQueries(5):
+            self.submit(
+                **{
+                    f"status_{adams.id}": "Present",
+                    f"status_{bello.id}": "Late",
+                    f"remarks_{bello.id}": " Bus ",
+                }
+            )
+
+        records = {a.student_id: a for a in Attendance.objects.all()}
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[adams.id].status, "Present")
+        self.assertEqual(records[bello.id].remarks, "Bus")
+        self.assertEqual(records[bello.id].marked_by, self.teacher)
+
+    def test_mark_all_present_with_exceptions(self):
+        absent = self.students[2]
+        self.submit(mode="all_present", **{f"status_{absent.id}": "Absent"})
+        self.assertEqual(
+            dict(Attendance.objects.values_list("student_id", "status")),
+            {
+                self.students[0].id: "Present",
+                self.students[1].id: "Present",
+                absent.id: "Absent",
+            },
+        )
+
+    def test_invalid_status_saves_nothing(self):
+        response = self.submit(
+            mode="all_present", **{f"status_{self.students[0].id}": "Asleep"}
+        )
+        self.assertFalse(Attendance.objects.exists())
+        self.assertIn(
+            "Unknown attendance status: Asleep",
+            [str(m) for m in get_messages(response.wsgi_request)],
+        )
+
+    def test_report_counts_statuses_in_one_grouped_query(self):
+        adams, bello, _ = self.students
+        for day, status in enumerate(["Present", "Late", "Absent", "Present"], 1):
+            Attendance.objects.create(
+                student=adams, date=f"2024-10-0{day}", status=status
+            )
+        Attendance.objects.create(student=bello, date="2024-10-01", status="Excused")
+        # Outside the term
+        Attendance.objects.create(student=bello, date="2025-01-10", status="Absent")
+
+        url = reverse("academics:attendance_report")
+        params = {"classroom": self.classroom.id, "term": self.term.id}
+        # Session, user, term, classroom, roster and the grouped counts
+        with self.assertNumQueries(6):
+            response = self.client.get(url, {**params, "format": "csv"})
+            content = b"".join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[1][1:], ["Adams Test", "2", "1", "1", "0", "4", "50"])
+        self.assertEqual(rows[2][2:], ["0", "0", "0", "1", "1", "0"])
+        self.assertEqual(rows[3][2:], ["0", "0", "0", "0", "0", "0"])
+
+        response = self.client.get(
+            url, {"classroom": self.classroom.id, "session": self.session.id}
+        )
+        self.assertEqual(
+            response.context["summary_stats"],
+            {"Present": 2, "Absent": 2, "Late": 1, "Excused": 1},
+        )
+
+
+@mock.patch("academics.pdf.render_pdf", side_effect=lambda html, *args: b"%PDF " + html[:20].encode())
+@override_settings(REPORT_CARD_PDF_WORKERS=1)
+class SurgeModeTests(AcademicsTestCase):
+    def setUp(self):
+        cache.clear()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.enterContext(self.settings(REPORT_CARD_PDF_CACHE_DIR=cache_dir))
+
+        for student in self.students:
+            self.record("MTH", "exam", student, 40)
+        calculate_class_results(self.term, self.classroom)
+        generate_class_report_cards(self.term, self.classroom)
+        admin = User.objects.create_superuser(username="admin", password="password")
+        self.client.force_login(admin)
+
+    def test_bulk_publish_starts_surge_and_warms_summaries(self, render_pdf):
+        self.assertFalse(surge_active())
+        ids = list(ReportCard.objects.values_list("id", flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("academics:bulk_publish_report_cards"), {"ids": ids}
+            )
+        self.assertTrue(surge_active())
+
+        call_command("run_jobs", once=True, stdout=StringIO())
+        job = Job.objects.get(kind="warm_report_card_pdfs")
+        self.assertEqual(job.result["summaries"], 3)
+        self.assertEqual(render_pdf.call_count, 3)
+
+        with self.assertNumQueries(0):
+            summary = report_summary(self.students[0].id)
+        self.assertEqual([card["id"] for card in summary["report_cards"]], [ids[0]])
+        self.assertEqual(summary["latest"]["term"], str(self.term))
+
+    def test_bulk_publish_invalidates_after_updating(self, render_pdf):
+        # A summary rebuilt between the two must not see the old rows
+        def check_published(model, field, values):
+            self.assertFalse(ReportCard.objects.filter(is_published=False).exists())
+
+        ids = list(ReportCard.objects.values_list("id", flat=True))
+        with mock.patch(
+            "academics.views.invalidate_for", side_effect=check_published
+        ) as invalidate:
+            self.client.post(
+                reverse("academics:bulk_publish_report_cards"), {"ids": ids}
+            )
+        invalidate.assert_called_once()
+
+    def test_report_page_answers_conditional_requests(self, render_pdf):
+        card = ReportCard.objects.get(student=self.students[0])
+        card.publish()
+        start_surge()
+        # Students get a portal account when they are created
+        self.client.force_login(self.students[0].user)
+        url = reverse("portal:student_reports")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["report_cards"][0]["id"], card.id)
+        self.assertIn("ETag", response)
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertFalse(any("academics_reportcard" in q["sql"] for q in queries))
+
+        # A new message changes the unread count the page shows
+        with self.captureOnCommitCallbacks(execute=True):
+            PortalMessage.objects.create(
+                sender=self.teacher,
+                recipient=self.students[0].user,
+                student=self.students[0],
+                subject="Results",
+                message="Well done.",
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+        # Pending flash messages are always rendered
+        with mock.patch(
+            "academics.surge.messages.get_messages", return_value=["Saved."]
+        ):
+            flashed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(flashed.status_code, 200)
+
+        # Unpublishing changes the page
+        with self.captureOnCommitCallbacks(execute=True):
+            card.unpublish()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["report_cards"], [])
+
+    def test_cached_pdf_answers_conditional_requests(self, render_pdf):
+        card = ReportCard.objects.get(student=self.students[0])
+        card.publish()
+        url = reverse("academics:report_card_pdf", args=[card.pk])
+
+        response = self.client.get(url)
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(render_pdf.call_count, 1)
+
+    def test_admins_switch_surge_mode(self, render_pdf):
+        url = reverse("academics:toggle_surge_mode")
+        self.client.post(url, {"enabled": "1"})
+        self.assertTrue(surge_active())
+        self.client.post(url, {"enabled": "0"})
+        self.assertFalse(surge_active())
@@ -10,6 +10,11 @@ urlpatterns = [
     path("dashboard/", views.academics_dashboard, name="dashboard"),
     # Publication Center
     path("publications/", views.publication_center, name="publication_center"),
+    path(
+        "publications/surge-mode/",
+        views.toggle_surge_mode,
+        name="toggle_surge_mode",
+    ),
     # Sessions
     path("sessions/", views.session_list, name="session_list"),
     path("sessions/create/", views.session_create, name="session_create"),
@@ -105,10 +110,51 @@ urlpatterns = [
         views.bulk_score_entry,
         name="bulk_score_entry",
     ),
+    path(
+        "assessments/<int:assessment_id>/template.xlsx",
+        views.export_assessment_template,
+        name="export_assessment_template",
+    ),
     path("scores/import/", views.import_scores, name="import_scores"),
+    path("scores/ajax/save/", views.ajax_save_score, name="ajax_save_score"),
+    path(
+        "assessments/<int:assessment_id>/scores/ajax/save/",
+        views.ajax_save_scores,
+        name="ajax_save_scores",
+    ),
     # Report Cards
     path("report-cards/", views.report_card_list, name="report_card_list"),
     path("report-cards/<int:pk>/", views.report_card_detail, name="report_card_detail"),
+    path(
+        "report-cards/<int:pk>/pdf/",
+        views.generate_report_card_pdf,
+        name="report_card_pdf",
+    ),
+    path(
+        "report-cards/terms/<int:term_id>/classes/<int:classroom_id>/pdf.zip",
+        views.report_cards_pdf_zip,
+        name="report_cards_pdf_zip",
+    ),
+    path(
+        "results/terms/<int:term_id>/classes/<int:classroom_id>/export.xlsx",
+        views.export_class_results,
+        name="export_class_results",
+    ),
+    path(
+        "results/terms/<int:term_id>/classes/<int:classroom_id>/broadsheet/",
+        views.class_broadsheet,
+        name="class_broadsheet",
+    ),
+    path(
+        "results/terms/<int:term_id>/levels/<str:level>/broadsheets.xlsx",
+        views.level_broadsheets,
+        name="level_broadsheets",
+    ),
+    path(
+        "report-cards/terms/<int:term_id>/export/",
+        views.export_report_cards,
+        name="export_report_cards",
+    ),
     path(
         "report-cards/<int:pk>/interactive/",
         views.report_card_detail_interactive,
@@ -171,6 +217,11 @@ urlpatterns = [
         views.export_class_performance_csv,
         name="export_class_performance_csv",
     ),
+    path(
+        "analytics/export/data/<slug:dataset>/",
+        views.export_data_csv,
+        name="export_data_csv",
+    ),
     path(
         "analytics/recalculate/",
         views.recalculate_term_results,
@@ -199,4 +250,8 @@ urlpatterns = [
     path(
         "timetables/<int:pk>/delete/", views.timetable_delete, name="timetable_delete"
     ),
+    # Background Jobs
+    path("jobs/<int:pk>/", views.job_detail, name="job_detail"),
+    path("jobs/<int:pk>/status/", views.job_status, name="job_status"),
+    path("jobs/<int:pk>/download/", views.job_download, name="job_download"),
 ]
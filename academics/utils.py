@@ -1,7 +1,14 @@
 # academics/utils.py
 
-from django.db.models import Avg, Count, Q
-from .models import TermResult, StudentScore, Assessment
+from django.db import connections, router
+from django.db.models import Avg, Count, Sum
+from .models import (
+    TermResult,
+    StudentScore,
+    Assessment,
+    SubjectResultRollup,
+    grade_for,
+)
 
 
 def calculate_grade(score):
@@ -14,18 +21,7 @@ def calculate_grade(score):
     Returns:
         Letter grade (A-F)
     """
-    if score >= 75:
-        return "A"
-    elif score >= 65:
-        return "B"
-    elif score >= 55:
-        return "C"
-    elif score >= 45:
-        return "D"
-    elif score >= 40:
-        return "E"
-    else:
-        return "F"
+    return grade_for(score)
 
 
 def calculate_grade_point(grade):
@@ -99,6 +95,8 @@ def calculate_subject_statistics(subject, term, classroom):
     """
     Calculate statistics for a subject in a class
 
+    Reads the precomputed SubjectResultRollup row.
+
     Args:
         subject: Subject object
         term: Term object
@@ -107,36 +105,22 @@ def calculate_subject_statistics(subject, term, classroom):
     Returns:
         Dictionary with statistics
     """
-    results = TermResult.objects.filter(subject=subject, term=term, classroom=classroom)
+    rollup = SubjectResultRollup.objects.filter(
+        subject=subject, term=term, classroom=classroom
+    ).first()
 
-    if not results.exists():
+    if rollup is None or not rollup.result_count:
         return None
 
-    stats = results.aggregate(
-        average=Avg("total_score"),
-        pass_count=Count("id", filter=Q(total_score__gte=40)),
-        total_students=Count("id"),
-    )
-
-    stats["fail_count"] = stats["total_students"] - stats["pass_count"]
-    stats["pass_rate"] = (
-        (stats["pass_count"] / stats["total_students"] * 100)
-        if stats["total_students"] > 0
-        else 0
-    )
-
-    # Grade distribution
-    stats["grade_distribution"] = {
-        "A": results.filter(grade="A").count(),
-        "B": results.filter(grade="B").count(),
-        "C": results.filter(grade="C").count(),
-        "D": results.filter(grade="D").count(),
-        "E": results.filter(grade="E").count(),
-        "F": results.filter(grade="F").count(),
+    return {
+        "average": rollup.average_score,
+        "pass_count": rollup.pass_count,
+        "total_students": rollup.result_count,
+        "fail_count": rollup.fail_count,
+        "pass_rate": rollup.pass_rate,
+        "grade_distribution": rollup.grade_distribution,
     }
 
-    return stats
-
 
 def get_student_rank_suffix(position):
     """
@@ -279,6 +263,8 @@ def get_subject_performance_summary(term, classroom=None):
     """
     Get performance summary for all subjects
 
+    Aggregates the per-class SubjectResultRollup rows of each subject.
+
     Args:
         term: Term object
         classroom: Optional ClassRoom object to filter by
@@ -286,32 +272,32 @@ def get_subject_performance_summary(term, classroom=None):
     Returns:
         List of dictionaries with subject performance data
     """
-    results = TermResult.objects.filter(term=term)
+    rollups = SubjectResultRollup.objects.filter(term=term)
 
     if classroom:
-        results = results.filter(classroom=classroom)
+        rollups = rollups.filter(classroom=classroom)
 
     # Group by subject
     summary = (
-        results.values("subject__name")
+        rollups.values("subject__name")
         .annotate(
-            avg_score=Avg("total_score"),
-            total_students=Count("student", distinct=True),
-            pass_count=Count("id", filter=Q(total_score__gte=40)),
+            score_sum=Sum("score_sum"),
+            total_students=Sum("result_count"),
+            pass_count=Sum("pass_count"),
         )
-        .order_by("-avg_score")
+        .order_by()
     )
 
-    # Add pass rate
+    # Add average and pass rate
+    summary = list(summary)
     for item in summary:
-        item["pass_rate"] = (
-            (item["pass_count"] / item["total_students"] * 100)
-            if item["total_students"] > 0
-            else 0
-        )
-        item["fail_count"] = item["total_students"] - item["pass_count"]
+        total = item["total_students"]
+        item["avg_score"] = item.pop("score_sum") / total if total else 0
+        item["pass_rate"] = (item["pass_count"] / total * 100) if total > 0 else 0
+        item["fail_count"] = total - item["pass_count"]
 
-    return list(summary)
+    summary.sort(key=lambda item: item["avg_score"], reverse=True)
+    return summary
 
 
 def compare_term_performance(student, term1, term2):
@@ -408,3 +394,30 @@ def calculate_cumulative_average(student, session):
     cumulative_avg = results.aggregate(avg=Avg("total_score"))["avg"]
 
     return round(cumulative_avg, 2) if cumulative_avg else None
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=500):
+    """
+    Insert or update model instances with one INSERT ... ON CONFLICT per batch
+
+    Args:
+        model: Model class to write
+        objs: List of unsaved model instances
+        unique_fields: Field names forming the unique constraint used as conflict target
+        update_fields: Field names to overwrite when the row already exists
+        batch_size: Maximum number of rows per statement
+
+    Returns:
+        List of instances passed to bulk_create
+    """
+    options = {
+        "update_conflicts": True,
+        "update_fields": update_fields,
+        "batch_size": batch_size,
+    }
+    # MySQL upserts on any unique key and rejects an explicit conflict target
+    connection = connections[router.db_for_write(model)]
+    if connection.features.supports_update_conflicts_with_target:
+        options["unique_fields"] = unique_fields
+
+    return model.objects.bulk_create(objs, **options)
@@ -3,17 +3,23 @@ from django.views.generic import TemplateView
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Q, Count, Avg, Sum, Max, Min
-from django.http import HttpResponse, JsonResponse
-import csv
+from django.db.models import Q, Count, Avg, Max, Min
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.text import slugify
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
 from django.db import transaction
-import pandas as pd
 from datetime import datetime
 import json
+import os
 
 from .models import (
     AcademicSession,
@@ -29,6 +35,8 @@ from .models import (
     PerformanceComment,
     Timetable,
     Attendance,
+    Job,
+    SubjectResultRollup,
 )
 from .forms import (
     AcademicSessionForm,
@@ -48,7 +56,45 @@ from .forms import (
     TimetableForm,
     PerformanceCommentForm,
 )
+from records.cache import cached, invalidate_for, model_tag
 from records.models import Student
+from .reference import get_current_session, get_current_term, reference_data
+from .surge import conditional_response, end_surge, start_surge, surge_active
+from .analytics import results_analytics, rollup_analytics, top_performers
+from .excel import (
+    NAME_WIDTH,
+    REMARKS_WIDTH,
+    XLSX_CONTENT_TYPE,
+    add_sheet,
+    full_name,
+    new_workbook,
+    xlsx_response,
+)
+from .attendance import (
+    PRESENT,
+    AttendanceError,
+    attendance_summary,
+    parse_attendance,
+    save_attendance,
+)
+from .broadsheet import (
+    SUBJECT_FIELDS,
+    broadsheet_csv,
+    load_broadsheets,
+    write_broadsheet_workbook,
+)
+from .exports import EXTRACTS, stream_csv
+from .jobs import enqueue
+from .pdf import (
+    cached_report_card_pdf,
+    is_cacheable,
+    render_class_pdfs,
+    render_report_card_pdf,
+    stream_zip,
+)
+from .report_cards import generate_class_report_cards, parse_report_data
+from .results import calculate_class_results
+from .scores import build_score, parse_score, save_scores
 from .lock_views import (
     lock_assessment_scores,
     unlock_assessment_scores,
@@ -62,21 +108,16 @@ from .lock_views import (
 # ============================================
 
 
-@login_required
-def academics_dashboard(request):
-    """Main academics dashboard"""
-    current_term = Term.objects.filter(is_current=True).first()
-    current_session = AcademicSession.objects.filter(is_current=True).first()
+def dashboard_statistics(current_term, current_session):
+    """
+    School-wide figures for the academics dashboard
 
-    # Get teacher's assignments if not admin
-    if not request.user.is_superuser:
-        assignments = SubjectAssignment.objects.filter(
-            teacher=request.user, term=current_term
-        )
-    else:
-        assignments = SubjectAssignment.objects.filter(term=current_term)
+    Cached per term and session until the underlying data changes, so most
+    dashboard loads skip these counts entirely.
 
-    # Statistics
+    Returns:
+        Dictionary of context values
+    """
     stats = {
         "total_students": Student.objects.count(),
         "total_subjects": Subject.objects.count(),
@@ -93,15 +134,6 @@ def academics_dashboard(request):
         else 0,
     }
 
-    # Recent assessments
-    recent_assessments = (
-        Assessment.objects.filter(assignment__teacher=request.user).order_by(
-            "-created_at"
-        )[:5]
-        if not request.user.is_superuser
-        else Assessment.objects.order_by("-created_at")[:5]
-    )
-
     # Performance summary (if current term exists)
     performance_data = None
     if current_term:
@@ -111,47 +143,83 @@ def academics_dashboard(request):
             lowest_score=Min("total_score"),
         )
 
-    # Prepare additional context keys expected by the dashboard template
-    total_sessions = AcademicSession.objects.count()
-    current_term_name = current_term.name if current_term else "-"
-    total_classes = ClassRoom.objects.count()
-    total_subjects = Subject.objects.count()
-    pending_assessments = stats.get("pending_scores", 0)
+    # Classes snapshot, with teachers and head counts fetched in one query
+    classes_snapshot = [
+        {
+            "classroom": str(c),
+            "class_teacher_name": c.class_teacher.get_full_name()
+            if c.class_teacher
+            else "-",
+            "student_count": c.student_count,
+        }
+        for c in ClassRoom.objects.select_related("class_teacher").annotate(
+            student_count=Count("students")
+        )
+    ]
+
+    return {
+        "stats": stats,
+        "performance_data": performance_data,
+        "total_sessions": AcademicSession.objects.count(),
+        "total_classes": ClassRoom.objects.count(),
+        "total_subjects": stats["total_subjects"],
+        "pending_assessments": stats["pending_scores"],
+        "classes_snapshot": classes_snapshot,
+    }
+
+
+@login_required
+def academics_dashboard(request):
+    """Main academics dashboard"""
+    current_term = get_current_term()
+    current_session = get_current_session()
+
+    # Get teacher's assignments if not admin
+    if not request.user.is_superuser:
+        assignments = SubjectAssignment.objects.filter(
+            teacher=request.user, term=current_term
+        )
+    else:
+        assignments = SubjectAssignment.objects.filter(term=current_term)
+
+    # Recent assessments
+    recent_assessments = (
+        Assessment.objects.filter(assignment__teacher=request.user).order_by(
+            "-created_at"
+        )[:5]
+        if not request.user.is_superuser
+        else Assessment.objects.order_by("-created_at")[:5]
+    )
 
     # Recent scores
     recent_scores = StudentScore.objects.select_related(
         "student", "assessment"
     ).order_by("-submitted_at")[:5]
 
-    # Classes snapshot
-    classes_qs = ClassRoom.objects.all()
-    classes_snapshot = []
-    for c in classes_qs:
-        classes_snapshot.append(
-            {
-                "classroom": str(c),
-                "class_teacher_name": c.class_teacher.get_full_name()
-                if c.class_teacher
-                else "-",
-                "student_count": c.students.count(),
-            }
-        )
+    term_id = current_term.pk if current_term else None
+    statistics = cached(
+        "academics.dashboard",
+        {"term": term_id, "session": current_session.pk if current_session else None},
+        [
+            model_tag(TermResult, term=term_id),
+            model_tag(StudentScore),
+            model_tag(Student),
+            model_tag(Assessment),
+            model_tag(ClassRoom),
+            model_tag(Subject),
+            model_tag(AcademicSession),
+        ],
+        lambda: dashboard_statistics(current_term, current_session),
+    )
 
     context = {
         "current_term": current_term,
         "current_session": current_session,
+        "current_term_name": current_term.name if current_term else "-",
         "assignments": assignments,
-        "stats": stats,
         "recent_assessments": recent_assessments,
-        "performance_data": performance_data,
-        # Template-friendly variables
-        "total_sessions": total_sessions,
-        "current_term_name": current_term_name,
-        "total_classes": total_classes,
-        "total_subjects": total_subjects,
-        "pending_assessments": pending_assessments,
         "recent_scores": recent_scores,
-        "classes_snapshot": classes_snapshot,
+        **statistics,
     }
 
     return render(request, "academics/dashboard.html", context)
@@ -163,7 +231,7 @@ def publication_center(request):
     """A central place to manage the publication status of assessments and report cards."""
 
     # Get current term for default filtering
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     # --- Filtering ---
     selected_term_id = request.GET.get(
@@ -198,18 +266,33 @@ def publication_center(request):
         "assessments": assessments_qs,
         "report_cards": report_cards_qs,
         "terms": Term.objects.all().order_by("-start_date"),
-        "classrooms": ClassRoom.objects.filter(session__is_current=True).order_by(
-            "level", "arm"
-        ),
+        "classrooms": reference_data()["classrooms"].values(),
         "selected_term_id": int(selected_term_id) if selected_term_id else None,
         "selected_classroom_id": int(selected_classroom_id)
         if selected_classroom_id
         else None,
+        "surge_active": surge_active(),
     }
 
     return render(request, "academics/publication_center.html", context)
 
 
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+@require_POST
+def toggle_surge_mode(request):
+    """Switch results-day surge mode for the portal on or off"""
+    if request.POST.get("enabled") == "1":
+        start_surge()
+        messages.success(
+            request, "Surge mode is on: portal report pages are served from cache."
+        )
+    else:
+        end_surge()
+        messages.success(request, "Surge mode is off.")
+    return redirect("academics:publication_center")
+
+
 # ============================================
 # ACADEMIC SESSION & TERM MANAGEMENT
 # ============================================
@@ -418,7 +501,7 @@ def subject_delete(request, pk):
 def classroom_list(request):
     """List all classrooms"""
     classrooms = ClassRoom.objects.all().order_by("level", "arm")
-    current_session = AcademicSession.objects.filter(is_current=True).first()
+    current_session = get_current_session()
 
     if current_session:
         classrooms = classrooms.filter(session=current_session)
@@ -625,7 +708,7 @@ def move_student_to_class(request):
 def assignment_list(request):
     """List all subject assignments"""
     assignments = SubjectAssignment.objects.all().order_by("-term__session__start_date")
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     if current_term:
         assignments = assignments.filter(term=current_term)
@@ -880,41 +963,29 @@ def bulk_score_entry(request, assessment_id):
             ).order_by("surname", "other_name")
 
     if request.method == "POST":
-        saved_count = 0
         errors = []
+        pending = []
 
+        # Validate the whole grid first, then write it in one upsert
         for student in students:
-            score_key = f"score_{student.id}"
-            remarks_key = f"remarks_{student.id}"
+            score_value = request.POST.get(f"score_{student.id}", "").strip()
+            remarks_value = request.POST.get(f"remarks_{student.id}", "").strip()
 
-            score_value = request.POST.get(score_key, "").strip()
-            remarks_value = request.POST.get(remarks_key, "").strip()
+            if not score_value:
+                continue
 
-            if score_value:
-                try:
-                    score_float = float(score_value)
+            score, error = parse_score(score_value, assessment.max_score)
+            if error:
+                errors.append(f"{student.full_name}: {error}")
+                continue
 
-                    if score_float < 0 or score_float > assessment.max_score:
-                        errors.append(
-                            f"{student.full_name}: Score must be between 0 and {assessment.max_score}"
-                        )
-                        continue
-
-                    # Create or update score - let the model calculate percentage and grade
-                    score_obj, created = StudentScore.objects.update_or_create(
-                        assessment=assessment,
-                        student=student,
-                        defaults={
-                            "score": score_float,
-                            "remarks": remarks_value,
-                            "submitted_by": request.user,
-                        },
-                    )
-                    saved_count += 1
-
-                except (ValueError, TypeError):
-                    errors.append(f"{student.full_name}: Invalid score format")
-                    continue
+            pending.append(
+                build_score(assessment, student.id, score, remarks_value, request.user)
+            )
+
+        # One transaction so dependent term results refresh once on commit
+        with transaction.atomic():
+            saved_count = save_scores(pending)
 
         if saved_count > 0:
             messages.success(request, f"✅ Successfully saved {saved_count} score(s)!")
@@ -949,68 +1020,21 @@ def bulk_score_entry(request, assessment_id):
 
 @login_required
 def import_scores(request):
-    """Import scores from Excel/CSV"""
+    """Import scores from Excel/CSV in the background"""
     if request.method == "POST":
         form = ScoreImportForm(request.POST, request.FILES)
         if form.is_valid():
             assessment = form.cleaned_data["assessment"]
-            file = request.FILES["file"]
-
-            try:
-                # Read file based on extension
-                if file.name.endswith(".csv"):
-                    df = pd.read_csv(file)
-                else:
-                    df = pd.read_excel(file)
-
-                # Expected columns: admission_no, score, remarks (optional)
-                success_count = 0
-                error_count = 0
-                errors = []
-
-                with transaction.atomic():
-                    for index, row in df.iterrows():
-                        try:
-                            student = Student.objects.get(
-                                admission_no=row["admission_no"]
-                            )
-
-                            StudentScore.objects.update_or_create(
-                                assessment=assessment,
-                                student=student,
-                                defaults={
-                                    "score": row["score"],
-                                    "remarks": row.get("remarks", ""),
-                                    "submitted_by": request.user,
-                                },
-                            )
-                            success_count += 1
-                        except Student.DoesNotExist:
-                            error_count += 1
-                            errors.append(
-                                f"Row {index + 2}: Student with admission no {row['admission_no']} not found"
-                            )
-                        except Exception as e:
-                            error_count += 1
-                            errors.append(f"Row {index + 2}: {str(e)}")
-
-                if success_count > 0:
-                    messages.success(
-                        request, f"{success_count} scores imported successfully!"
-                    )
-
-                if error_count > 0:
-                    messages.warning(
-                        request,
-                        f"{error_count} rows had errors. Check the details below.",
-                    )
-                    for error in errors[:10]:  # Show first 10 errors
-                        messages.error(request, error)
-
-                return redirect("academics:assessment_detail", pk=assessment.id)
-
-            except Exception as e:
-                messages.error(request, f"Error processing file: {str(e)}")
+
+            # Expected columns: admission_no, score, remarks (optional)
+            job = enqueue(
+                "import_scores",
+                user=request.user,
+                input_file=request.FILES["file"],
+                assessment_id=assessment.id,
+            )
+            messages.info(request, f"Importing scores for {assessment}.")
+            return redirect("academics:job_detail", pk=job.pk)
     else:
         form = ScoreImportForm()
 
@@ -1043,10 +1067,18 @@ def report_card_list(request):
     page = request.GET.get("page")
     report_cards = paginator.get_page(page)
 
+    # Whole-class PDF download is offered once a term and class are picked
+    pdf_zip_url = None
+    if term_id and term_id.isdigit() and classroom_id and classroom_id.isdigit():
+        pdf_zip_url = reverse(
+            "academics:report_cards_pdf_zip", args=[term_id, classroom_id]
+        )
+
     context = {
         "report_cards": report_cards,
         "terms": Term.objects.all(),
         "classrooms": ClassRoom.objects.all(),
+        "pdf_zip_url": pdf_zip_url,
     }
 
     return render(request, "academics/report_card_list.html", context)
@@ -1120,7 +1152,7 @@ def generate_single_report_card(request):
     if term_id:
         term = get_object_or_404(Term, id=int(term_id))
     else:
-        term = Term.objects.filter(is_current=True).first()
+        term = get_current_term()
         if not term:
             messages.error(request, "No current term found. Please select a term.")
             return redirect(
@@ -1128,54 +1160,16 @@ def generate_single_report_card(request):
             )
     classroom = get_object_or_404(ClassRoom, id=classroom_id)
 
-    # Ensure term results exist for this student/class/term by reusing calculate_term_results on just this class.
-    # The calculation updates/creates TermResult rows; then we build the ReportCard.
-    try:
-        # Calculate results for this class/term
-        calculate_term_results(request, term_id=term.id, classroom_id=classroom.id)
-    except Exception:
-        # Continue even if calculation view redirects; results likely computed
-        pass
+    # Ensure term results exist for this student/class/term before building the ReportCard.
+    calculate_class_results(term, classroom)
 
-    # Aggregate averages and create/update report card
-    term_results = TermResult.objects.filter(
-        student=student, term=term, classroom=classroom
-    )
-    if not term_results.exists():
+    if not generate_class_report_cards(term, classroom, student_ids=[student.id]):
         messages.warning(request, "No term results found for this student/term/class.")
         return redirect(
             request.META.get("HTTP_REFERER", reverse("academics:report_card_list"))
         )
 
-    average_score = term_results.aggregate(avg=Avg("total_score"))["avg"] or 0
-    all_students = classroom.students.all()
-
-    # Compute rank map within class (by average across subjects)
-    averages = (
-        TermResult.objects.filter(term=term, classroom=classroom)
-        .values("student_id")
-        .annotate(avg_score=Avg("total_score"))
-        .order_by("-avg_score")
-    )
-    rank_map = {}
-    last_score = None
-    last_rank = 0
-    for idx, row in enumerate(averages, 1):
-        if row["avg_score"] != last_score:
-            last_rank = idx
-            last_score = row["avg_score"]
-        rank_map[row["student_id"]] = last_rank
-
-    report_card, _ = ReportCard.objects.update_or_create(
-        student=student,
-        term=term,
-        classroom=classroom,
-        defaults={
-            "average_score": average_score,
-            "position": rank_map.get(student.id, 0),
-            "out_of": all_students.count(),
-        },
-    )
+    report_card = ReportCard.objects.get(student=student, term=term)
     messages.success(request, f"Report card generated for {student.full_name}.")
     return redirect("academics:report_card_detail", pk=report_card.pk)
 
@@ -1190,93 +1184,19 @@ def generate_report_cards(request):
             term = form.cleaned_data["term"]
             classroom = form.cleaned_data["classroom"]
 
-            # Get all students in the class
-            students = classroom.students.all()
-            generated_count = 0
-            errors = []
-
-            # --- Start of new ranking logic ---
-            # First, calculate all student averages for the term
-            student_averages = []
-            for student in students:
-                avg = TermResult.objects.filter(student=student, term=term).aggregate(
-                    avg_score=Avg("total_score")
-                )["avg_score"]
-                if avg is not None:
-                    student_averages.append({"student_id": student.id, "average": avg})
-
-            # Sort students by average score in descending order
-            sorted_students = sorted(
-                student_averages, key=lambda x: x["average"], reverse=True
-            )
-
-            # Build a rank map that handles ties
-            rank_map = {}
-            last_score = -1
-            last_rank = 0
-            for i, data in enumerate(sorted_students, 1):
-                if data["average"] != last_score:
-                    last_rank = i
-                    last_score = data["average"]
-                rank_map[data["student_id"]] = last_rank
-            # --- End of new ranking logic ---
-
-            with transaction.atomic():
-                for student in students:
-                    # --- Collect individualized data from POST ---
-                    class_teacher_remarks = request.POST.get(
-                        f"remarks_{student.id}", ""
-                    )
-                    principal_remarks = request.POST.get(
-                        f"principal_remarks_{student.id}", ""
-                    )
-                    days_present = request.POST.get(f"days_present_{student.id}")
-                    days_absent = request.POST.get(f"days_absent_{student.id}")
-
-                    # Collect domain skills
-                    skill_fields = {
-                        "punctuality": request.POST.get(f"punctuality_{student.id}", 0),
-                        "attendance_in_class": request.POST.get(
-                            f"attendance_in_class_{student.id}", 0
-                        ),
-                        "honesty": request.POST.get(f"honesty_{student.id}", 0),
-                        "neatness": request.POST.get(f"neatness_{student.id}", 0),
-                        "handwriting": request.POST.get(f"handwriting_{student.id}", 0),
-                        "sports_and_games": request.POST.get(
-                            f"sports_and_games_{student.id}", 0
-                        ),
-                    }
-
-                    # Get all term results for this student
-                    term_results = TermResult.objects.filter(
-                        student=student, term=term, classroom=classroom
-                    )
-
-                    if term_results.exists():
-                        # Calculate overall stats
-                        average_score = (
-                            term_results.aggregate(avg=Avg("total_score"))["avg"] or 0
-                        )
-
-                        # Create or update report card
-                        report_card, created = ReportCard.objects.update_or_create(
-                            student=student,
-                            term=term,
-                            classroom=classroom,
-                            defaults={
-                                "average_score": average_score,
-                                "position": rank_map.get(student.id, 0),
-                                "out_of": all_students.count(),
-                                "class_teacher_remarks": class_teacher_remarks,
-                                "principal_remarks": principal_remarks,
-                            },
-                        )
-                        generated_count += 1
+            # Merge any per-student remarks, attendance and skills from the form
+            student_ids = classroom.students.values_list("id", flat=True)
+            report_data = parse_report_data(request.POST, student_ids)
 
-            messages.success(
-                request, f"{generated_count} report cards generated successfully!"
+            job = enqueue(
+                "generate_report_cards",
+                user=request.user,
+                term_id=term.id,
+                classroom_id=classroom.id,
+                report_data=report_data,
             )
-            return redirect("academics:report_card_list")
+            messages.info(request, f"Generating report cards for {classroom}.")
+            return redirect("academics:job_detail", pk=job.pk)
     else:
         form = BulkReportCardGenerationForm()
 
@@ -1301,9 +1221,10 @@ def prepare_report_cards(request):
 
         # Get all students and pre-fetch their existing report cards to populate the form
         students_qs = classroom.students.all().order_by("surname", "other_name")
-        existing_reports = ReportCard.objects.filter(
-            classroom=classroom, term=term
-        ).in_bulk(field_name="student_id")
+        existing_reports = {
+            report.student_id: report
+            for report in ReportCard.objects.filter(classroom=classroom, term=term)
+        }
 
         for student in students_qs:
             student.existing_report = existing_reports.get(student.id)
@@ -1374,42 +1295,10 @@ def finalize_report_cards(request):
 
     term = get_object_or_404(Term, id=term_id)
     classroom = get_object_or_404(ClassRoom, id=classroom_id)
-    students = classroom.students.all()
-
-    # --- Ranking Logic ---
-    averages = (
-        TermResult.objects.filter(term=term, classroom=classroom)
-        .values("student_id")
-        .annotate(avg_score=Avg("total_score"))
-        .order_by("-avg_score")
-    )
-
-    rank_map = {row["student_id"]: i + 1 for i, row in enumerate(averages)}
 
-    # --- Update Report Cards with Final Data ---
-    updated_count = 0
+    # Totals, averages and ranks for the whole class in one pass
     with transaction.atomic():
-        for student in students:
-            term_results = TermResult.objects.filter(
-                student=student, term=term, classroom=classroom
-            )
-            if term_results.exists():
-                total_score = (
-                    term_results.aggregate(total=Sum("total_score"))["total"] or 0
-                )
-                average_score = (
-                    term_results.aggregate(avg=Avg("total_score"))["avg"] or 0
-                )
-
-                ReportCard.objects.filter(
-                    student=student, term=term, classroom=classroom
-                ).update(
-                    total_score=total_score,
-                    average_score=average_score,
-                    position=rank_map.get(student.id, 0),
-                    out_of=students.count(),
-                )
-                updated_count += 1
+        updated_count = generate_class_report_cards(term, classroom)
 
     messages.success(
         request,
@@ -1424,175 +1313,128 @@ def finalize_report_cards(request):
 
 
 class PerformanceAnalyticsView(TemplateView):
+    """
+    Performance analytics dashboard
+
+    Filters that only narrow by session, term, class or subject are answered
+    from SubjectResultRollup rows; student and score-range filters fall back
+    to the raw TermResults. Either way the page runs a fixed number of queries.
+    """
+
     template_name = "academics/performance_analytics.html"
 
-    def get_queryset(self, form):
-        """Build filtered queryset based on form data"""
-        queryset = TermResult.objects.select_related(
-            "student", "classroom", "subject", "term", "term__session"
-        )
+    # Filters the rollup table can answer
+    ROLLUP_FILTERS = {"session", "term", "classroom", "subject"}
+
+    @staticmethod
+    def get_current_term():
+        return get_current_term()
 
+    def get_filters(self, form, current_term=None):
+        """Chosen filter values, or the current term when none were given"""
         # If no filters provided or form invalid, prefer showing current term by default
         if (
             not form.is_bound
             or not form.is_valid()
             or not any(self.request.GET.values())
         ):
-            current_term = Term.objects.filter(is_current=True).first()
-            if current_term:
-                return queryset.filter(term=current_term)
-            return queryset  # Fallback to unfiltered if no current term
+            # Fallback to unfiltered if no current term
+            return {"term": current_term} if current_term else {}
 
-        # Apply filters
-        session = form.cleaned_data.get("session")
-        if session:
-            queryset = queryset.filter(term__session=session)
-
-        term = form.cleaned_data.get("term")
-        if term:
-            queryset = queryset.filter(term=term)
-
-        classroom = form.cleaned_data.get("classroom")
-        if classroom:
-            queryset = queryset.filter(classroom=classroom)
+        return {
+            name: value
+            for name, value in form.cleaned_data.items()
+            if value is not None and value != ""
+        }
 
-        subject = form.cleaned_data.get("subject")
-        if subject:
-            queryset = queryset.filter(subject=subject)
+    def get_queryset(self, form, current_term=None):
+        """Build filtered queryset based on form data"""
+        filters = self.get_filters(form, current_term)
+        queryset = TermResult.objects.all()
 
-        student = form.cleaned_data.get("student")
-        if student:
-            queryset = queryset.filter(student=student)
+        if "session" in filters:
+            queryset = queryset.filter(term__session=filters["session"])
+        for name in ("term", "classroom", "subject", "student"):
+            if name in filters:
+                queryset = queryset.filter(**{name: filters[name]})
 
         # Apply score range filters
-        min_score = form.cleaned_data.get("min_score")
-        max_score = form.cleaned_data.get("max_score")
-
-        if min_score is not None:
-            queryset = queryset.filter(total_score__gte=min_score)
-
-        if max_score is not None:
-            queryset = queryset.filter(total_score__lte=max_score)
+        if "min_score" in filters:
+            queryset = queryset.filter(total_score__gte=filters["min_score"])
+        if "max_score" in filters:
+            queryset = queryset.filter(total_score__lte=filters["max_score"])
 
         return queryset
 
+    def get_rollups(self, form, current_term=None):
+        """Filtered rollups, or None if the filters need per-student results"""
+        filters = self.get_filters(form, current_term)
+        if not set(filters) <= self.ROLLUP_FILTERS:
+            return None
+
+        rollups = SubjectResultRollup.objects.all()
+        if "session" in filters:
+            rollups = rollups.filter(term__session=filters["session"])
+        for name in ("term", "classroom", "subject"):
+            if name in filters:
+                rollups = rollups.filter(**{name: filters[name]})
+        return rollups
+
+    def get_analytics(self, form, current_term=None):
+        """Stats, grade distribution and subject/class/term tables"""
+        rollups = self.get_rollups(form, current_term)
+        if rollups is not None:
+            return rollup_analytics(rollups)
+        return results_analytics(self.get_queryset(form, current_term))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        current_term = self.get_current_term()
+        context["current_term"] = current_term
+
         # Initialize form with GET data
-        form = PerformanceFilterForm(self.request.GET or None)
+        form = PerformanceFilterForm(self.request.GET or None, current_term=current_term)
         context["form"] = form
 
-        # Get filtered queryset
-        queryset = self.get_queryset(form)
-
         # Flag when we defaulted to current term (no GET filters provided)
         context["used_default_filters"] = not (
             self.request.GET and any(self.request.GET.values())
         )
-        context["current_term"] = Term.objects.filter(is_current=True).first()
-
-        # Calculate statistics
-        stats = queryset.aggregate(
-            avg_score=Avg("total_score"),
-            highest_score=Max("total_score"),
-            lowest_score=Min("total_score"),
-            total_students=Count("student", distinct=True),
-        )
 
-        # Handle None values in stats
-        context["stats"] = {
-            "avg_score": stats["avg_score"] or 0,
-            "highest_score": stats["highest_score"] or 0,
-            "lowest_score": stats["lowest_score"] or 0,
-            "total_students": stats["total_students"] or 0,
-        }
-
-        # Subject Performance
-        subject_performance = (
-            queryset.values("subject__name")
-            .annotate(
-                avg_score=Avg("total_score"),
-                student_count=Count("student", distinct=True),
-            )
-            .order_by("-avg_score")
-        )
-        context["subject_performance"] = subject_performance
-
-        # Class Performance
-        class_performance = (
-            queryset.values("classroom__level", "classroom__arm")
-            .annotate(avg_score=Avg("total_score"))
-            .order_by("classroom__level", "classroom__arm")
-        )
-        context["class_performance"] = class_performance
-
-        # Grade Distribution (customize these ranges based on your grading system)
-        grade_distribution = {
-            "A": queryset.filter(total_score__gte=70).count(),
-            "B": queryset.filter(total_score__gte=60, total_score__lt=70).count(),
-            "C": queryset.filter(total_score__gte=50, total_score__lt=60).count(),
-            "D": queryset.filter(total_score__gte=45, total_score__lt=50).count(),
-            "E": queryset.filter(total_score__gte=40, total_score__lt=45).count(),
-            "F": queryset.filter(total_score__lt=40).count(),
-        }
-        context["grade_distribution"] = grade_distribution
-
-        # Pass/Fail Statistics (assuming 40 is pass mark)
-        pass_fail_stats = {
-            "pass_count": queryset.filter(total_score__gte=40).count(),
-            "fail_count": queryset.filter(total_score__lt=40).count(),
-        }
-        context["pass_fail_stats"] = pass_fail_stats
-
-        # Performance Trend Over Time
-        performance_trend = list(
-            queryset.values("term__name", "term__id")
-            .annotate(avg_score=Avg("total_score"))
-            .order_by("term__id")
-        )
+        analytics = self.get_cached_analytics(form, current_term)
+        analytics["performance_trend"] = json.dumps(analytics["performance_trend"])
+        context.update(analytics)
 
-        # Convert Decimal to float for JSON serialization
-        for item in performance_trend:
-            if item.get("avg_score"):
-                item["avg_score"] = float(item["avg_score"])
-
-        context["performance_trend"] = json.dumps(performance_trend)
-
-        # Top 10 Performers - Better approach
-        top_performers_qs = (
-            queryset.values(
-                "student__id",
-                "student__surname",
-                "student__other_name",
-                "classroom__level",
-                "classroom__arm",
-            )
-            .annotate(total_score=Avg("total_score"))
-            .order_by("-total_score")[:10]
-        )
-
-        # Format the data properly
-        top_performers = []
-        for performer in top_performers_qs:
-            # Create a simple object to match template expectations
-            class StudentObj:
-                def __init__(self, surname, other_name):
-                    self.full_name = f"{surname} {other_name}"
+        return context
 
-            top_performers.append(
-                {
-                    "student": StudentObj(
-                        performer["student__surname"], performer["student__other_name"]
-                    ),
-                    "classroom": f"{performer['classroom__level']}{performer['classroom__arm']}",
-                    "average_score": float(performer["total_score"] or 0),
-                }
+    def get_cached_analytics(self, form, current_term=None):
+        """
+        Analytics and top performers, cached per filter combination
+
+        Entries depend on the TermResults of the filtered term (or of every
+        term when no term is chosen) and on the names of students, classes,
+        subjects and terms shown in the tables.
+        """
+        filters = self.get_filters(form, current_term)
+        params = {name: getattr(value, "pk", value) for name, value in filters.items()}
+        term = filters.get("term")
+        tags = [
+            model_tag(TermResult, term=term.pk) if term else model_tag(TermResult),
+            model_tag(Student),
+            model_tag(ClassRoom),
+            model_tag(Subject),
+            model_tag(Term),
+        ]
+
+        def build():
+            analytics = self.get_analytics(form, current_term)
+            analytics["top_performers"] = top_performers(
+                self.get_queryset(form, current_term)
             )
+            return analytics
 
-        context["top_performers"] = top_performers
-
-        return context
+        return cached("academics.performance_analytics", params, tags, build)
 
 
 # ============================================
@@ -1662,6 +1504,108 @@ def ajax_save_score(request):
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
 
 
+MAX_SCORE_BATCH = 500
+
+
+@login_required
+@require_POST
+def ajax_save_scores(request, assessment_id):
+    """
+    Save a batch of score edits for one assessment via AJAX.
+
+    Expects JSON ``{"scores": [{"student_id": 1, "score": "45", "remarks": ""}]}``.
+    An empty score clears the entry. Valid rows are saved even when others
+    fail, and the response carries a status for every row.
+    """
+    assessment = get_object_or_404(
+        Assessment.objects.select_related("assignment"), id=assessment_id
+    )
+
+    # Permission and lock are checked once for the whole batch
+    if not request.user.is_superuser and assessment.assignment.teacher_id != request.user.id:
+        return JsonResponse(
+            {"status": "error", "message": "Permission denied."}, status=403
+        )
+    if assessment.is_locked and not request.user.is_superuser:
+        return JsonResponse(
+            {"status": "error", "message": "Assessment scores are locked."}, status=403
+        )
+
+    try:
+        edits = json.loads(request.body).get("scores")
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({"status": "error", "message": "Invalid JSON."}, status=400)
+    if not isinstance(edits, list) or len(edits) > MAX_SCORE_BATCH:
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": f"Expected a list of at most {MAX_SCORE_BATCH} score edits.",
+            },
+            status=400,
+        )
+
+    roster = set(
+        Student.objects.filter(
+            classroom_id=assessment.assignment.classroom_id
+        ).values_list("id", flat=True)
+    )
+
+    results = []
+    pending = {}
+    cleared = set()
+    for edit in edits:
+        edit = edit if isinstance(edit, dict) else {}
+        student_id = edit.get("student_id")
+        score_val = edit.get("score")
+        result = {"student_id": student_id}
+        results.append(result)
+
+        try:
+            student_id = int(student_id)
+        except (TypeError, ValueError):
+            pass
+
+        if student_id not in roster:
+            result.update(status="error", message="Student not in this class.")
+            continue
+
+        if score_val is None or str(score_val).strip() == "":
+            pending.pop(student_id, None)
+            cleared.add(student_id)
+            result.update(status="cleared", message="Score cleared.")
+            continue
+
+        score, error = parse_score(score_val, assessment.max_score)
+        if error:
+            result.update(status="error", message=f"{error}.")
+            continue
+
+        # A later edit for the same student in the batch wins
+        cleared.discard(student_id)
+        pending[student_id] = build_score(
+            assessment, student_id, score, edit.get("remarks", ""), request.user
+        )
+        result.update(status="saved", message="Score saved.")
+
+    with transaction.atomic():
+        save_scores(list(pending.values()))
+        if cleared:
+            StudentScore.objects.filter(
+                assessment=assessment, student_id__in=cleared
+            ).delete()
+
+    failed = sum(1 for result in results if result["status"] == "error")
+    return JsonResponse(
+        {
+            "status": "partial" if failed else "success",
+            "saved": len(pending),
+            "cleared": len(cleared),
+            "errors": failed,
+            "results": results,
+        }
+    )
+
+
 @login_required
 def get_subjects_by_class(request):
     """Get subjects for a specific class (AJAX)"""
@@ -1710,90 +1654,153 @@ def get_students_by_class(request):
 
 
 @login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
 def export_assessment_template(request, assessment_id):
     """Export Excel template for score entry"""
-    assessment = get_object_or_404(Assessment, id=assessment_id)
-
-    # Get students in the class
-    students = assessment.assignment.classroom.students.all().order_by(
-        "surname", "other_name"
+    assessment = get_object_or_404(
+        Assessment.objects.select_related("assignment__classroom"), id=assessment_id
     )
+    # Teachers only get the rosters of their own assignments
+    if (
+        not request.user.is_superuser
+        and assessment.assignment.teacher_id != request.user.id
+    ):
+        raise Http404("No assessment found.")
+    classroom = assessment.assignment.classroom
 
-    # Create DataFrame
-    data = {
-        "Admission No": [s.admission_no for s in students],
-        "Student Name": [s.full_name for s in students],
-        "Class": [str(s.classroom) for s in students],
-        "Score": [""] * len(students),
-        "Remarks": [""] * len(students),
-    }
-
-    df = pd.DataFrame(data)
-
-    # Create Excel file
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = (
-        f'attachment; filename="{assessment.title}_template.xlsx"'
+    # Get students in the class
+    students = (
+        classroom.students.order_by("surname", "other_name")
+        .values_list("admission_no", "surname", "other_name")
+        .iterator()
+    )
+
+    workbook = new_workbook()
+    add_sheet(
+        workbook,
+        "Scores",
+        [
+            ("Admission No", None),
+            ("Student Name", NAME_WIDTH),
+            ("Class", 8),
+            ("Score", None),
+            ("Remarks", REMARKS_WIDTH),
+        ],
+        (
+            [admission_no, full_name(surname, other_name), str(classroom), "", ""]
+            for admission_no, surname, other_name in students
+        ),
     )
-
-    with pd.ExcelWriter(response, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Scores")
-
-        # Auto-adjust column widths
-        worksheet = writer.sheets["Scores"]
-        for idx, col in enumerate(df.columns):
-            max_length = max(df[col].astype(str).apply(len).max(), len(col))
-            worksheet.column_dimensions[chr(65 + idx)].width = max_length + 2
-
-    return response
+    return xlsx_response(workbook, f"{assessment.title}_template.xlsx")
 
 
 @login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
 def export_class_results(request, classroom_id, term_id):
-    """Export class results to Excel"""
+    """Export class results to Excel; teachers get the subjects they teach"""
     classroom = get_object_or_404(ClassRoom, id=classroom_id)
-    term = get_object_or_404(Term, id=term_id)
+    term = get_object_or_404(Term.objects.select_related("session"), id=term_id)
 
     # Get all term results for this class and term
+    results = TermResult.objects.filter(classroom=classroom, term=term)
+    if not request.user.is_superuser:
+        subject_ids = list(
+            SubjectAssignment.objects.filter(
+                classroom=classroom, term=term, teacher=request.user
+            ).values_list("subject_id", flat=True)
+        )
+        if not subject_ids:
+            raise Http404("No results found.")
+        results = results.filter(subject_id__in=subject_ids)
     results = (
-        TermResult.objects.filter(classroom=classroom, term=term)
-        .select_related("student", "subject")
+        results
         .order_by("student__surname", "subject__name")
+        .values_list(
+            "student__admission_no",
+            "student__surname",
+            "student__other_name",
+            "subject__name",
+            "ca_total",
+            "exam_score",
+            "total_score",
+            "grade",
+            "position",
+            "class_average",
+            "teacher_remarks",
+        )
+        .iterator(chunk_size=2000)
+    )
+
+    workbook = new_workbook()
+    add_sheet(
+        workbook,
+        "Results",
+        [
+            ("Admission No", None),
+            ("Student Name", NAME_WIDTH),
+            ("Subject", 20),
+            ("CA Total", None),
+            ("Exam Score", None),
+            ("Total Score", None),
+            ("Grade", None),
+            ("Position", None),
+            ("Class Average", None),
+            ("Remarks", REMARKS_WIDTH),
+        ],
+        (
+            [admission_no, full_name(surname, other_name), *scores]
+            for admission_no, surname, other_name, *scores in results
+        ),
     )
+    return xlsx_response(workbook, f"{classroom}_{term}_results.xlsx")
 
-    # Create DataFrame
-    data = []
-    for result in results:
-        data.append(
-            {
-                "Admission No": result.student.admission_no,
-                "Student Name": result.student.full_name,
-                "Subject": result.subject.name,
-                "CA Total": result.ca_total,
-                "Exam Score": result.exam_score,
-                "Total Score": result.total_score,
-                "Grade": result.grade,
-                "Position": result.position,
-                "Class Average": result.class_average,
-                "Remarks": result.teacher_remarks,
-            }
-        )
 
-    df = pd.DataFrame(data)
+# ============================================
+# BROADSHEETS
+# ============================================
 
-    # Create Excel file
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = (
-        f'attachment; filename="{classroom}_{term}_results.xlsx"'
-    )
 
-    with pd.ExcelWriter(response, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Results")
+@login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
+def class_broadsheet(request, term_id, classroom_id):
+    """Master score sheet of a class as HTML, or Excel/CSV with ?format="""
+    term = get_object_or_404(Term.objects.select_related("session"), id=term_id)
+    classroom = get_object_or_404(ClassRoom, id=classroom_id)
+    (broadsheet,) = load_broadsheets(term, [classroom])
+    filename = f"{classroom}_{slugify(str(term))}_broadsheet"
+
+    export_format = request.GET.get("format")
+    if export_format == "csv":
+        return csv_response(broadsheet_csv(broadsheet), f"{filename}.csv")
+    if export_format == "xlsx":
+        response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+        response["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
+        write_broadsheet_workbook([broadsheet], response)
+        return response
 
+    context = {
+        "term": term,
+        "classroom": classroom,
+        "broadsheet": broadsheet,
+        "subject_fields": [label for label, _ in SUBJECT_FIELDS],
+    }
+    return render(request, "academics/broadsheet.html", context)
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
+def level_broadsheets(request, term_id, level):
+    """Broadsheets of every class of a level in one workbook, a sheet per class"""
+    term = get_object_or_404(Term.objects.select_related("session"), id=term_id)
+    classrooms = list(ClassRoom.objects.filter(session=term.session_id, level=level))
+    if not classrooms:
+        raise Http404("No classes at this level")
+
+    response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+    response["Content-Disposition"] = (
+        f'attachment; filename="{level}_{slugify(str(term))}_broadsheets.xlsx"'
+    )
+    write_broadsheet_workbook(load_broadsheets(term, classrooms), response)
     return response
 
 
@@ -1802,61 +1809,80 @@ def export_class_results(request, classroom_id, term_id):
 # ============================================
 
 
+def csv_response(lines, filename):
+    """Stream CSV lines as a file download"""
+    response = StreamingHttpResponse(lines, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def export_subject_performance_csv(request):
     """Export subject performance table (based on current filters) to CSV."""
-    form = PerformanceFilterForm(request.GET or None)
-    view = PerformanceAnalyticsView()
-    view.request = request
-    queryset = view.get_queryset(form)
-
-    subject_performance = (
-        queryset.values("subject__name")
-        .annotate(
-            avg_score=Avg("total_score"), student_count=Count("student", distinct=True)
-        )
-        .order_by("-avg_score")
-    )
+    view = PerformanceAnalyticsView(request=request)
+    current_term = view.get_current_term()
+    form = PerformanceFilterForm(request.GET or None, current_term=current_term)
+    analytics = view.get_analytics(form, current_term)
 
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="subject_performance.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(["Subject", "Average Score", "Students"])
-    for row in subject_performance:
-        writer.writerow(
-            [row["subject__name"], float(row["avg_score"] or 0), row["student_count"]]
-        )
-
-    return response
+    rows = (
+        [row["subject__name"], float(row["avg_score"] or 0), row["student_count"]]
+        for row in analytics["subject_performance"]
+    )
+    return csv_response(
+        stream_csv(["Subject", "Average Score", "Students"], rows),
+        "subject_performance.csv",
+    )
 
 
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def export_class_performance_csv(request):
     """Export class performance table (based on current filters) to CSV."""
-    form = PerformanceFilterForm(request.GET or None)
-    view = PerformanceAnalyticsView()
-    view.request = request
-    queryset = view.get_queryset(form)
+    view = PerformanceAnalyticsView(request=request)
+    current_term = view.get_current_term()
+    form = PerformanceFilterForm(request.GET or None, current_term=current_term)
+    analytics = view.get_analytics(form, current_term)
 
-    class_performance = (
-        queryset.values("classroom__level", "classroom__arm")
-        .annotate(avg_score=Avg("total_score"))
-        .order_by("classroom__level", "classroom__arm")
+    rows = (
+        [
+            f"{row['classroom__level']}{row['classroom__arm']}",
+            float(row["avg_score"] or 0),
+        ]
+        for row in analytics["class_performance"]
+    )
+    return csv_response(
+        stream_csv(["Class", "Average Score"], rows), "class_performance.csv"
     )
 
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="class_performance.csv"'
 
-    writer = csv.writer(response)
-    writer.writerow(["Class", "Average Score"])
-    for row in class_performance:
-        class_name = f"{row['classroom__level']}{row['classroom__arm']}"
-        writer.writerow([class_name, float(row["avg_score"] or 0)])
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def export_data_csv(request, dataset):
+    """
+    Stream a raw TermResult, StudentScore, Attendance or ReportCard extract
 
-    return response
+    Takes the same filters as the analytics page but does not default to the
+    current term, so an unfiltered request exports every session.
+    """
+    extract = EXTRACTS.get(dataset)
+    if extract is None:
+        raise Http404("Unknown export")
+
+    form = PerformanceFilterForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, "Invalid export filters.")
+        return redirect("academics:performance_analytics")
+
+    filters = {
+        name: value
+        for name, value in form.cleaned_data.items()
+        if value is not None and value != ""
+    }
+    filename = "_".join(
+        [dataset, *(slugify(str(value)) for value in filters.values())]
+    )
+    return csv_response(extract.stream(filters), f"{filename}.csv")
 
 
 # ============================================
@@ -1879,56 +1905,28 @@ def recalculate_term_results(request):
             f"{reverse('academics:performance_analytics')}?{request.META.get('QUERY_STRING', '')}"
         )
 
-    # Call existing calculation logic
-    try:
-        # Reuse calculate_term_results view logic by calling it directly
-        return calculate_term_results(
-            request, term_id=int(term_id), classroom_id=int(classroom_id)
-        )
-    except Exception as e:
-        messages.error(request, f"Failed to recalculate results: {e}")
-        return redirect(
-            f"{reverse('academics:performance_analytics')}?{request.META.get('QUERY_STRING', '')}"
-        )
-
-
-@login_required
-def export_report_cards(request, term_id):
-    """Export all report cards for a term"""
     term = get_object_or_404(Term, id=term_id)
+    classroom = get_object_or_404(ClassRoom, id=classroom_id)
 
-    report_cards = ReportCard.objects.filter(term=term).select_related(
-        "student", "classroom"
-    )
-
-    data = []
-    for rc in report_cards:
-        data.append(
-            {
-                "Admission No": rc.student.admission_no,
-                "Student Name": rc.student.full_name,
-                "Class": str(rc.classroom),
-                "Total Score": rc.total_score,
-                "Average Score": rc.average_score,
-                "Position": f"{rc.position}/{rc.out_of}",
-                "Days Present": rc.days_present,
-                "Days Absent": rc.days_absent,
-                "Class Teacher Remarks": rc.class_teacher_remarks,
-                "Principal Remarks": rc.principal_remarks,
-            }
-        )
-
-    df = pd.DataFrame(data)
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    job = enqueue(
+        "recalculate_results",
+        user=request.user,
+        term_id=term.id,
+        classroom_id=classroom.id,
     )
-    response["Content-Disposition"] = f'attachment; filename="{term}_report_cards.xlsx"'
+    messages.info(request, f"Recalculating term results for {classroom}.")
+    return redirect("academics:job_detail", pk=job.pk)
 
-    with pd.ExcelWriter(response, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Report Cards")
 
-    return response
+@login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
+@require_POST
+def export_report_cards(request, term_id):
+    """Export all report cards for a term to Excel in the background"""
+    term = get_object_or_404(Term, id=term_id)
+    job = enqueue("export_report_cards", user=request.user, term_id=term.id)
+    messages.info(request, f"Exporting report cards for {term}.")
+    return redirect("academics:job_detail", pk=job.pk)
 
 
 # ============================================
@@ -1936,42 +1934,70 @@ def export_report_cards(request, term_id):
 # ============================================
 
 
+def can_view_report_card(user, report_card):
+    """
+    Staff see every report card; students and parents only see published
+    cards of the student themselves or of a linked child
+    """
+    if user.is_staff or user.is_superuser:
+        return True
+    if not (report_card.is_published and report_card.status == "Published"):
+        return False
+    if report_card.student.user_id == user.pk:
+        return True
+    return Student.objects.filter(
+        Q(portal_profile__user=user) | Q(parents__user=user),
+        pk=report_card.student_id,
+    ).exists()
+
+
 @login_required
 def generate_report_card_pdf(request, pk):
     """Generate PDF report card"""
-    from django.template.loader import render_to_string
-    from weasyprint import HTML
-    import tempfile
-
-    report_card = get_object_or_404(ReportCard, pk=pk)
+    report_card = get_object_or_404(
+        ReportCard.objects.select_related("student", "classroom", "term__session"),
+        pk=pk,
+    )
+    # 404 rather than 403 so other students' card ids are not confirmed
+    if not can_view_report_card(request.user, report_card):
+        raise Http404("No report card found.")
+    if is_cacheable(report_card):
+        filename, path = cached_report_card_pdf(report_card)
+        # The file name is the card's content hash, so it doubles as the ETag
+        return conditional_response(
+            request,
+            path.stem,
+            report_card.published_at,
+            lambda: FileResponse(
+                open(path, "rb"),
+                as_attachment=True,
+                filename=filename,
+                content_type="application/pdf",
+            ),
+        )
 
-    # Get all term results
-    term_results = (
-        TermResult.objects.filter(student=report_card.student, term=report_card.term)
-        .select_related("subject")
-        .order_by("subject__name")
-    )
+    filename, pdf = render_report_card_pdf(report_card)
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
-    # Render HTML
-    html_string = render_to_string(
-        "academics/report_card_pdf.html",
-        {
-            "report_card": report_card,
-            "term_results": term_results,
-        },
-    )
 
-    # Generate PDF
-    html = HTML(string=html_string)
-    result = html.write_pdf()
+@login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
+def report_cards_pdf_zip(request, term_id, classroom_id):
+    """Download every report card of a class as a ZIP of PDFs, streamed as rendered"""
+    term = get_object_or_404(Term.objects.select_related("session"), id=term_id)
+    classroom = get_object_or_404(ClassRoom, id=classroom_id)
 
-    # Create response
-    response = HttpResponse(content_type="application/pdf")
+    # Rendered in this process; forking a pool per request would tie up the
+    # server's processes
+    response = StreamingHttpResponse(
+        stream_zip(render_class_pdfs(term, classroom, workers=1)),
+        content_type="application/zip",
+    )
     response["Content-Disposition"] = (
-        f'attachment; filename="report_card_{report_card.student.admission_no}_{report_card.term}.pdf"'
+        f'attachment; filename="report_cards_{classroom}_{slugify(str(term))}.zip"'
     )
-    response.write(result)
-
     return response
 
 
@@ -1984,7 +2010,7 @@ def generate_report_card_pdf(request, pk):
 @user_passes_test(lambda u: u.is_superuser)
 def assessment_type_list(request):
     """List all assessment types"""
-    assessment_types = AssessmentType.objects.all().order_by("weight")
+    assessment_types = reference_data()["assessment_types"]
     return render(
         request,
         "academics/assessment_type_list.html",
@@ -2048,88 +2074,8 @@ def calculate_term_results(request, term_id, classroom_id):
     term = get_object_or_404(Term, id=term_id)
     classroom = get_object_or_404(ClassRoom, id=classroom_id)
 
-    # Get all subject assignments for this class and term
-    assignments = SubjectAssignment.objects.filter(classroom=classroom, term=term)
-
-    # Get all students in this class
-    students = classroom.students.all()
-
-    results_created = 0
-
-    with transaction.atomic():
-        for assignment in assignments:
-            for student in students:
-                # Get all assessments for this subject
-                assessments = Assessment.objects.filter(assignment=assignment)
-
-                # Calculate CA total (all non-exam assessments)
-                ca_scores = StudentScore.objects.filter(
-                    assessment__in=assessments.exclude(assessment_type__code="EXAM"),
-                    student=student,
-                )
-
-                ca_total = sum(
-                    (score.score / score.assessment.max_score)
-                    * score.assessment.assessment_type.weight
-                    for score in ca_scores
-                )
-
-                # Get exam score
-                exam_assessment = assessments.filter(
-                    assessment_type__code="EXAM"
-                ).first()
-                exam_score = 0
-
-                if exam_assessment:
-                    exam_score_obj = StudentScore.objects.filter(
-                        assessment=exam_assessment, student=student
-                    ).first()
-
-                    if exam_score_obj:
-                        exam_score = (
-                            exam_score_obj.score / exam_assessment.max_score
-                        ) * 60
-
-                # Create or update term result
-                term_result, created = TermResult.objects.update_or_create(
-                    student=student,
-                    subject=assignment.subject,
-                    term=term,
-                    classroom=classroom,
-                    defaults={
-                        "ca_total": ca_total,
-                        "exam_score": exam_score,
-                    },
-                )
-
-                if created:
-                    results_created += 1
-
-        # Calculate class statistics for each subject
-        for assignment in assignments:
-            subject_results = TermResult.objects.filter(
-                subject=assignment.subject, term=term, classroom=classroom
-            )
-
-            if subject_results.exists():
-                stats = subject_results.aggregate(
-                    avg=Avg("total_score"),
-                    max_score=Max("total_score"),
-                    min_score=Min("total_score"),
-                )
-
-                # Update each result with class stats
-                subject_results.update(
-                    class_average=stats["avg"],
-                    highest_score=stats["max_score"],
-                    lowest_score=stats["min_score"],
-                )
-
-                # Calculate positions
-                sorted_results = subject_results.order_by("-total_score")
-                for position, result in enumerate(sorted_results, start=1):
-                    result.position = position
-                    result.save(update_fields=["position"])
+    summary = calculate_class_results(term, classroom)
+    results_created = summary["created"]
 
     messages.success(
         request, f"{results_created} term results calculated successfully!"
@@ -2275,9 +2221,7 @@ def timetable_list(request):
 
     context = {
         "timetables": timetables,
-        "classrooms": ClassRoom.objects.filter(session__is_current=True).order_by(
-            "level", "arm"
-        ),
+        "classrooms": reference_data()["classrooms"].values(),
         "terms": Term.objects.all().order_by("-session__start_date", "name"),
         "days_of_week": Timetable.DAYS_OF_WEEK,
         "selected_classroom_id": int(classroom_id) if classroom_id else None,
@@ -2347,35 +2291,40 @@ def timetable_delete(request, pk):
 def teacher_performance(request):
     """View teacher's class performance"""
     # Get teacher's assignments
-    assignments = SubjectAssignment.objects.filter(
-        teacher=request.user, term__is_current=True
-    )
+    assignments = list(
+        SubjectAssignment.objects.filter(
+            teacher=request.user, term__is_current=True
+        ).select_related("subject", "classroom", "term")
+    )
+
+    # One rollup row per assignment, fetched together
+    rollups = {
+        (rollup.term_id, rollup.classroom_id, rollup.subject_id): rollup
+        for rollup in SubjectResultRollup.objects.filter(
+            term__is_current=True,
+            subject_id__in={a.subject_id for a in assignments},
+            classroom_id__in={a.classroom_id for a in assignments},
+        )
+    }
 
     performance_data = []
-
     for assignment in assignments:
-        # Get all term results for this assignment
-        results = TermResult.objects.filter(
-            subject=assignment.subject,
-            term=assignment.term,
-            classroom=assignment.classroom,
+        rollup = rollups.get(
+            (assignment.term_id, assignment.classroom_id, assignment.subject_id)
         )
-
-        if results.exists():
-            stats = results.aggregate(
-                avg_score=Avg("total_score"),
-                pass_count=Count("id", filter=Q(total_score__gte=40)),
-                total_students=Count("id"),
-            )
-
-            stats["pass_rate"] = (
-                (stats["pass_count"] / stats["total_students"] * 100)
-                if stats["total_students"] > 0
-                else 0
+        if rollup and rollup.result_count:
+            performance_data.append(
+                {
+                    "assignment": assignment,
+                    "stats": {
+                        "avg_score": rollup.average_score,
+                        "pass_count": rollup.pass_count,
+                        "total_students": rollup.result_count,
+                        "pass_rate": rollup.pass_rate,
+                    },
+                }
             )
 
-            performance_data.append({"assignment": assignment, "stats": stats})
-
     context = {
         "assignments": assignments,
         "performance_data": performance_data,
@@ -2399,24 +2348,20 @@ def take_attendance(request):
         classroom = get_object_or_404(ClassRoom, id=classroom_id)
         date = datetime.strptime(date_str, "%Y-%m-%d").date()
 
-        with transaction.atomic():
-            for student in classroom.students.all():
-                status = request.POST.get(f"status_{student.id}")
-                remarks = request.POST.get(f"remarks_{student.id}", "")
-
-                if status:
-                    Attendance.objects.update_or_create(
-                        student=student,
-                        date=date,
-                        defaults={
-                            "status": status,
-                            "remarks": remarks,
-                            "marked_by": request.user,
-                        },
-                    )
-        messages.success(
-            request, f"Attendance for {classroom} on {date} saved successfully."
-        )
+        # "Mark all present" only submits the students with another status
+        default_status = PRESENT if request.POST.get("mode") == "all_present" else None
+        student_ids = classroom.students.values_list("id", flat=True)
+        try:
+            entries = parse_attendance(request.POST, student_ids, default_status)
+        except AttendanceError as e:
+            messages.error(request, str(e))
+        else:
+            saved = save_attendance(date, entries, request.user)
+            messages.success(
+                request,
+                f"Attendance for {classroom} on {date} saved successfully "
+                f"({saved} students).",
+            )
         return redirect(
             f"{reverse('academics:take_attendance')}?classroom={classroom_id}&date={date_str}"
         )
@@ -2446,7 +2391,7 @@ def take_attendance(request):
             student.existing_record = existing_records.get(student.id)
 
     context = {
-        "classrooms": ClassRoom.objects.filter(session__is_current=True),
+        "classrooms": reference_data()["classrooms"].values(),
         "selected_classroom": selected_classroom,
         "students": students,
         "attendance_date": attendance_date,
@@ -2460,18 +2405,26 @@ def take_attendance(request):
 def attendance_report(request):
     """
     View for generating and displaying attendance reports for a class.
+
+    The range is a term, a whole session or explicit dates. Add ?format=csv
+    to download the same report.
     """
     selected_classroom = None
     selected_term = None
+    selected_session = None
     students_report = []
     summary_stats = {}
 
-    # Get all terms for the dropdown
-    terms = Term.objects.all().order_by("-session__start_date", "name")
+    # Get all terms and sessions for the dropdowns
+    terms = Term.objects.select_related("session").order_by(
+        "-session__start_date", "name"
+    )
+    sessions = AcademicSession.objects.order_by("-start_date")
 
     # Get filter parameters
     classroom_id = request.GET.get("classroom")
     term_id = request.GET.get("term")
+    session_id = request.GET.get("session")
     start_date_str = request.GET.get("start_date")
     end_date_str = request.GET.get("end_date")
 
@@ -2482,46 +2435,64 @@ def attendance_report(request):
     if not end_date_str:
         end_date_str = today.strftime("%Y-%m-%d")
 
+    # A term or session overrides the dates with its own
+    period = None
     if term_id:
-        selected_term = get_object_or_404(Term, id=term_id)
-        # If a term is selected, override start and end dates with term's dates
-        start_date_str = selected_term.start_date.strftime("%Y-%m-%d")
-        end_date_str = selected_term.end_date.strftime("%Y-%m-%d")
+        period = selected_term = get_object_or_404(
+            Term.objects.select_related("session"), id=term_id
+        )
+    elif session_id:
+        period = selected_session = get_object_or_404(AcademicSession, id=session_id)
+    if period:
+        start_date_str = period.start_date.strftime("%Y-%m-%d")
+        end_date_str = period.end_date.strftime("%Y-%m-%d")
 
     if classroom_id:
         selected_classroom = get_object_or_404(ClassRoom, id=classroom_id)
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
 
-        students = selected_classroom.students.all().order_by("surname", "other_name")
-        attendance_records = Attendance.objects.filter(
-            student__in=students,
-            date__range=[start_date, end_date],  # This line had the error
-        ).order_by("student", "date")
+        students = list(
+            selected_classroom.students.all().order_by("surname", "other_name")
+        )
+        students_report = attendance_summary(students, start_date, end_date)
 
-        # Overall summary
-        summary_stats = attendance_records.values("status").annotate(count=Count("id"))
+        # Overall summary, from the per-student counts
+        summary_stats = {
+            status: sum(row[status.lower()] for row in students_report)
+            for status, _ in Attendance.ATTENDANCE_STATUS
+        }
 
-        # Per-student summary
-        for student in students:
-            student_records = attendance_records.filter(student=student)
-            students_report.append(
-                {
-                    "student": student,
-                    "present": student_records.filter(status="Present").count(),
-                    "absent": student_records.filter(status="Absent").count(),
-                    "late": student_records.filter(status="Late").count(),
-                    "excused": student_records.filter(status="Excused").count(),
-                }
+        if request.GET.get("format") == "csv":
+            header = ["Admission No", "Student", "Present", "Absent", "Late"]
+            header += ["Excused", "Total Days", "Attendance Rate (%)"]
+            rows = (
+                [
+                    row["student"].admission_no,
+                    row["student"].full_name,
+                    row["present"],
+                    row["absent"],
+                    row["late"],
+                    row["excused"],
+                    row["total"],
+                    row["rate"],
+                ]
+                for row in students_report
+            )
+            return csv_response(
+                stream_csv(header, rows),
+                f"attendance_{selected_classroom}_{start_date}_{end_date}.csv",
             )
 
     context = {
-        "classrooms": ClassRoom.objects.filter(session__is_current=True),
+        "classrooms": reference_data()["classrooms"].values(),
         "terms": terms,
+        "sessions": sessions,
         "selected_term": selected_term,
+        "selected_session": selected_session,
         "selected_classroom": selected_classroom,
         "students_report": students_report,
-        "summary_stats": {s["status"]: s["count"] for s in summary_stats},
+        "summary_stats": summary_stats,
         "start_date": start_date_str,
         "end_date": end_date_str,
     }
@@ -2564,10 +2535,29 @@ def bulk_publish_report_cards(request):
             {"status": "error", "message": "No report card IDs provided."}, status=400
         )
 
-    updated = ReportCard.objects.filter(id__in=ids).update(
-        status="Published", is_published=True, published_at=timezone.now()
+    report_cards = ReportCard.objects.filter(id__in=ids)
+    student_ids = list(report_cards.values_list("student_id", flat=True))
+    # Invalidated after the update, so nothing is rebuilt from the old rows
+    with transaction.atomic():
+        updated = report_cards.update(
+            status="Published", is_published=True, published_at=timezone.now()
+        )
+        invalidate_for(ReportCard, "student", student_ids)
+    # Results day: serve portal report pages from cache, and build the
+    # summaries and PDFs now so the first visits are served from it
+    start_surge()
+    job = enqueue(
+        "warm_report_card_pdfs",
+        user=request.user,
+        report_card_ids=[int(pk) for pk in ids],
+    )
+    return JsonResponse(
+        {
+            "status": "ok",
+            "updated": updated,
+            "job_status_url": reverse("academics:job_status", args=[job.pk]),
+        }
     )
-    return JsonResponse({"status": "ok", "updated": updated})
 
 
 @login_required
@@ -2591,3 +2581,66 @@ def change_report_card_status(request, pk):
             "HTTP_REFERER", reverse("academics:report_card_detail", args=[rc.pk])
         )
     )
+
+
+# ============================================
+# BACKGROUND JOBS
+# ============================================
+
+
+def get_job_for_user(request, pk):
+    """Return a job the user started (superusers can see every job) or raise 404"""
+    jobs = Job.objects.all()
+    if not request.user.is_superuser:
+        jobs = jobs.filter(created_by=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+
+def job_status_data(job):
+    data = {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "finished": job.is_finished,
+        "progress_done": job.progress_done,
+        "progress_total": job.progress_total,
+        "progress_percent": job.progress_percent,
+        "message": job.message,
+        "error": job.error,
+        "result": job.result,
+        "download_url": None,
+    }
+    if job.result_file:
+        data["download_url"] = reverse("academics:job_download", args=[job.pk])
+    return data
+
+
+@login_required
+def job_detail(request, pk):
+    """Progress page for a background job; polls job_status until it finishes"""
+    job = get_job_for_user(request, pk)
+    return render(
+        request,
+        "academics/job_detail.html",
+        {"job": job, "status": job_status_data(job)},
+    )
+
+
+@login_required
+def job_status(request, pk):
+    """Current status and progress of a background job as JSON"""
+    return JsonResponse(job_status_data(get_job_for_user(request, pk)))
+
+
+@login_required
+def job_download(request, pk):
+    """Download the file a finished job produced"""
+    job = get_job_for_user(request, pk)
+    if not job.result_file:
+        messages.error(request, "This job has no file to download.")
+        return redirect("academics:job_detail", pk=job.pk)
+    return FileResponse(
+        job.result_file.open("rb"),
+        as_attachment=True,
+        filename=os.path.basename(job.result_file.name),
+    )
@@ -0,0 +1,8 @@
+# committee/signals.py
+
+from records.cache import track_model
+
+from .models import StudentOffense
+
+# The analytics dashboard is cached with records.cache
+track_model(StudentOffense)
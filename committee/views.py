@@ -8,6 +8,7 @@ from django.template.loader import get_template
 from xhtml2pdf import pisa
 from django.db.models import Count, Q
 from django.db.models.functions import TruncMonth
+from records.cache import cached, model_tag
 
 
 @login_required
@@ -136,40 +137,50 @@ def render_pdf_view(request, offense_id):
 def analytics_dashboard(request):
     """
     Display analytics dashboard for disciplinary records.
+
+    The aggregates are cached until an offense is saved or deleted.
     """
-    offenses = StudentOffense.objects.all()
 
-    # 1. Offenses by type (for pie chart)
-    offenses_by_type = (
-        offenses.values("event_type").annotate(count=Count("id")).order_by("-count")
-    )
+    def build():
+        offenses = StudentOffense.objects.all()
 
-    # 2. Offenses over time (for bar chart)
-    offenses_over_time = (
-        offenses.annotate(month=TruncMonth("offense_date"))
-        .values("month")
-        .annotate(count=Count("id"))
-        .order_by("month")
-    )
+        # 1. Offenses by type (for pie chart)
+        offenses_by_type = (
+            offenses.values("event_type").annotate(count=Count("id")).order_by("-count")
+        )
 
-    # 3. "Hotspots" - locations with the most incidents
-    hotspots = (
-        offenses.values("location").annotate(count=Count("id")).order_by("-count")[:10]
-    )
+        # 2. Offenses over time (for bar chart)
+        offenses_over_time = (
+            offenses.annotate(month=TruncMonth("offense_date"))
+            .values("month")
+            .annotate(count=Count("id"))
+            .order_by("month")
+        )
 
-    # 4. Students with the most repeated offenses
-    repeat_offenders = (
-        offenses.values("student_name", "student_class")
-        .annotate(count=Count("id"))
-        .filter(count__gt=1)
-        .order_by("-count")[:10]
-    )
+        # 3. "Hotspots" - locations with the most incidents
+        hotspots = (
+            offenses.values("location")
+            .annotate(count=Count("id"))
+            .order_by("-count")[:10]
+        )
+
+        # 4. Students with the most repeated offenses
+        repeat_offenders = (
+            offenses.values("student_name", "student_class")
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+            .order_by("-count")[:10]
+        )
+
+        return {
+            "total_offenses": offenses.count(),
+            "offenses_by_type": list(offenses_by_type),
+            "offenses_over_time": list(offenses_over_time),
+            "hotspots": list(hotspots),
+            "repeat_offenders": list(repeat_offenders),
+        }
 
-    context = {
-        "total_offenses": offenses.count(),
-        "offenses_by_type": list(offenses_by_type),
-        "offenses_over_time": list(offenses_over_time),
-        "hotspots": hotspots,
-        "repeat_offenders": repeat_offenders,
-    }
+    context = cached(
+        "committee.analytics_dashboard", {}, [model_tag(StudentOffense)], build
+    )
     return render(request, "committee/analytics_dashboard.html", context)
@@ -0,0 +1,98 @@
+# portal/announcements.py
+"""
+Announcement Feed
+
+Resolves which announcements a user may see: those for everyone, for their
+role (parents, students or staff) and for the classes they or their children
+are in. The feed reads from the (is_active, target_audience, created_at) index
+with expired announcements filtered in SQL. Dashboards show the newest few,
+which are cached per audience and invalidated by any announcement write.
+The announcement pages show staff every active announcement.
+"""
+
+from django.db.models import Q
+from django.utils import timezone
+
+from records.cache import cached, model_tag
+
+from .models import Announcement
+
+DASHBOARD_FEED_SIZE = 5
+# Short, so an announcement that expires is replaced by the next one promptly
+FEED_TIMEOUT = 60
+
+
+def audience_for(user):
+    """
+    Audiences and classes whose announcements a user sees
+
+    Returns:
+        Tuple of (sorted list of target_audience values, sorted list of
+        classroom ids for "Class" announcements)
+    """
+    audiences = {"All"}
+    classes = set()
+    if hasattr(user, "parent_profile"):
+        audiences.add("Parents")
+        classes.update(
+            user.parent_profile.students.exclude(classroom=None).values_list(
+                "classroom_id", flat=True
+            )
+        )
+    elif hasattr(user, "student_profile"):
+        audiences.add("Students")
+        classroom_id = user.student_profile.student.classroom_id
+        if classroom_id:
+            classes.add(classroom_id)
+    if user.is_staff:
+        audiences.add("Staff")
+    return sorted(audiences), sorted(classes)
+
+
+def visible_announcements(audiences, classes, now=None):
+    """Active, unexpired announcements for the given audience, newest first"""
+    now = now or timezone.now()
+    return (
+        Announcement.objects.filter(is_active=True)
+        .filter(
+            Q(target_audience__in=audiences)
+            | Q(target_audience="Class", target_class_id__in=classes)
+        )
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+        .order_by("-created_at")
+    )
+
+
+def readable_announcements(user):
+    """
+    Announcements a user may list and open
+
+    Parents and students get their own audience. Staff, and other users such
+    as teachers, get every active announcement, including those they target
+    at parents, students or a class.
+    """
+    if user.is_staff or not (
+        hasattr(user, "parent_profile") or hasattr(user, "student_profile")
+    ):
+        return Announcement.objects.filter(is_active=True).order_by("-created_at")
+    return visible_announcements(*audience_for(user))
+
+
+def announcement_feed(user, limit=DASHBOARD_FEED_SIZE):
+    """
+    Newest announcements visible to a user, cached per audience
+
+    Returns:
+        List of Announcement objects
+    """
+    audiences, classes = audience_for(user)
+    feed = cached(
+        "portal.announcements",
+        {"audiences": audiences, "classes": classes, "limit": limit},
+        [model_tag(Announcement)],
+        lambda: list(visible_announcements(audiences, classes)[:limit]),
+        timeout=FEED_TIMEOUT,
+    )
+    # Drop any that expired since the entry was built
+    now = timezone.now()
+    return [item for item in feed if not item.expires_at or item.expires_at > now]
@@ -0,0 +1,146 @@
+# portal/messaging.py
+"""
+Portal Messaging
+
+Each user's unread count is stored in a MessageCounter row that is adjusted
+when a message is sent, read or deleted, so the dashboards and inbox read one
+row instead of counting messages. A counter that does not exist yet is
+created from a real count the first time it is read.
+
+The inbox is paginated by keyset on (created_at, id), so every page is an
+index range scan however deep the reader goes, and a conversation loads with
+one query on the stored thread root.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import MessageCounter, PortalMessage
+
+INBOX_PAGE_SIZE = 20
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+# ============================================
+# UNREAD COUNTER
+# ============================================
+
+
+def adjust_unread(user_id, delta):
+    """Add ``delta`` to a user's unread count, if the counter exists yet"""
+    MessageCounter.objects.filter(user_id=user_id).update(
+        unread=Greatest(F("unread") + delta, 0)
+    )
+
+
+def recount_unread(user):
+    """Rebuild a user's unread count from their messages"""
+    count = PortalMessage.objects.filter(recipient=user, is_read=False).count()
+    MessageCounter.objects.update_or_create(user=user, defaults={"unread": count})
+    return count
+
+
+def unread_count(user):
+    """Number of unread messages of a user"""
+    count = (
+        MessageCounter.objects.filter(user=user)
+        .values_list("unread", flat=True)
+        .first()
+    )
+    if count is None:
+        count = recount_unread(user)
+    return count
+
+
+def mark_read(message):
+    """
+    Mark a received message as read and decrement the recipient's counter
+
+    Returns:
+        True if the message was unread
+    """
+    if message.is_read:
+        return False
+    now = timezone.now()
+    with transaction.atomic():
+        updated = PortalMessage.objects.filter(pk=message.pk, is_read=False).update(
+            is_read=True, read_at=now
+        )
+        if updated:
+            adjust_unread(message.recipient_id, -1)
+
+    if updated:
+        message.is_read, message.read_at = True, now
+    else:
+        # Read meanwhile in another request
+        message.refresh_from_db(fields=["is_read", "read_at"])
+    return bool(updated)
+
+
+# ============================================
+# INBOX AND THREADS
+# ============================================
+
+
+def encode_cursor(message):
+    """Opaque position of a message in the inbox ordering"""
+    microseconds = (message.created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}-{message.pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor from ``encode_cursor``
+
+    Returns:
+        Tuple of (created_at, pk), or None if the cursor is missing or invalid
+    """
+    try:
+        microseconds, pk = (int(part) for part in cursor.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return EPOCH + timedelta(microseconds=microseconds), pk
+
+
+def inbox_page(user, cursor=None, size=INBOX_PAGE_SIZE):
+    """
+    One page of a user's inbox, newest first
+
+    Args:
+        user: Recipient
+        cursor: ``next_cursor`` of the previous page, or None for the first
+        size: Messages per page
+
+    Returns:
+        Tuple of (list of messages, next_cursor or None on the last page)
+    """
+    messages = (
+        PortalMessage.objects.filter(recipient=user)
+        .select_related("sender", "student")
+        .order_by("-created_at", "-id")
+    )
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk = position
+        messages = messages.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+
+    page = list(messages[: size + 1])
+    next_cursor = encode_cursor(page[size - 1]) if len(page) > size else None
+    return page[:size], next_cursor
+
+
+def conversation(message, user):
+    """Every message of a message's thread that the user sent or received"""
+    root = message.thread_id
+    return (
+        PortalMessage.objects.filter(Q(pk=root) | Q(thread_root_id=root))
+        .filter(Q(sender=user) | Q(recipient=user))
+        .select_related("sender")
+        .order_by("created_at", "id")
+    )
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_thread_roots(apps, schema_editor):
+    """Point every existing reply at the first message of its conversation"""
+    PortalMessage = apps.get_model("portal", "PortalMessage")
+    parents = dict(PortalMessage.objects.values_list("id", "parent_message_id"))
+
+    threads = {}
+    for pk, parent in parents.items():
+        root = pk
+        while parents.get(root):
+            root = parents[root]
+        if root != pk:
+            threads.setdefault(root, []).append(pk)
+
+    for root, pks in threads.items():
+        PortalMessage.objects.filter(pk__in=pks).update(thread_root_id=root)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('portal', '0004_delete_timetable'),
+        ('records', '0010_student_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='message_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='portalmessage',
+            name='thread_root',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_messages', to='portal.portalmessage'),
+        ),
+        migrations.RunPython(set_thread_roots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='portalmessage',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='portal_msg_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portalmessage',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='portal_msg_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portalmessage',
+            index=models.Index(fields=['thread_root', 'created_at'], name='portal_msg_thread_idx'),
+        ),
+    ]
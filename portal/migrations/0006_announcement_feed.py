@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0011_subject_result_rollup'),
+        ('portal', '0005_message_threads_and_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcement',
+            name='target_audience',
+            field=models.CharField(choices=[('All', 'All'), ('Parents', 'Parents Only'), ('Students', 'Students Only'), ('Staff', 'Staff Only'), ('Class', 'Specific Class')], default='All', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['is_active', 'target_audience', '-created_at'], name='portal_announcement_feed_idx'),
+        ),
+    ]
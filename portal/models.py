@@ -83,6 +83,7 @@ class Announcement(models.Model):
             ("All", "All"),
             ("Parents", "Parents Only"),
             ("Students", "Students Only"),
+            ("Staff", "Staff Only"),
             ("Class", "Specific Class"),
         ],
         default="All",
@@ -105,6 +106,13 @@ class Announcement(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Announcement feed (see portal.announcements)
+            models.Index(
+                fields=["is_active", "target_audience", "-created_at"],
+                name="portal_announcement_feed_idx",
+            ),
+        ]
 
 
 class PortalMessage(models.Model):
@@ -126,13 +134,60 @@ class PortalMessage(models.Model):
     parent_message = models.ForeignKey(
         "self", on_delete=models.CASCADE, null=True, blank=True, related_name="replies"
     )
+    # First message of the conversation (empty on that message itself), so a
+    # whole thread loads with one indexed query instead of walking replies
+    thread_root = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="thread_messages",
+        db_index=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.subject} - {self.sender} to {self.recipient}"
 
+    @property
+    def thread_id(self):
+        return self.thread_root_id or self.pk
+
+    def save(self, *args, **kwargs):
+        if self.parent_message_id and not self.thread_root_id:
+            self.thread_root_id = self.parent_message.thread_id
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset-paginated inbox
+            models.Index(
+                fields=["recipient", "-created_at", "-id"], name="portal_msg_inbox_idx"
+            ),
+            models.Index(
+                fields=["recipient", "is_read", "-created_at"],
+                name="portal_msg_unread_idx",
+            ),
+            models.Index(
+                fields=["thread_root", "created_at"], name="portal_msg_thread_idx"
+            ),
+        ]
+
+
+class MessageCounter(models.Model):
+    """Unread portal message count of a user, kept in step with PortalMessage"""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="message_counter",
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user}: {self.unread} unread"
 
 
 class FeePayment(models.Model):
@@ -1,8 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
+from records.cache import invalidate, model_tag, track_model
 from records.models import Student
-from .models import StudentProfile
+from .messaging import adjust_unread
+from .models import Announcement, ParentProfile, PortalMessage, StudentProfile
 
 
 @receiver(post_save, sender=Student)
@@ -38,4 +40,28 @@ def create_student_user_and_profile(sender, instance, created, **kwargs):
         # 3. Create the StudentProfile
         StudentProfile.objects.create(
             user=user, student=instance, date_of_birth=instance.date_of_birth
-        )
\ No newline at end of file
+        )
+
+
+@receiver(m2m_changed, sender=ParentProfile.students.through)
+def expire_parent_children(sender, action, **kwargs):
+    """Expire cached child summaries when children are linked or unlinked"""
+    if action.startswith("post_"):
+        invalidate(model_tag(sender))
+
+
+@receiver(post_save, sender=PortalMessage)
+def count_new_message(sender, instance, created, **kwargs):
+    """Add a newly sent message to its recipient's unread count"""
+    if created and not instance.is_read and not kwargs.get("raw"):
+        adjust_unread(instance.recipient_id, 1)
+
+
+@receiver(post_delete, sender=PortalMessage)
+def uncount_deleted_message(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread(instance.recipient_id, -1)
+
+
+# Cached announcement feeds (portal.announcements) depend on these
+track_model(Announcement)
@@ -1,10 +1,14 @@
 # c:\Users\Williams Peaceful\Portfolio\Djangoproject\Studentmanagement\portal\tests.py
 
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User, Group
 from django.utils import timezone
 from datetime import timedelta
+from unittest import mock
 
 from records.models import Student
 from academics.models import (
@@ -17,8 +21,19 @@ from academics.models import (
     Assessment,
     StudentScore,
     ReportCard,
+    Attendance,
 )
 from portal.models import ParentProfile, StudentProfile, Announcement, PortalMessage
+from portal.announcements import announcement_feed
+from portal.messaging import (
+    conversation,
+    inbox_page,
+    mark_read,
+    recount_unread,
+    unread_count,
+)
+from portal.views import child_summaries
+from academics.attendance import save_attendance
 from portal.forms import (
     UserProfileForm,
     ParentProfileForm,
@@ -27,6 +42,12 @@ from portal.forms import (
 )
 
 
+# Tests keep the cache in memory rather than in the files the running site
+# uses, so entries never leak between test runs
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCAL_CACHE)
 class PortalTestCase(TestCase):
     """Base test case for portal app with common setup."""
 
@@ -476,3 +497,328 @@ class PortalTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.announcement_all.title)
         self.assertContains(response, self.announcement_all.content)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ParentDashboardSummaryTests(TestCase):
+    """Child summaries on the parent dashboard (independent of PortalTestCase)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        session = AcademicSession.objects.create(
+            name="2024/2025",
+            start_date="2024-09-01",
+            end_date="2025-07-31",
+            is_current=True,
+        )
+        cls.term = Term.objects.create(
+            session=session,
+            name="First",
+            start_date="2024-09-01",
+            end_date="2024-12-15",
+            is_current=True,
+        )
+        cls.classroom = ClassRoom.objects.create(level="JSS1", arm="A", session=session)
+        cls.parent_user = User.objects.create_user(
+            username="parentuser", password="password"
+        )
+        cls.parent_profile = ParentProfile.objects.create(
+            user=cls.parent_user, phone_number="08011223344", relationship="Mother"
+        )
+        cls.children = [
+            Student.objects.create(
+                surname=surname,
+                other_name="Test",
+                admission_no=admission_no,
+                sex="Male",
+                date_of_birth="2010-01-01",
+                residential_address="1 School Road",
+                nationality="Nigerian",
+                state_of_origin="Lagos",
+                lga="Ikeja",
+                class_on_entry="JSS1",
+                date_of_entry="2024-09-01",
+                classroom=cls.classroom,
+                father_name="Father",
+                mother_name="Mother",
+            )
+            for surname, admission_no in [
+                ("Adams", "2024-0001"),
+                ("Bello", "2024-0002"),
+            ]
+        ]
+        cls.parent_profile.students.add(*cls.children)
+
+    def setUp(self):
+        cache.clear()
+
+    def summaries(self):
+        return {
+            student.surname: student
+            for student in child_summaries(self.parent_profile)
+        }
+
+    def test_summaries_are_grouped_and_cached(self):
+        adams, bello = self.children
+        ReportCard.objects.create(
+            student=adams,
+            term=self.term,
+            classroom=self.classroom,
+            average_score=72.5,
+            position=2,
+            out_of=30,
+            is_published=True,
+        )
+        today = timezone.now().date()
+        for days_ago, status in [(1, "Present"), (2, "Absent"), (40, "Absent")]:
+            Attendance.objects.create(
+                student=adams, date=today - timedelta(days=days_ago), status=status
+            )
+
+        # Child ids, then one query for every child's figures
+        with self.assertNumQueries(2):
+            children = self.summaries()
+        self.assertEqual(children["Adams"].position, "2/30")
+        self.assertEqual(children["Adams"].attendance_rate, 50)
+        self.assertEqual(children["Bello"].position, "-")
+        self.assertEqual(children["Bello"].attendance_rate, 0)
+
+        with self.assertNumQueries(1):
+            self.summaries()
+
+    def test_attendance_and_publishing_expire_the_summary(self):
+        adams, bello = self.children
+        card = ReportCard.objects.create(
+            student=adams,
+            term=self.term,
+            classroom=self.classroom,
+            average_score=60,
+            position=5,
+            out_of=30,
+        )
+        self.assertEqual(self.summaries()["Adams"].position, "-")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            save_attendance(timezone.now().date(), {bello.pk: ("Present", "")})
+        with self.captureOnCommitCallbacks(execute=True):
+            card.publish()
+        children = self.summaries()
+        self.assertEqual(children["Bello"].attendance_rate, 100)
+        self.assertEqual(children["Adams"].position, "5/30")
+
+    def test_linking_a_child_expires_the_summary(self):
+        self.assertEqual(len(self.summaries()), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.parent_profile.students.remove(self.children[1])
+        self.assertEqual(list(self.summaries()), ["Adams"])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class MessagingTests(TestCase):
+    """Unread counters, keyset inbox and threads (independent of PortalTestCase)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff_user = User.objects.create_user(
+            username="staffuser", password="password", is_staff=True
+        )
+        cls.student = Student.objects.create(
+            surname="Adams",
+            other_name="Test",
+            admission_no="2024-0001",
+            sex="Male",
+            date_of_birth="2010-01-01",
+            residential_address="1 School Road",
+            nationality="Nigerian",
+            state_of_origin="Lagos",
+            lga="Ikeja",
+            class_on_entry="JSS1",
+            date_of_entry="2024-09-01",
+            father_name="Father",
+            mother_name="Mother",
+        )
+        cls.student_user = cls.student.user
+
+    def send(self, subject, sender=None, recipient=None, parent=None):
+        return PortalMessage.objects.create(
+            sender=sender or self.staff_user,
+            recipient=recipient or self.student_user,
+            student=self.student,
+            subject=subject,
+            message="Hello",
+            parent_message=parent,
+        )
+
+    def test_unread_counter_follows_send_read_and_delete(self):
+        first = self.send("First")
+        self.assertEqual(unread_count(self.student_user), 1)
+
+        second = self.send("Second")
+        third = self.send("Third")
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.student_user), 3)
+
+        self.assertTrue(mark_read(first))
+        self.assertFalse(mark_read(first))
+        second.delete()
+        self.assertEqual(unread_count(self.student_user), 1)
+        self.assertEqual(recount_unread(self.student_user), 1)
+
+        self.client.force_login(self.student_user)
+        self.client.get(reverse("portal:message_detail", args=[third.pk]))
+        self.assertEqual(unread_count(self.student_user), 0)
+
+    def test_inbox_pages_by_keyset(self):
+        sent = [self.send(f"Message {number}") for number in range(5)]
+        # Ties on created_at are broken by id
+        PortalMessage.objects.filter(pk__in=[m.pk for m in sent[1:4]]).update(
+            created_at=sent[0].created_at
+        )
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = inbox_page(self.student_user, cursor, size=2)
+            seen.extend(message.pk for message in page)
+            if cursor is None:
+                break
+        expected = PortalMessage.objects.order_by("-created_at", "-id")
+        self.assertEqual(seen, list(expected.values_list("pk", flat=True)))
+
+        self.client.force_login(self.student_user)
+        response = self.client.get(
+            reverse("portal:messages_inbox"), {"before": "not-a-cursor"}
+        )
+        self.assertEqual(len(response.context["messages"]), 5)
+
+    def test_replies_share_the_thread_root(self):
+        root = self.send("Question")
+        reply = self.send("Re: Question", self.student_user, self.staff_user, root)
+        answer = self.send("Re: Re: Question", parent=reply)
+        self.send("Unrelated")
+
+        self.assertEqual(reply.thread_root_id, root.pk)
+        self.assertEqual(answer.thread_root_id, root.pk)
+        with self.assertNumQueries(1):
+            thread = list(conversation(answer, self.student_user))
+        self.assertEqual(thread, [root, reply, answer])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class AnnouncementFeedTests(TestCase):
+    """Audience resolution, expiry and caching of the announcement feed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        session = AcademicSession.objects.create(
+            name="2024/2025",
+            start_date="2024-09-01",
+            end_date="2025-07-31",
+            is_current=True,
+        )
+        cls.class_a = ClassRoom.objects.create(level="JSS1", arm="A", session=session)
+        cls.class_b = ClassRoom.objects.create(level="JSS1", arm="B", session=session)
+        cls.staff_user = User.objects.create_user(username="staffuser", is_staff=True)
+        cls.student = Student.objects.create(
+            surname="Adams",
+            other_name="Test",
+            admission_no="2024-0001",
+            sex="Male",
+            date_of_birth="2010-01-01",
+            residential_address="1 School Road",
+            nationality="Nigerian",
+            state_of_origin="Lagos",
+            lga="Ikeja",
+            class_on_entry="JSS1",
+            date_of_entry="2024-09-01",
+            classroom=cls.class_a,
+            father_name="Father",
+            mother_name="Mother",
+        )
+        cls.parent_user = User.objects.create_user(username="parentuser")
+        parent = ParentProfile.objects.create(
+            user=cls.parent_user, phone_number="08011223344", relationship="Mother"
+        )
+        parent.students.add(cls.student)
+
+        past = timezone.now() - timedelta(days=1)
+        for title, audience, classroom, extra in [
+            ("Everyone", "All", None, {}),
+            ("Parents", "Parents", None, {}),
+            ("Students", "Students", None, {}),
+            ("Staff", "Staff", None, {}),
+            ("Class A", "Class", cls.class_a, {}),
+            ("Class B", "Class", cls.class_b, {}),
+            ("Expired", "All", None, {"expires_at": past}),
+            ("Inactive", "All", None, {"is_active": False}),
+        ]:
+            Announcement.objects.create(
+                title=title,
+                content="Notice",
+                target_audience=audience,
+                target_class=classroom,
+                created_by=cls.staff_user,
+                **extra,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, user):
+        return sorted(item.title for item in announcement_feed(user, limit=10))
+
+    def test_feed_matches_each_audience(self):
+        self.assertEqual(
+            self.titles(self.parent_user), ["Class A", "Everyone", "Parents"]
+        )
+        self.assertEqual(
+            self.titles(self.student.user), ["Class A", "Everyone", "Students"]
+        )
+        self.assertEqual(self.titles(self.staff_user), ["Everyone", "Staff"])
+
+        self.client.force_login(self.student.user)
+        hidden = Announcement.objects.get(title="Class B")
+        response = self.client.get(
+            reverse("portal:announcement_detail", args=[hidden.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_staff_pages_show_every_active_announcement(self):
+        self.client.force_login(self.staff_user)
+        response = self.client.get(reverse("portal:announcements_list"))
+        self.assertEqual(
+            sorted(item.title for item in response.context["announcements"]),
+            [
+                "Class A",
+                "Class B",
+                "Everyone",
+                "Expired",
+                "Parents",
+                "Staff",
+                "Students",
+            ],
+        )
+        targeted = Announcement.objects.get(title="Class B")
+        response = self.client.get(
+            reverse("portal:announcement_detail", args=[targeted.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_is_cached_until_announcements_change(self):
+        Announcement.objects.filter(title="Parents").update(
+            expires_at=timezone.now() + timedelta(hours=1)
+        )
+        self.titles(self.parent_user)
+        with CaptureQueriesContext(connection) as queries:
+            self.titles(self.parent_user)
+        self.assertFalse(any("portal_announcement" in q["sql"] for q in queries))
+
+        # Expiry applies to cached entries as well
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch("portal.announcements.timezone.now", return_value=later):
+            self.assertEqual(self.titles(self.parent_user), ["Class A", "Everyone"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Announcement.objects.create(
+                title="New", content="Notice", created_by=self.staff_user
+            )
+        self.assertIn("New", self.titles(self.parent_user))
@@ -6,7 +6,7 @@ from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
 from django.urls import reverse
 from django.utils import timezone
 from django.db import transaction
@@ -15,11 +15,13 @@ from datetime import timedelta
 from .models import (
     ParentProfile,
     StudentProfile,
-    Announcement,
     ParentInvitation,
     PortalMessage,
     FeePayment,
 )
+from records.cache import cached, model_tag
+from .announcements import announcement_feed, readable_announcements
+from .messaging import conversation, inbox_page, mark_read, unread_count
 from records.models import Student
 from .forms import (
     UserProfileForm,
@@ -33,12 +35,18 @@ from academics.models import (
     StudentScore,
     TermResult,
     ReportCard,
-    Term,
     Assessment,
     Attendance,
     Timetable,
 )
 from academics.models import ClassRoom, SubjectAssignment
+from academics.reference import get_current_term
+from academics.surge import (
+    conditional_response,
+    published_report_cards,
+    report_summary,
+    surge_active,
+)
 
 
 @login_required
@@ -171,7 +179,7 @@ def teacher_dashboard(request):
     Dashboard for teachers, showing their classes, subjects, and schedule.
     """
     teacher = request.user
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     # Get classes where this user is the class teacher
     homeroom_classes = ClassRoom.objects.filter(
@@ -196,9 +204,7 @@ def teacher_dashboard(request):
     )
 
     # Get recent announcements for staff
-    announcements = Announcement.objects.filter(
-        Q(target_audience="All") | Q(target_audience="Staff"), is_active=True
-    ).order_by("-created_at")[:5]
+    announcements = announcement_feed(teacher)
 
     # Quick stats
     # Get the unique classroom IDs from the teacher's assignments
@@ -225,6 +231,68 @@ def teacher_dashboard(request):
     return render(request, "portal/teacher_dashboard.html", context)
 
 
+def child_summaries(parent_profile):
+    """
+    A parent's children with their latest published results and attendance
+
+    Everything comes from one query: the latest published report card is read
+    through subqueries and the last 30 days of attendance are counted with
+    filtered aggregates. The list is cached per parent until one of the
+    children's report cards or attendance records changes.
+
+    Returns:
+        List of Student objects with average_score, position and
+        attendance_rate attributes
+    """
+    today = timezone.now().date()
+    student_ids = list(parent_profile.students.values_list("id", flat=True))
+
+    def build():
+        latest_report = ReportCard.objects.filter(
+            student=OuterRef("pk"), is_published=True
+        ).order_by("-term__start_date")
+        recent = Q(attendances__date__gte=today - timedelta(days=30))
+        students = list(
+            Student.objects.filter(pk__in=student_ids)
+            .select_related("classroom")
+            .annotate(
+                latest_average=Subquery(latest_report.values("average_score")[:1]),
+                latest_position=Subquery(latest_report.values("position")[:1]),
+                latest_out_of=Subquery(latest_report.values("out_of")[:1]),
+                attendance_days=Count("attendances", filter=recent),
+                present_days=Count(
+                    "attendances", filter=recent & Q(attendances__status="Present")
+                ),
+            )
+            .order_by("surname", "other_name")
+        )
+        for student in students:
+            if student.latest_average is not None:
+                student.average_score = student.latest_average
+                student.position = f"{student.latest_position}/{student.latest_out_of}"
+            else:
+                student.average_score = 0
+                student.position = "-"
+            student.attendance_rate = (
+                student.present_days / student.attendance_days * 100
+                if student.attendance_days
+                else 0
+            )
+        return students
+
+    tags = [model_tag(ParentProfile.students.through), model_tag(Student)]
+    for student_id in student_ids:
+        tags.append(model_tag(ReportCard, student=student_id))
+        tags.append(model_tag(Attendance, student=student_id))
+    return cached(
+        "portal.parent_children",
+        {"parent": parent_profile.pk, "date": today},
+        tags,
+        build,
+        timeout=60 * 60,
+    )
+
+
 @login_required
 def parent_dashboard(request):
     """Parent dashboard view"""
@@ -234,55 +302,23 @@ def parent_dashboard(request):
         messages.error(request, "Parent profile not found. Please contact admin.")
         return redirect("accounts:login")
 
-    # Get all children
-    students = parent_profile.students.all()
-
-    # Enhance students with stats
-    for student in students:
-        # Get latest report card
-        latest_report = (
-            ReportCard.objects.filter(student=student, is_published=True)
-            .order_by("-term__start_date")
-            .first()
-        )
-        if latest_report:
-            student.average_score = latest_report.average_score
-            student.position = f"{latest_report.position}/{latest_report.out_of}"
-        else:
-            student.average_score = 0
-            student.position = "-"
-
-        # Calculate attendance rate
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        attendance_records = Attendance.objects.filter(
-            student=student, date__gte=thirty_days_ago
-        )
-        if attendance_records.exists():
-            present_count = attendance_records.filter(status="Present").count()
-            total_days = attendance_records.count()
-            student.attendance_rate = (
-                (present_count / total_days * 100) if total_days > 0 else 0
-            )
-        else:
-            student.attendance_rate = 0
+    # Get all children with their latest results and attendance
+    students = child_summaries(parent_profile)
 
     # Get announcements
-    announcements = Announcement.objects.filter(
-        Q(target_audience="All") | Q(target_audience="Parents"), is_active=True
-    ).order_by("-created_at")[:5]
+    announcements = announcement_feed(request.user)
 
     # Get pending fees
     pending_fees = FeePayment.objects.filter(
-        student__in=students, status__in=["Pending", "Partial", "Overdue"]
+        student__in=[student.pk for student in students],
+        status__in=["Pending", "Partial", "Overdue"],
     ).order_by("due_date")[:5]
 
     # Get unread messages
-    unread_messages = PortalMessage.objects.filter(
-        recipient=request.user, is_read=False
-    ).count()
+    unread_messages = unread_count(request.user)
 
     # Current term
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     # Calculate term progress
     term_progress = 0
@@ -305,6 +341,13 @@ def parent_dashboard(request):
     return render(request, "portal/parent_dashboard.html", context)
 
 
+def latest_report_card(student):
+    """Newest published report card, from the cached summary in surge mode"""
+    if surge_active():
+        return report_summary(student.pk)["latest"]
+    return published_report_cards([student.pk]).first()
+
+
 @login_required
 def parent_student_detail(request, student_id):
     """View specific student details"""
@@ -331,11 +374,7 @@ def parent_student_detail(request, student_id):
     )
 
     # Get latest report card
-    latest_report = (
-        ReportCard.objects.filter(student=student, is_published=True)
-        .order_by("-term__start_date")
-        .first()
-    )
+    latest_report = latest_report_card(student)
 
     context = {
         "student": student,
@@ -358,7 +397,7 @@ def parent_student_scores(request, student_id):
         return redirect("portal:parent_dashboard")
 
     # Only show scores for current term when published
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     if not ReportCard.objects.filter(
         student=student, term=current_term, is_published=True
@@ -408,7 +447,7 @@ def parent_student_attendance(request, student_id):
         return redirect("portal:parent_dashboard")
 
     # Get attendance records for current term
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     if current_term:
         attendance_records = Attendance.objects.filter(
@@ -454,17 +493,7 @@ def parent_student_reports(request, student_id):
         messages.error(request, "Access denied.")
         return redirect("portal:parent_dashboard")
 
-    # Get all report cards
-    report_cards = ReportCard.objects.filter(
-        student=student, is_published=True
-    ).order_by("-term__session__start_date")
-
-    context = {
-        "student": student,
-        "report_cards": report_cards,
-    }
-
-    return render(request, "portal/parent_student_reports.html", context)
+    return render_report_cards(request, student, "portal/parent_student_reports.html")
 
 
 @login_required
@@ -510,7 +539,7 @@ def parent_timetable(request, student_id):
         messages.warning(request, "Student is not assigned to a class.")
         return redirect("portal:parent_student_detail", student_id=student_id)
 
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     # Get timetable
     timetable = Timetable.objects.filter(
@@ -551,7 +580,7 @@ def student_dashboard(request):
     # Get recent scores
     recent_scores = (
         StudentScore.objects.filter(student=student)
-        .select_related("assessment")
+        .select_related("assessment__assignment__subject")
         .order_by("-assessment__date")[:5]
     )
 
@@ -561,24 +590,16 @@ def student_dashboard(request):
     ]
 
     # Get announcements
-    announcements = Announcement.objects.filter(
-        Q(target_audience="All") | Q(target_audience="Students"), is_active=True
-    ).order_by("-created_at")[:5]
+    announcements = announcement_feed(request.user)
 
     # Get current term
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     # Get latest report card
-    latest_report = (
-        ReportCard.objects.filter(student=student, is_published=True)
-        .order_by("-term__start_date")
-        .first()
-    )
+    latest_report = latest_report_card(student)
 
     # Get unread messages
-    unread_messages = PortalMessage.objects.filter(
-        recipient=request.user, is_read=False
-    ).count()
+    unread_messages = unread_count(request.user)
 
     context = {
         "student": student,
@@ -603,7 +624,7 @@ def student_scores(request):
         messages.error(request, "Access denied.")
         return redirect("portal:student_dashboard")
 
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     # Only show scores from published assessments
     scores = StudentScore.objects.filter(
@@ -647,7 +668,7 @@ def student_attendance(request):
         messages.error(request, "Access denied.")
         return redirect("portal:student_dashboard")
 
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     if current_term:
         attendance_records = Attendance.objects.filter(
@@ -697,7 +718,7 @@ def student_timetable(request):
         messages.warning(request, "You are not assigned to a class.")
         return redirect("portal:student_dashboard")
 
-    current_term = Term.objects.filter(is_current=True).first()
+    current_term = get_current_term()
 
     timetable = Timetable.objects.filter(
         classroom=student.classroom, term=current_term, is_active=True
@@ -729,16 +750,34 @@ def student_reports(request):
         messages.error(request, "Access denied.")
         return redirect("portal:student_dashboard")
 
-    report_cards = ReportCard.objects.filter(
-        student=student, is_published=True
-    ).order_by("-term__session__start_date")
+    return render_report_cards(request, student, "portal/student_reports.html")
 
-    context = {
-        "student": student,
-        "report_cards": report_cards,
-    }
 
-    return render(request, "portal/student_reports.html", context)
+def render_report_cards(request, student, template_name):
+    """
+    Render a student's published report cards
+
+    In surge mode the list comes from the cached report summary and repeat
+    visits are answered with 304 Not Modified while neither it nor the
+    reader's unread count changed.
+    """
+    if not surge_active():
+        context = {
+            "student": student,
+            "report_cards": published_report_cards([student.pk]),
+        }
+        return render(request, template_name, context)
+
+    summary = report_summary(student.pk)
+    context = {"student": student, "report_cards": summary["report_cards"]}
+    # The page also carries the unread message count, which has no timestamp,
+    # so it is validated by ETag alone
+    return conditional_response(
+        request,
+        f"{summary['version']}-{unread_count(request.user)}",
+        None,
+        lambda: render(request, template_name, context),
+    )
 
 
 # ============================================
@@ -749,17 +788,7 @@ def student_reports(request):
 @login_required
 def announcements_list(request):
     """List all announcements"""
-    announcements = Announcement.objects.filter(is_active=True).order_by("-created_at")
-
-    # Filter by user type
-    if hasattr(request.user, "parent_profile"):
-        announcements = announcements.filter(
-            Q(target_audience="All") | Q(target_audience="Parents")
-        )
-    elif hasattr(request.user, "student_profile"):
-        announcements = announcements.filter(
-            Q(target_audience="All") | Q(target_audience="Students")
-        )
+    announcements = readable_announcements(request.user)
 
     context = {
         "announcements": announcements,
@@ -771,7 +800,7 @@ def announcements_list(request):
 @login_required
 def announcement_detail(request, pk):
     """View announcement details"""
-    announcement = get_object_or_404(Announcement, pk=pk, is_active=True)
+    announcement = get_object_or_404(readable_announcements(request.user), pk=pk)
 
     context = {
         "announcement": announcement,
@@ -788,12 +817,13 @@ def announcement_detail(request, pk):
 @login_required
 def messages_inbox(request):
     """View inbox messages"""
-    messages_list = PortalMessage.objects.filter(recipient=request.user).order_by(
-        "-created_at"
-    )
+    messages_list, next_cursor = inbox_page(request.user, request.GET.get("before"))
 
     context = {
         "messages": messages_list,
+        "next_cursor": next_cursor,
+        "is_first_page": "before" not in request.GET,
+        "unread_messages": unread_count(request.user),
     }
 
     return render(request, "portal/messages_inbox.html", context)
@@ -852,16 +882,16 @@ def reply_message(request, pk):
 @login_required
 def message_detail(request, pk):
     """View message details"""
-    message = get_object_or_404(PortalMessage, pk=pk, recipient=request.user)
-
-    # Mark as read
-    if not message.is_read:
-        message.is_read = True
-        message.read_at = timezone.now()
-        message.save()
+    message = get_object_or_404(
+        PortalMessage.objects.select_related("sender", "recipient", "student"),
+        pk=pk,
+        recipient=request.user,
+    )
+    mark_read(message)
 
     context = {
         "message": message,
+        "thread": conversation(message, request.user),
     }
 
     return render(request, "portal/message_detail.html", context)
@@ -0,0 +1,151 @@
+# records/cache.py
+"""
+Dependency-Aware Cache
+
+Caches computed dashboard context per filter combination. Each entry is tagged
+with the data it depends on, e.g. ``academics.termresult`` (any term) or
+``academics.termresult:term=5`` (one term). Every tag has a generation counter
+kept in the cache itself; an entry stores the generations of its tags when it
+was built and is only served while they are all unchanged. Writes bump the
+counters of the tags they touch, so only the dependent entries go stale.
+
+Only get, get_many, add, set and incr are used, so the LocMem, file-based,
+database and memcached/redis backends all work. If the cache itself fails,
+values are computed as if nothing was cached.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+KEY_PREFIX = "depcache"
+DEFAULT_TIMEOUT = 300
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache():
+    return caches[getattr(settings, "DEPENDENCY_CACHE_ALIAS", "default")]
+
+
+def model_tag(model, **scope):
+    """
+    Tag for a model's data, optionally narrowed to a scope
+
+    >>> model_tag(TermResult, term=5)
+    'academics.termresult:term=5'
+    """
+    tag = model._meta.label_lower
+    if scope:
+        tag += ":" + ",".join(f"{key}={value}" for key, value in sorted(scope.items()))
+    return tag
+
+
+def _generation_key(tag):
+    return f"{KEY_PREFIX}:gen:{tag}"
+
+
+def _generations(tags):
+    """Current generation of each tag, starting counters that do not exist yet"""
+    cache = get_cache()
+    keys = {tag: _generation_key(tag) for tag in tags}
+    found = cache.get_many(list(keys.values()))
+    generations = {}
+    for tag, key in keys.items():
+        if key not in found:
+            # Start from the clock rather than 0 so a counter that was evicted
+            # and recreated cannot match generations stored before eviction
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+        generations[tag] = found[key]
+    return generations
+
+
+def bump(*tags):
+    """Invalidate every entry depending on any of the tags, right away"""
+    cache = get_cache()
+    for tag in set(tags):
+        key = _generation_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*tags):
+    """Bump tags once the current transaction commits (immediately in autocommit)"""
+    transaction.on_commit(lambda: bump(*tags))
+
+
+def invalidate_for(model, field, values):
+    """Invalidate a model's tag and its tags scoped to each value of a field"""
+    invalidate(
+        model_tag(model), *(model_tag(model, **{field: value}) for value in values)
+    )
+
+
+def cached(name, params, tags, build, timeout=DEFAULT_TIMEOUT):
+    """
+    Return a cached value, rebuilding it if any of its tags changed
+
+    Args:
+        name: Name of the cached computation, e.g. "academics.dashboard"
+        params: JSON-serialisable filters that select the entry
+        tags: Tags the value depends on
+        build: Zero-argument callable producing the value (must be picklable)
+        timeout: Seconds to keep the entry regardless of tags
+
+    Returns:
+        The cached or freshly built value
+    """
+    cache = get_cache()
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    key = f"{KEY_PREFIX}:{name}:{digest}"
+
+    try:
+        generations = _generations(tags)
+        entry = cache.get(key)
+    except Exception:
+        logger.warning("Cache unavailable, computing %s", name, exc_info=True)
+        return build()
+    if entry is not None and entry[0] == generations:
+        return entry[1]
+
+    value = build()
+    try:
+        cache.set(key, (generations, value), timeout)
+    except Exception:
+        logger.warning("Could not cache %s", name, exc_info=True)
+    return value
+
+
+def track_model(model, scope=None):
+    """
+    Bump a model's tags whenever one of its rows is saved or deleted
+
+    Args:
+        model: Model class
+        scope: Optional callable returning a dict of scope values for an
+            instance, e.g. ``lambda result: {"term": result.term_id}``; the
+            scoped tag is bumped alongside the model-wide one
+    """
+
+    def receiver(sender, instance, **kwargs):
+        if kwargs.get("raw"):
+            return
+        tags = [model_tag(model)]
+        if scope is not None:
+            tags.append(model_tag(model, **scope(instance)))
+        invalidate(*tags)
+
+    uid = f"dependency-cache:{model._meta.label_lower}"
+    post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,8 @@
+# records/signals.py
+
+from .cache import track_model
+from .models import Student, StudentDocument
+
+# Dashboards cached with records.cache depend on these
+track_model(Student)
+track_model(StudentDocument)
@@ -9,6 +9,7 @@ from django.views.decorators.http import require_http_methods
 from django.db import transaction
 from django.contrib.auth.models import User
 from portal.models import ParentProfile, ParentInvitation
+from .cache import cached, model_tag
 from .models import Student, StudentDocument
 from .forms import StudentForm, StudentDocumentForm, MultipleStudentDocumentForm
 import logging
@@ -193,7 +194,7 @@ def alumni_list(request):
 @user_passes_test(_is_staff)
 @require_POST
 def toggle_student_status(request, pk):
-    from academics.models import AcademicSession  # Avoid circular import
+    from academics.reference import get_current_session  # Avoid circular import
 
     student = get_object_or_404(Student, pk=pk)
     student.is_active = not student.is_active
@@ -201,7 +202,7 @@ def toggle_student_status(request, pk):
     # If student is being archived (is_active is now False)
     if not student.is_active:
         # Find the current academic session
-        current_session = AcademicSession.objects.filter(is_current=True).first()
+        current_session = get_current_session()
         if current_session:
             student.graduation_session = current_session
     else:
@@ -213,44 +214,53 @@ def toggle_student_status(request, pk):
     return redirect("records:student_detail", pk=student.pk)
 
 
+def admin_dashboard_context():
+    """Statistics shown on the admin dashboard, cached until students change"""
+    # Basic statistics
+    total_students = Student.objects.count()
+    male_count = Student.objects.filter(sex="Male").count()
+    female_count = Student.objects.filter(sex="Female").count()
+
+    # Students by class
+    students_by_class = (
+        Student.objects.values("class_at_present")
+        .annotate(count=Count("id"))
+        .order_by("class_at_present")
+    )
+
+    # Recent students
+    recent_students = Student.objects.order_by("-created_at")[:5]
+
+    # Students with documents
+    students_with_docs = (
+        Student.objects.filter(documents__isnull=False).distinct().count()
+    )
+
+    # Total documents
+    total_documents = StudentDocument.objects.count()
+
+    return {
+        "total_students": total_students,
+        "male_count": male_count,
+        "female_count": female_count,
+        "recent_students": list(recent_students),
+        "students_by_class": list(students_by_class),
+        "students_with_docs": students_with_docs,
+        "total_documents": total_documents,
+    }
+
+
 @login_required
 @user_passes_test(_is_staff)
 def admin_dashboard(request):
     """Display admin dashboard with statistics and charts"""
     try:
-        # Basic statistics
-        total_students = Student.objects.count()
-        male_count = Student.objects.filter(sex="Male").count()
-        female_count = Student.objects.filter(sex="Female").count()
-
-        # Students by class
-        students_by_class = (
-            Student.objects.values("class_at_present")
-            .annotate(count=Count("id"))
-            .order_by("class_at_present")
+        context = cached(
+            "records.admin_dashboard",
+            {},
+            [model_tag(Student), model_tag(StudentDocument)],
+            admin_dashboard_context,
         )
-
-        # Recent students
-        recent_students = Student.objects.order_by("-created_at")[:5]
-
-        # Students with documents
-        students_with_docs = (
-            Student.objects.filter(documents__isnull=False).distinct().count()
-        )
-
-        # Total documents
-        total_documents = StudentDocument.objects.count()
-
-        context = {
-            "total_students": total_students,
-            "male_count": male_count,
-            "female_count": female_count,
-            "recent_students": recent_students,
-            "students_by_class": students_by_class,
-            "students_with_docs": students_with_docs,
-            "total_documents": total_documents,
-        }
-
         return render(request, "records/admin_dashboard.html", context)
 
     except Exception as e:
@@ -94,6 +94,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "academics.context_processors.reference",
             ],
         },
     },
@@ -118,6 +119,26 @@ else:
     }
 
 
+# Cache
+# Shared by every web and worker process, so dependency-cache invalidation and
+# the results-day surge flag reach all of them. Set REDIS_URL to use Redis;
+# otherwise files under cache/ are used, which needs no setup on one host
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "cache" / "django",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -165,6 +186,22 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Rendered PDFs of published report cards, keyed by content hash
+REPORT_CARD_PDF_CACHE_DIR = BASE_DIR / "cache" / "report_cards"
+
+# Background jobs are run by a worker process, `python manage.py run_jobs`,
+# which must be kept running alongside the web server in production. With
+# ACADEMIC_JOBS_EAGER (the default when DEBUG is on) they run inside the
+# request instead, so development needs no worker
+ACADEMIC_JOBS_EAGER = os.environ.get("ACADEMIC_JOBS_EAGER", str(DEBUG)).lower() in (
+    "1",
+    "true",
+    "yes",
+)
+ACADEMIC_JOBS_LEASE_SECONDS = 600
+# Finished jobs and their files are deleted by the worker after this long
+ACADEMIC_JOBS_RETENTION_DAYS = 7
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Authentication redirects